@@ -0,0 +1,26 @@
+import Foundation
+
+// Water level between high and low tides, shared by the iOS and watchOS apps
+enum TideCurve {
+    // Level at `date` on the cosine curve from one extreme to the next
+    // (times as "yyyy-MM-dd HH:mm", heights in feet)
+    static func level(fromTime startTime: String, height startHeight: String,
+                      toTime endTime: String, height endHeight: String,
+                      at date: Date = Date()) -> (height: Double, rising: Bool)? {
+        let dateFormatter = DateFormatter()
+        dateFormatter.dateFormat = "yyyy-MM-dd HH:mm"
+        
+        guard let start = dateFormatter.date(from: startTime),
+              let end = dateFormatter.date(from: endTime),
+              let startValue = Double(startHeight),
+              let endValue = Double(endHeight),
+              end > start else {
+            return nil
+        }
+        
+        // Clamp so the curve never extrapolates past either extreme
+        let position = min(max(date.timeIntervalSince(start) / end.timeIntervalSince(start), 0), 1)
+        let height = startValue + (endValue - startValue) * (1 - cos(Double.pi * position)) / 2
+        return (height, endValue > startValue)
+    }
+}
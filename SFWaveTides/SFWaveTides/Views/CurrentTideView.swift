@@ -117,6 +117,14 @@ struct CurrentTideView: View {
                 }
                 .padding()
                 
+                // Interpolated level right now
+                if let level = TideCurve.level(fromTime: current.time, height: current.height,
+                                               toTime: next.time, height: next.height) {
+                    Text("Now: \(String(format: "%.1f", level.height)) ft, \(level.rising ? "Rising" : "Falling")")
+                        .font(.subheadline)
+                        .foregroundColor(level.rising ? .red : .blue)
+                }
+                
                 // Time until next tide
                 if let timeRemaining = getTimeUntilNextTide(next) {
                     Text("Time until next tide: \(timeRemaining)")
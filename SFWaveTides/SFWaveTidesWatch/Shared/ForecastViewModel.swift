@@ -23,6 +23,10 @@ class ForecastViewModel: ObservableObject {
         getNextTide()
     }
     
+    var currentLevel: (height: Double, rising: Bool)? {
+        getCurrentLevel()
+    }
+    
     init() {
         // Load saved buoy or default to station 46237 (San Francisco Bar)
         loadSavedBuoy()
@@ -137,6 +141,13 @@ class ForecastViewModel: ObservableObject {
         return nextTide
     }
     
+    // Water level now, using the cosine model between the current and next extremes
+    private func getCurrentLevel() -> (height: Double, rising: Bool)? {
+        guard let current = currentTide, let next = nextTide else { return nil }
+        return TideCurve.level(fromTime: current.time, height: current.height,
+                               toTime: next.time, height: next.height)
+    }
+    
     // Get time remaining until next tide as a string
     func getTimeUntilNextTide() -> String? {
         guard let nextTide = nextTide else { return nil }
@@ -24,6 +24,13 @@ struct TideView: View {
                     }
                     .padding(.vertical, -8)
                     
+                    // Interpolated level right now
+                    if let level = viewModel.currentLevel {
+                        Text("Now: \(String(format: "%.1f", level.height))ft \(level.rising ? "Rising" : "Falling")")
+                            .font(.system(.caption, design: .rounded))
+                            .foregroundColor(level.rising ? .red : .blue)
+                    }
+                    
                     // Next tide
                     NextTideCard(tide: next, timeRemaining: viewModel.getTimeUntilNextTide())
                 } else {
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the San Francisco wave forecast tools
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_columnar``.
+"""
@@ -0,0 +1,57 @@
+"""
+Benchmark: vectorized columnar parser vs the per-line dict-of-strings loop
+
+Parses a full realtime2 history (~6,500 rows, the size NDBC serves for a
+10-minute station) both ways and reports rows per second.
+
+Usage: python -m benchmarks.bench_columnar [--rows N] [--repeat N]
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import realtime2_spec, realtime2_txt
+from sf_wave.columnar import parse_realtime2
+
+
+def parse_rows_dicts(data_text):
+    """The scripts' parsing approach, applied to every row of the file"""
+    lines = data_text.strip().split('\n')
+    headers = lines[0].replace('#', '').split()
+    rows = []
+    for line in lines[2:]:
+        values = line.split()
+        data = {}
+        for j, header in enumerate(headers):
+            if j < len(values):
+                data[header] = values[j]
+        rows.append(data)
+    return rows
+
+
+def best_time(func, arg, repeat):
+    """Return the fastest of `repeat` timed runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument("--rows", type=int, default=6500, help="Rows per file")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per parser")
+    args = parser.parse_args()
+
+    for name, text in (("txt", realtime2_txt(args.rows)), ("spec", realtime2_spec(args.rows))):
+        loop = best_time(parse_rows_dicts, text, args.repeat)
+        vectorized = best_time(parse_realtime2, text, args.repeat)
+        print(f"{name:>4}: dict-per-row {loop * 1000:8.2f} ms ({args.rows / loop:12,.0f} rows/s)   "
+              f"columnar {vectorized * 1000:8.2f} ms ({args.rows / vectorized:12,.0f} rows/s)   "
+              f"speedup {loop / vectorized:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: point extraction from wave model files vs decoding whole grids
+
+Writes a global WAVEWATCH III style run (NetCDF classic and GRIB2 simple
+packing) to a temporary directory, then pulls every forecast hour at a set
+of stations two ways: sf_wave.gridded.extract_points(), which reads only
+the cells around the stations, and a full decode of every field followed
+by the same interpolation. Also checks the extracted values against the
+analytic fields the files were written from.
+
+Usage: python -m benchmarks.bench_gridded [--resolution DEG] [--hours N] [--stations N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import wave_model_fields, wave_model_values, write_grib2, write_netcdf
+from sf_wave.gridded import (PARAMETERS, Grid, NetcdfFile, _unpack, combine, extract_points,
+                             scan_grib2)
+
+
+def full_decode(path, lats, lons):
+    """Decode every field of the file whole, then interpolate the stations"""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == b"GRIB":
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        messages = scan_grib2(data)
+        grid = messages[0].grid
+        everything = np.arange(grid.shape[0] * grid.shape[1])
+        fields = [message.sample(data, everything) for message in messages]
+    else:
+        netcdf = NetcdfFile(path)
+        grid = Grid(netcdf.variables["lat"][0], netcdf.variables["lon"][0])
+        fields = [_unpack(np.array(array), attributes) for array, attributes in
+                  (netcdf.find(names) for _, names in PARAMETERS.values())]
+    rows, columns, weights = grid.locate(lats, lons)
+    return [combine(field.reshape(-1, *grid.shape)[:, rows, columns], weights) for field in fields]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument("--resolution", type=float, default=0.5, help="Grid spacing in degrees")
+    parser.add_argument("--hours", type=int, default=61, help="Forecast hours (3-hourly)")
+    parser.add_argument("--stations", type=int, default=50, help="Stations to extract")
+    args = parser.parse_args()
+
+    lats = np.arange(90, -90 - args.resolution / 2, -args.resolution)
+    lons = np.arange(0, 360, args.resolution)
+    hours = np.arange(args.hours) * 3
+    rng = np.random.default_rng(46237)
+    station_lats = rng.uniform(-60, 60, args.stations)
+    # Keep off the cell between the last longitude and 360, where the linear test field wraps
+    station_lons = rng.uniform(0, 360 - args.resolution, args.stations)
+
+    with tempfile.TemporaryDirectory() as root:
+        fields = wave_model_fields(lats, lons, hours)
+        paths = {"netcdf": os.path.join(root, "ww3.nc"), "grib2": os.path.join(root, "ww3.grb2")}
+        write_netcdf(paths["netcdf"], lats[::-1], lons, hours, {k: v[:, ::-1] for k, v in fields.items()})
+        write_grib2(paths["grib2"], lats, lons, hours, fields)
+        del fields
+
+        print(f"{len(lats)} x {len(lons)} grid, {len(hours)} hours, {args.stations} stations")
+        for kind, path in paths.items():
+            points, elapsed = timed(extract_points, [path], station_lats, station_lons)
+            _, full = timed(full_decode, path, station_lats, station_lons)
+            exact = np.stack([wave_model_values("hs", station_lats, station_lons, hour) for hour in hours], axis=1)
+            error = np.nanmax(np.abs(points["hs"] - exact))
+            print(f"{kind:>7}: {os.path.getsize(path) / 1e6:7.1f} MB   points {elapsed * 1000:8.1f} ms   "
+                  f"full decode {full * 1000:8.1f} ms   speedup {full / elapsed:6.1f}x   max hs error {error:.4f} m")
+
+
+if __name__ == "__main__":
+    main()
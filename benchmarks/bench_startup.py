@@ -0,0 +1,76 @@
+"""
+Benchmark: import time of the command-line entry point against a budget
+
+Cron jobs and widget refreshes start a fresh interpreter thousands of times
+a day, and when the response cache is fresh the imports are most of the
+run. Each module on the cache-hit path is imported in a new interpreter
+under `python -X importtime`; the median cumulative time is compared with
+its budget, and requests or NumPy showing up at all counts as a failure.
+Bytecode is compiled first so the numbers match an installed package.
+
+Usage: python -m benchmarks.bench_startup [--repeat N] [--scale X]
+
+Exits with status 1 when any module is over budget.
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+
+# Median cumulative import time allowed per module (milliseconds)
+IMPORT_BUDGETS_MS = {
+    "sf_wave.cli": 3,
+    "sf_wave.config": 2,
+    "sf_wave.core": 8,
+    "sf_wave.ndbc": 15,
+    "sf_wave.tides": 10,
+}
+
+# Modules that must stay off the cache-hit path
+HEAVY_MODULES = ("requests", "numpy")
+
+
+def import_times(module):
+    """Run `import module` in a fresh interpreter: {imported module: cumulative microseconds}"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument("--repeat", type=int, default=15, help="Fresh interpreters per module")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget (e.g. 2 on a slow machine)")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    compileall.compile_dir(os.path.join(root, "sf_wave"), quiet=1)
+
+    failed = False
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        samples = [import_times(module) for _ in range(args.repeat)]
+        median = statistics.median(times[module] for times in samples) / 1000
+        heavy = sorted({name for name in samples[0] for prefix in HEAVY_MODULES
+                        if name == prefix or name.startswith(prefix + ".")})
+        over = median > budget * args.scale
+        failed |= over or bool(heavy)
+        status = "OVER" if over else "ok"
+        print(f"{module:>16}: {median:6.2f} ms (budget {budget * args.scale:5.1f} ms) {status}"
+              + (f"   imports {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Benchmark suite: parsing, rendering and end-to-end runs on recorded fixtures
+
+Writes synthetic realtime2 files (a typical 45-day station, a multi-year
+station and a batch of extra stations), CO-OPS tide predictions and an NWS
+marine forecast as sf_wave.standin recordings. In-process cases time
+parse_buoy_data, parse_spectral_data, the columnar parser, get_direction_text
+and the display functions. End-to-end cases run each forecast script's
+main() in a fresh interpreter against a stand-in server on a local port,
+with the response cache off, so every run does its full fetch.
+
+Every case reports p50/p99 latency, throughput at the median and peak
+memory: the tracemalloc peak of one extra call for in-process cases, and
+the child's maximum RSS for end-to-end runs. --save writes the results as
+a baseline; --compare reads one back and exits with status 1 when a case's
+p50 or peak memory grew, or its throughput fell, by more than --tolerance.
+
+Usage: python -m benchmarks.bench_suite [--repeat N] [--runs N] [--years N] [--stations N]
+                                        [--latency S] [--only TEXT] [--save FILE | --compare FILE]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.synthetic import (coops_predictions, realtime2_spec, realtime2_txt,
+                                  write_fixtures)
+from sf_wave import core
+from sf_wave.columnar import parse_realtime2
+from sf_wave.config import BUOY_ID, NOAA_BASE_URLS, SF_TIDE_STATION
+from sf_wave.records import TideEvent
+from sf_wave.standin import StandinServer
+
+# Rows of a typical realtime2 file: 45 days of 10-minute .txt and 30-minute .spec rows
+TYPICAL_TXT_ROWS = 45 * 144
+TYPICAL_SPEC_ROWS = 45 * 48
+
+# 10-minute rows per year, for the multi-year station
+ROWS_PER_YEAR = 365 * 144
+
+# Fixture station holding the multi-year files
+HISTORY_STATION = "HIST1"
+
+# Degrees converted per get_direction_text() case call
+DIRECTION_BATCH = 10000
+
+# Shortest timed sample of an in-process case; faster calls are batched (seconds)
+MIN_SAMPLE_SECONDS = 0.001
+
+# Allowed growth of p50/peak memory (and drop in throughput) before --compare fails
+DEFAULT_TOLERANCE = 0.25
+
+# p50 changes smaller than this are timer noise, never regressions (milliseconds)
+NOISE_MS = 0.05
+
+# Forecast scripts run end to end, by case name
+SCRIPTS = {
+    "forecast": "sf_wave_forecast.py",
+    "tides": "sf_wave_forecast_with_tides.py",
+    "minimal": "sf_wave_forecast_minimal.py",
+    "minimal-tides": "sf_wave_forecast_minimal_with_tides.py",
+    "simple": "sf_wave_forecast_simple.py",
+}
+
+
+# Runs a script as __main__ and reports its peak RSS on stderr. The child's
+# ru_maxrss would include the benchmark process it was forked from; VmHWM
+# starts over at exec
+PEAK_RUNNER = """
+import atexit, os, sys
+def report():
+    try:
+        with open("/proc/self/status") as f:
+            peak = [line.split()[1] for line in f if line.startswith("VmHWM:")]
+    except OSError:
+        peak = []
+    if peak:
+        sys.stderr.write(f"\\npeak_kb={peak[0]}\\n")
+atexit.register(report)
+sys.argv = sys.argv[1:]
+sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+with open(sys.argv[0]) as f:
+    code = compile(f.read(), sys.argv[0], "exec")
+exec(code, {"__name__": "__main__", "__file__": sys.argv[0]})
+"""
+
+
+def percentile(samples, q):
+    """Nearest-rank q-th percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def summarize(samples, items, unit, peak_kb):
+    p50 = percentile(samples, 50)
+    return {"p50_ms": p50 * 1000, "p99_ms": percentile(samples, 99) * 1000,
+            "throughput": items / p50 if p50 > 0 else float("inf"), "unit": f"{unit}/s",
+            "peak_kb": peak_kb, "samples": len(samples)}
+
+
+def measure(func, repeat, items=1, unit="calls"):
+    """
+    Time `repeat` samples of func, then trace one more call for its peak allocation
+
+    Calls shorter than MIN_SAMPLE_SECONDS are timed in batches (like
+    timeit's autorange); each sample is the batch time per call.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= MIN_SAMPLE_SECONDS or number >= 10 ** 5:
+            break
+        number *= 10
+    # As timeit does: no collector pauses from earlier cases' garbage in the samples
+    gc.collect()
+    gc.disable()
+    samples = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(samples, items, unit, peak / 1024)
+
+
+def quiet(func, *args):
+    """func with its printed output discarded"""
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(*args)
+    return call
+
+
+def start_standin(root, **behaviour):
+    """Serve fixtures from a background thread; returns (server, port)"""
+    standin = StandinServer(root, **behaviour)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(standin.serve("127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return standin, server.sockets[0].getsockname()[1]
+
+
+def run_script(argv, env, cwd):
+    """Run a script to completion: (seconds, peak RSS in KB)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", PEAK_RUNNER] + argv, cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(argv)} exited with status {result.returncode}:\n{result.stderr}")
+    peak = [line[len("peak_kb="):] for line in result.stderr.splitlines() if line.startswith("peak_kb=")]
+    return elapsed, int(peak[-1]) if peak else 0
+
+
+def measure_script(argv, runs, env, scratch, items=1, unit="runs"):
+    """Run a script `runs` times, each with empty caches, after one warm-up run"""
+    samples, peaks = [], []
+    for i in range(runs + 1):
+        run_dir = os.path.join(scratch, f"run{time.monotonic_ns()}")
+        run_env = dict(env, SF_WAVE_CACHE_DIR=os.path.join(run_dir, "http"),
+                       SF_WAVE_TIDE_CACHE_DIR=os.path.join(run_dir, "tides"),
+                       SF_WAVE_CATALOG_DIR=os.path.join(run_dir, "catalog"))
+        elapsed, peak = run_script(argv, run_env, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        if i:
+            samples.append(elapsed)
+            peaks.append(peak)
+    return summarize(samples, items, unit, max(peaks))
+
+
+def in_process_cases(args):
+    """(name, thunk) pairs of the in-process cases"""
+    txt = realtime2_txt(TYPICAL_TXT_ROWS)
+    spec = realtime2_spec(TYPICAL_SPEC_ROWS)
+    history_rows = args.years * ROWS_PER_YEAR
+    history = realtime2_txt(history_rows, seed=1)
+    observation = core.parse_buoy_data(txt)
+    readings = core.parse_spectral_data(spec)
+    tides = [TideEvent.from_prediction(p) for p in json.loads(coops_predictions())["predictions"]]
+    degrees = [i * 360.0 / DIRECTION_BATCH for i in range(DIRECTION_BATCH)]
+    buoy = {"id": BUOY_ID, "name": "Benchmark"}
+    few = max(3, args.repeat // 10)
+
+    return [
+        ("parse_buoy_data 45d", lambda: measure(lambda: core.parse_buoy_data(txt), args.repeat, 1, "files")),
+        (f"parse_buoy_data {args.years}y",
+         lambda: measure(lambda: core.parse_buoy_data(history), few, 1, "files")),
+        ("parse_spectral_data 45d", lambda: measure(lambda: core.parse_spectral_data(spec), args.repeat, 1, "files")),
+        ("parse_spectral_data 45d all rows",
+         lambda: measure(lambda: core.parse_spectral_data(spec, 0), few, TYPICAL_SPEC_ROWS, "rows")),
+        ("parse_realtime2 45d", lambda: measure(lambda: parse_realtime2(txt), args.repeat, TYPICAL_TXT_ROWS, "rows")),
+        (f"parse_realtime2 {args.years}y",
+         lambda: measure(lambda: parse_realtime2(history), few, history_rows, "rows")),
+        ("get_direction_text", lambda: measure(lambda: [core.get_direction_text(d) for d in degrees],
+                                               args.repeat, DIRECTION_BATCH, "calls")),
+        ("display_current_conditions",
+         lambda: measure(quiet(core.display_current_conditions, buoy, observation), args.repeat)),
+        ("display_forecast", lambda: measure(quiet(core.display_forecast, readings), args.repeat)),
+        ("display_recent_readings", lambda: measure(quiet(core.display_recent_readings, readings), args.repeat)),
+        ("display_tide_data", lambda: measure(quiet(core.display_tide_data, tides), args.repeat)),
+    ]
+
+
+def end_to_end_cases(args, env, scratch):
+    """(name, thunk) pairs of the end-to-end cases"""
+    extra = [f"SB{i:03d}" for i in range(args.stations)]
+    cases = [(f"main {name}", lambda script=script: measure_script([script], args.runs, env, scratch))
+             for name, script in SCRIPTS.items()]
+    cases += [
+        (f"main forecast {args.stations} stations",
+         lambda: measure_script([SCRIPTS["forecast"]] + extra, args.runs, env, scratch, args.stations, "stations")),
+        (f"main simple {args.years}y station",
+         lambda: measure_script([SCRIPTS["simple"], "--station", HISTORY_STATION], args.runs, env, scratch,
+                                args.years * ROWS_PER_YEAR, "rows")),
+    ]
+    return cases
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline; returns True when any case regressed"""
+    regressed = False
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            print(f"{name:<40} new")
+            continue
+        problems = []
+        if result["p50_ms"] > base["p50_ms"] * (1 + tolerance) and result["p50_ms"] - base["p50_ms"] > NOISE_MS:
+            problems.append(f"p50 {base['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms")
+        if result["throughput"] < base["throughput"] / (1 + tolerance) and result["p50_ms"] - base["p50_ms"] > NOISE_MS:
+            problems.append(f"throughput {base['throughput']:,.0f} -> {result['throughput']:,.0f} {result['unit']}")
+        if result["peak_kb"] > base["peak_kb"] * (1 + tolerance) and result["peak_kb"] - base["peak_kb"] > 64:
+            problems.append(f"peak {base['peak_kb']:,.0f} -> {result['peak_kb']:,.0f} KB")
+        change = (result["p50_ms"] / base["p50_ms"] - 1) * 100 if base["p50_ms"] else 0.0
+        regressed |= bool(problems)
+        print(f"{name:<40} {change:+6.1f}%  " + ("REGRESSED: " + "; ".join(problems) if problems else "ok"))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per in-process case")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per end-to-end case")
+    parser.add_argument("--years", type=int, default=5, help="Years of rows in the multi-year fixture")
+    parser.add_argument("--stations", type=int, default=20, help="Stations in the multi-station run")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds the stand-in server waits before each response")
+    parser.add_argument("--only", help="Run only cases whose name contains this text")
+    parser.add_argument("--save", help="Write the results to this baseline file")
+    parser.add_argument("--compare", help="Compare with this baseline file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed relative change before a regression (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        fixtures = os.path.join(scratch, "fixtures")
+        txt_rows = {BUOY_ID: TYPICAL_TXT_ROWS, HISTORY_STATION: args.years * ROWS_PER_YEAR}
+        spec_rows = {BUOY_ID: TYPICAL_SPEC_ROWS, HISTORY_STATION: args.years * ROWS_PER_YEAR // 3}
+        for i in range(args.stations):
+            txt_rows[f"SB{i:03d}"] = TYPICAL_TXT_ROWS
+            # Every fifth station has no .spec file and falls back to the MapClick forecast
+            if i % 5:
+                spec_rows[f"SB{i:03d}"] = TYPICAL_SPEC_ROWS
+        write_fixtures(fixtures, txt_rows, spec_rows, SF_TIDE_STATION)
+        standin, port = start_standin(fixtures, latency=args.latency)
+
+        env = dict(os.environ, SF_WAVE_NO_CACHE="1", PYTHONDONTWRITEBYTECODE="1",
+                   SF_WAVE_CONFIG=os.path.join(scratch, "no-config.json"),
+                   SF_WAVE_GRID_DIR=os.path.join(scratch, "no-grids"),
+                   SF_WAVE_TIDE_DIR=os.path.join(scratch, "no-constants"))
+        env.update({f"SF_WAVE_{service.upper()}_URL": f"http://127.0.0.1:{port}/{service}"
+                    for service in NOAA_BASE_URLS})
+
+        results = {}
+        print(f"{'case':<40} {'p50 ms':>9} {'p99 ms':>9} {'throughput':>22} {'peak KB':>10}")
+        for name, case in in_process_cases(args) + end_to_end_cases(args, env, scratch):
+            if args.only and args.only not in name:
+                continue
+            result = results[name] = case()
+            print(f"{name:<40} {result['p50_ms']:9.3f} {result['p99_ms']:9.3f} "
+                  f"{result['throughput']:>14,.0f} {result['unit']:<7} {result['peak_kb']:10,.0f}")
+        if standin.stats["requests"]:
+            print(f"stand-in server: {standin.stats['requests']} requests, by status {standin.stats['status']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "cases": results}, f, indent=1)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (tolerance {args.tolerance:.0%}):")
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Check: offline tide predictions against saved CO-OPS fixtures for 9414290
+
+Builds the San Francisco constants from the committed harcon.json and
+datums.json, runs sf_wave.harmonics.compare_with_fixture (the `check`
+command) on every predictions file next to them and compares the largest
+differences with the tolerances below.
+
+Usage: python -m benchmarks.check_tides [--fixtures DIR]
+
+Exits with status 1 when any fixture is off by more than its tolerance.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from sf_wave.harmonics import HarmonicConstants, compare_with_fixture, constants_dict
+
+# Committed harcon.json, datums.json and predictions_*.json
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "coops", "9414290")
+
+# Largest height difference (feet): CO-OPS rounds levels to 0.001 ft
+HEIGHT_TOLERANCE = 0.005
+
+# Largest high/low time difference (minutes): CO-OPS rounds times to the minute
+TIME_TOLERANCE_MINUTES = 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture directory")
+    args = parser.parse_args()
+
+    def load(name):
+        with open(os.path.join(args.fixtures, name)) as f:
+            return json.load(f)
+
+    constants = HarmonicConstants.from_dict(
+        constants_dict("9414290", load("harcon.json"), load("datums.json")))
+    failed = False
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "predictions_*.json"))):
+        result = compare_with_fixture(constants, load(os.path.basename(path)))
+        over = (not result["points"] or result.get("max_height_error", 0.0) > HEIGHT_TOLERANCE
+                or result.get("max_time_error_minutes", 0.0) > TIME_TOLERANCE_MINUTES)
+        failed |= over
+        errors = f"height {result.get('max_height_error', float('nan')):.4f} ft"
+        if "max_time_error_minutes" in result:
+            errors += f", time {result['max_time_error_minutes']:.1f} min"
+        print(f"{os.path.basename(path):>32}: {result['points']:5d} points, {errors} "
+              f"{'OVER' if over else 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
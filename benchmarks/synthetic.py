@@ -0,0 +1,296 @@
+"""
+Synthetic NDBC realtime2 files and wave model grids for benchmarking
+
+Generates .txt and .spec files in the exact realtime2 layout (two '#' header
+lines, newest row first, 'MM' for missing values) for any number of rows,
+and small WAVEWATCH III style model output as NetCDF classic or GRIB2.
+write_fixtures() lays realtime2 files, CO-OPS predictions and an NWS
+MapClick forecast out as recordings for the sf_wave.standin server.
+"""
+
+import json
+import random
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+TXT_HEADER = (
+    "#YY  MM DD hh mm WDIR WSPD GST  WVHT   DPD   APD MWD   PRES  ATMP  WTMP  DEWP  VIS PTDY  TIDE\n"
+    "#yr  mo dy hr mn degT m/s  m/s     m   sec   sec degT   hPa  degC  degC  degC  nmi  hPa    ft\n"
+)
+
+SPEC_HEADER = (
+    "#YY  MM DD hh mm WVHT  SwH  SwP  WWH  WWP SwD WWD  STEEPNESS  APD MWD\n"
+    "#yr  mo dy hr mn    m    m  sec    m  sec  -  degT     -      sec degT\n"
+)
+
+DIRECTIONS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+              "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+STEEPNESS = ["SWELL", "AVERAGE", "STEEP", "VERY_STEEP"]
+
+# Most recent timestamp of generated files; fixed so output is reproducible
+END_TIME = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def _maybe_missing(rng, text, missing_rate):
+    """Replace a formatted value with 'MM', right-aligned to the same width like NDBC does"""
+    return "MM".rjust(len(text)) if rng.random() < missing_rate else text
+
+
+def realtime2_txt(rows, interval_minutes=10, missing_rate=0.05, seed=46237, end_time=END_TIME):
+    """Build the text of a realtime2 .txt file with `rows` rows, newest first"""
+    rng = random.Random(seed)
+    lines = [TXT_HEADER]
+    for i in range(rows):
+        t = end_time - timedelta(minutes=interval_minutes * i)
+        wvht = 1.5 + rng.random() * 2
+        fields = [
+            _maybe_missing(rng, f"{rng.randrange(360):3d}", missing_rate),
+            _maybe_missing(rng, f"{rng.random() * 12:4.1f}", missing_rate),
+            _maybe_missing(rng, f"{rng.random() * 15:4.1f}", missing_rate),
+            _maybe_missing(rng, f"{wvht:5.2f}", missing_rate),
+            _maybe_missing(rng, f"{rng.randrange(4, 20):5d}", missing_rate),
+            _maybe_missing(rng, f"{rng.uniform(4, 12):5.2f}", missing_rate),
+            _maybe_missing(rng, f"{rng.randrange(180, 330):3d}", missing_rate),
+            _maybe_missing(rng, f"{rng.uniform(1005, 1025):6.1f}", missing_rate),
+            _maybe_missing(rng, f"{rng.uniform(10, 18):5.1f}", missing_rate),
+            _maybe_missing(rng, f"{rng.uniform(11, 16):5.1f}", missing_rate),
+            "   MM", "  MM", "  MM", "   MM",
+        ]
+        lines.append(f"{t:%Y %m %d %H %M} " + " ".join(fields) + "\n")
+    return "".join(lines)
+
+
+def realtime2_spec(rows, interval_minutes=30, missing_rate=0.05, seed=46237, end_time=END_TIME):
+    """Build the text of a realtime2 .spec file with `rows` rows, newest first"""
+    rng = random.Random(seed)
+    lines = [SPEC_HEADER]
+    for i in range(rows):
+        t = end_time - timedelta(minutes=interval_minutes * i)
+        swh = 1 + rng.random() * 2
+        wwh = rng.random()
+        fields = [
+            _maybe_missing(rng, f"{(swh ** 2 + wwh ** 2) ** 0.5:4.1f}", missing_rate),
+            f"{swh:4.1f}",
+            f"{rng.uniform(8, 18):4.1f}",
+            f"{wwh:4.1f}",
+            f"{rng.uniform(3, 7):4.1f}",
+            f"{rng.choice(DIRECTIONS):>3}",
+            f"{rng.choice(DIRECTIONS):>3}",
+            f"{rng.choice(STEEPNESS):>10}",
+            _maybe_missing(rng, f"{rng.uniform(4, 12):4.1f}", missing_rate),
+            _maybe_missing(rng, f"{rng.randrange(180, 330):3d}", missing_rate),
+        ]
+        lines.append(f"{t:%Y %m %d %H %M} " + " ".join(fields) + "\n")
+    return "".join(lines)
+
+
+def coops_predictions(day=END_TIME, seed=9414290):
+    """CO-OPS datagetter JSON with the high and low tides of one day"""
+    rng = random.Random(seed)
+    start = day.replace(hour=0, minute=0)
+    predictions = []
+    for i in range(4):
+        t = start + timedelta(hours=3 + 6.2 * i + rng.uniform(-0.5, 0.5))
+        high = i % 2 == 0
+        height = rng.uniform(4.5, 6.5) if high else rng.uniform(-0.5, 1.5)
+        predictions.append({"t": f"{t:%Y-%m-%d %H:%M}", "v": f"{height:.3f}", "type": "H" if high else "L"})
+    return json.dumps({"predictions": predictions})
+
+
+def mapclick_forecast(periods=14):
+    """NWS MapClick JSON (FcstType=json) with text-only forecast periods"""
+    names = [("Today", "Tonight")[i % 2] if i < 2 else f"Day {i // 2}" + (" Night" if i % 2 else "")
+             for i in range(periods)]
+    return json.dumps({
+        "time": {"startPeriodName": names},
+        "data": {"weather": ["Patchy Fog"] * periods,
+                 "text": ["W wind 10 to 15 kt. W swell 6 ft at 12 seconds."] * periods},
+    })
+
+
+def write_fixtures(root, txt_rows, spec_rows=None, tide_station="9414290"):
+    """
+    Write realtime2 files, tide predictions, the tide station's metadata and a
+    marine forecast as sf_wave.standin recordings
+
+    Args:
+        root: Fixture directory
+        txt_rows: Mapping of station ID -> .txt rows (10-minute spacing)
+        spec_rows: Mapping of station ID -> .spec rows (30-minute spacing);
+            stations without one fall back to the MapClick forecast
+        tide_station: CO-OPS station the predictions are recorded for
+    """
+    from sf_wave.standin import FixtureStore
+
+    fixtures = FixtureStore(root)
+    for seed, (station_id, rows) in enumerate(sorted(txt_rows.items())):
+        fixtures.record("ndbc", f"data/realtime2/{station_id}.txt", "",
+                        realtime2_txt(rows, seed=seed).encode())
+    for seed, (station_id, rows) in enumerate(sorted((spec_rows or {}).items())):
+        fixtures.record("ndbc", f"data/realtime2/{station_id}.spec", "",
+                        realtime2_spec(rows, seed=seed).encode())
+    day = f"{END_TIME:%Y%m%d}"
+    fixtures.record("coops", "api/prod/datagetter",
+                    f"begin_date={day}&end_date={day}&station={tide_station}&product=predictions"
+                    "&datum=MLLW&time_zone=lst_ldt&units=english&format=json&interval=hilo",
+                    coops_predictions().encode())
+    fixtures.record("coops", f"mdapi/prod/webapi/stations/{tide_station}.json", "",
+                    json.dumps({"stations": [{"id": tide_station, "timezonecorr": -8,
+                                              "observedst": True}]}).encode())
+    fixtures.record("nws", "MapClick.php", "lat=37.7749&lon=-122.4194&FcstType=json",
+                    mapclick_forecast().encode())
+
+
+# NetCDF classic type codes used by write_netcdf()
+NETCDF_DTYPES = {3: ">i2", 5: ">f4", 6: ">f8"}
+
+# Start of generated wave model runs; fixed so output is reproducible
+MODEL_RUN = datetime(2026, 10, 18, 0, 0, tzinfo=timezone.utc)
+
+
+def wave_model_fields(lats, lons, hours, land=None):
+    """
+    Analytic hs/period/direction fields on a lat/lon grid, linear in space
+
+    Bilinear interpolation reproduces a linear field exactly, so point
+    extraction can be checked against wave_model_values().
+
+    Returns:
+        {'hs', 'period', 'direction'}: (hours, lats, lons) float64 arrays,
+        NaN where `land` (lats x lons bool) is set
+    """
+    lat, lon = np.meshgrid(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64), indexing="ij")
+    fields = {name: np.stack([wave_model_values(name, lat, lon, hour) for hour in hours])
+              for name in ("hs", "period", "direction")}
+    if land is not None:
+        for values in fields.values():
+            values[:, land] = np.nan
+    return fields
+
+
+def wave_model_values(name, lat, lon, hour):
+    """Exact value of a wave_model_fields() field at any point (longitude 0..360)"""
+    lon = np.asarray(lon) % 360.0
+    if name == "hs":
+        return 1.0 + 0.02 * (np.asarray(lat) + 90) + 0.001 * lon + 0.01 * hour
+    if name == "period":
+        return 8.0 + 0.01 * lon + 0.02 * hour + 0.0 * np.asarray(lat)
+    return 200.0 + 0.1 * np.asarray(lat) + 0.05 * hour + 0.0 * lon
+
+
+def write_netcdf(path, lats, lons, hours, fields, run=MODEL_RUN):
+    """
+    Write fields as a NetCDF classic (CDF-1) file in WAVEWATCH III layout
+
+    time is the record dimension; hs is stored as scaled shorts with a
+    _FillValue, period and direction as floats with NaN fill.
+    """
+    def pad(raw):
+        return raw + b"\0" * (-len(raw) % 4)
+
+    def name(text):
+        return struct.pack(">i", len(text)) + pad(text.encode())
+
+    def attributes(items):
+        if not items:
+            return struct.pack(">ii", 0, 0)
+        out = struct.pack(">ii", 12, len(items))
+        for key, (nc_type, value) in items.items():
+            raw = value.encode() if nc_type == 2 else np.asarray([value], dtype=NETCDF_DTYPES[nc_type]).tobytes()
+            out += name(key) + struct.pack(">ii", nc_type, len(value) if nc_type == 2 else 1) + pad(raw)
+        return out
+
+    hs = fields["hs"]
+    variables = [
+        ("lat", (1,), 5, {"units": (2, "degrees_north")}, np.asarray(lats, dtype=">f4")),
+        ("lon", (2,), 5, {"units": (2, "degrees_east")}, np.asarray(lons, dtype=">f4")),
+        ("time", (0,), 6, {"units": (2, f"hours since {run:%Y-%m-%d %H:%M:%S}")},
+         np.asarray(hours, dtype=">f8")),
+        ("hs", (0, 1, 2), 3, {"scale_factor": (5, 0.002), "_FillValue": (3, -32767)},
+         np.where(np.isnan(hs), -32767, np.round(hs / 0.002)).astype(">i2")),
+        ("tp", (0, 1, 2), 5, {"_FillValue": (5, np.nan)}, fields["period"].astype(">f4")),
+        ("dp", (0, 1, 2), 5, {"_FillValue": (5, np.nan)}, fields["direction"].astype(">f4")),
+    ]
+    # Fixed-size variables first, then the records (one slab of each record variable per hour)
+    slabs = [pad((data[:1] if dims[0] == 0 else data).tobytes()) for _, dims, _, _, data in variables]
+
+    def header(begins):
+        out = b"CDF\x01" + struct.pack(">i", len(hours))
+        out += struct.pack(">ii", 10, 3) + name("time") + struct.pack(">i", 0)
+        out += name("lat") + struct.pack(">i", len(lats)) + name("lon") + struct.pack(">i", len(lons))
+        out += attributes({}) + struct.pack(">ii", 11, len(variables))
+        for (var, dims, nc_type, attrs, _), slab, begin in zip(variables, slabs, begins):
+            out += name(var) + struct.pack(">i", len(dims)) + b"".join(struct.pack(">i", d) for d in dims)
+            out += attributes(attrs) + struct.pack(">iii", nc_type, len(slab), begin)
+        return out
+
+    begins = [0] * len(variables)
+    offset = len(header(begins))
+    for record in (False, True):
+        for k, (_, dims, _, _, _) in enumerate(variables):
+            if (dims[0] == 0) == record:
+                begins[k] = offset
+                offset += len(slabs[k])
+
+    with open(path, "wb") as f:
+        f.write(header(begins))
+        for k, (_, dims, _, _, data) in enumerate(variables):
+            if dims[0] != 0:
+                f.write(slabs[k])
+        for hour in range(len(hours)):
+            for _, dims, _, _, data in variables:
+                if dims[0] == 0:
+                    f.write(pad(data[hour:hour + 1].tobytes()))
+
+
+def _grib_signed(value, bits):
+    """GRIB2 sign-magnitude encoding of a small integer"""
+    return (1 << (bits - 1)) | -value if value < 0 else value
+
+
+def write_grib2(path, lats, lons, hours, fields, run=MODEL_RUN, decimal_scale=2):
+    """
+    Write fields as GRIB2 with simple packing, one message per field and hour
+
+    Regular lat/lon grid (template 3.0) scanned from the first latitude;
+    NaN cells are left out of the packed data through a bitmap.
+    """
+    codes = {"hs": 3, "period": 11, "direction": 10}
+    la1, la2 = lats[0], lats[-1]
+    scanning = 0x40 if la2 > la1 else 0x00
+    di = abs(lons[1] - lons[0])
+    dj = abs(lats[1] - lats[0])
+    npoints = len(lats) * len(lons)
+
+    section1 = struct.pack(">IBHHBBBHBBBBBBB", 21, 1, 7, 0, 2, 1, 1,
+                           run.year, run.month, run.day, run.hour, run.minute, run.second, 0, 1)
+    section3 = struct.pack(">IBBIBBH", 72, 3, 0, npoints, 0, 0, 0)
+    section3 += struct.pack(">BBIBIBI", 6, 0, 0, 0, 0, 0, 0)
+    section3 += struct.pack(">IIII", len(lons), len(lats), 0, 0xFFFFFFFF)
+    section3 += struct.pack(">IIBIIIIB", _grib_signed(round(la1 * 1e6), 32), round(lons[0] % 360 * 1e6), 48,
+                            _grib_signed(round(la2 * 1e6), 32), round(lons[-1] % 360 * 1e6),
+                            round(di * 1e6), round(dj * 1e6), scanning)
+
+    with open(path, "wb") as f:
+        for h, hour in enumerate(hours):
+            for name, number in codes.items():
+                values = fields[name][h].reshape(-1)
+                present = ~np.isnan(values)
+                scaled = np.round(values[present] * 10 ** decimal_scale).astype(np.int64)
+                reference = int(scaled.min()) if len(scaled) else 0
+                packed = scaled - reference
+                bits = max(int(packed.max()).bit_length(), 1) if len(packed) else 0
+                bitstream = ((packed[:, None] >> np.arange(bits - 1, -1, -1)) & 1).astype(np.uint8)
+                data = np.packbits(bitstream.reshape(-1)).tobytes()
+
+                section4 = struct.pack(">IBHHBBBBBHBBIBBIBBI", 34, 4, 0, 0, 0, number, 2, 0, 0, 0, 0,
+                                       1, int(hour), 1, 0, 0, 255, 0, 0)
+                section5 = struct.pack(">IBIHfHHBB", 21, 5, int(present.sum()), 0, float(reference),
+                                       0, _grib_signed(decimal_scale, 16), bits, 0)
+                bitmap = np.packbits(present).tobytes()
+                section6 = struct.pack(">IBB", 6 + len(bitmap), 6, 0) + bitmap
+                section7 = struct.pack(">IB", 5 + len(data), 7) + data
+                body = section1 + section3 + section4 + section5 + section6 + section7 + b"7777"
+                f.write(b"GRIB" + struct.pack(">HBBQ", 0, 10, 2, 16 + len(body)) + body)
@@ -0,0 +1,3 @@
+"""
+Shared building blocks for the San Francisco wave and tide forecast scripts
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from sf_wave.cli import main
+
+sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Memory-mapped binary archive for multi-year buoy history
+
+Each station and realtime2 file kind gets a directory holding one
+fixed-width column file per field (little-endian float32, NaN for missing)
+and a sorted int64 epoch index:
+
+    {root}/{station}/{ext}/epoch.i8
+    {root}/{station}/{ext}/WVHT.f4
+    ...
+
+Readers open the files with numpy.memmap and answer [start, end) range
+queries by binary search on the epoch index, then slice only the requested
+columns. Only the pages holding the matching rows (plus the handful touched
+by the search) are ever read, so a query over ten years of history costs
+the same as one over a day.
+
+Rows come in as sf_wave.columnar.parse_realtime2() output (from realtime2
+or NDBC historical files), sf_wave.store records, or the Observation /
+SpectralReading records built by the scripts' parse_buoy_data and
+parse_spectral_data.
+"""
+
+import fcntl
+import gzip
+import os
+
+import numpy as np
+
+from sf_wave.columnar import parse_realtime2
+from sf_wave.records import Observation, SpectralReading
+from sf_wave.store import SCHEMAS, record_dtype, to_records
+
+# Where archives live (override with SF_WAVE_ARCHIVE_DIR)
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "archive")
+
+EPOCH_FILE = "epoch.i8"
+COLUMN_SUFFIX = ".f4"
+
+
+def records_from_objects(objects, ext):
+    """Convert Observation/SpectralReading objects into store records"""
+    record_class = Observation if ext == "txt" else SpectralReading
+    columns = {"epoch": np.array([item.time for item in objects], dtype=np.int64)}
+    for column, attribute in record_class.COLUMNS.items():
+        columns[column] = np.array([getattr(item, attribute) for item in objects], dtype=np.float32)
+    for column, attribute in getattr(record_class, "TEXT_COLUMNS", {}).items():
+        columns[column] = np.array([getattr(item, attribute) or "" for item in objects])
+    return to_records(columns, ext)
+
+
+def _as_records(rows, ext):
+    """Normalise any supported row source into store records"""
+    if isinstance(rows, np.ndarray) and rows.dtype.names:
+        return np.asarray(rows, dtype=record_dtype(ext))
+    if isinstance(rows, dict):
+        return to_records(rows, ext)
+    return records_from_objects(list(rows), ext)
+
+
+class Archive:
+    """Column-per-file, memory-mapped archive of station history"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("SF_WAVE_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+    def directory(self, station_id, ext):
+        return os.path.join(self.root, str(station_id), ext)
+
+    def fields(self, station_id, ext):
+        """Column names available for a station"""
+        directory = self.directory(station_id, ext)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(COLUMN_SUFFIX)] for name in os.listdir(directory)
+                      if name.endswith(COLUMN_SUFFIX))
+
+    def _epochs(self, station_id, ext):
+        """Memory-mapped epoch index (None if the archive is empty)"""
+        path = os.path.join(self.directory(station_id, ext), EPOCH_FILE)
+        try:
+            count = os.path.getsize(path) // 8
+        except OSError:
+            return None
+        if not count:
+            return None
+        return np.memmap(path, dtype="<i8", mode="r", shape=(count,))
+
+    def count(self, station_id, ext):
+        epochs = self._epochs(station_id, ext)
+        return 0 if epochs is None else len(epochs)
+
+    def append(self, station_id, ext, rows):
+        """
+        Append rows newer than the end of the archive
+
+        Args:
+            station_id: NDBC station ID
+            ext: realtime2 file kind ("txt" or "spec")
+            rows: parse_realtime2() columns, store records, or a list of
+                Observation/SpectralReading objects, in any order
+
+        Returns:
+            Number of rows appended
+        """
+        records = _as_records(rows, ext)
+        directory = self.directory(station_id, ext)
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            epochs = self._epochs(station_id, ext)
+            count = 0 if epochs is None else len(epochs)
+            if count:
+                records = records[records["epoch"] > epochs[-1]]
+            _, first = np.unique(records["epoch"], return_index=True)
+            records = records[first]
+            if not len(records):
+                return 0
+
+            # Columns first, index last: the epoch file's length defines how
+            # many rows are valid, so a crash mid-append never exposes a
+            # partially written row
+            for name in SCHEMAS[ext]:
+                path = os.path.join(directory, name + COLUMN_SUFFIX)
+                with open(path, "ab") as f:
+                    # Trim leftovers of an interrupted append before adding rows;
+                    # rows a column never had (e.g. one new to the schema) are
+                    # padded with NaN, since truncate() would extend with zeros
+                    kept = min(os.fstat(f.fileno()).st_size // 4, count)
+                    f.truncate(kept * 4)
+                    f.write(np.full(count - kept, np.nan, dtype="<f4").tobytes())
+                    f.write(records[name].astype("<f4").tobytes())
+            with open(os.path.join(directory, EPOCH_FILE), "ab") as f:
+                f.write(records["epoch"].astype("<i8").tobytes())
+            return len(records)
+
+    def query(self, station_id, ext, start=None, end=None, fields=None):
+        """
+        Rows with start <= epoch < end, oldest first
+
+        Args:
+            station_id: NDBC station ID
+            ext: realtime2 file kind ("txt" or "spec")
+            start, end: UTC epoch seconds bounds (None for open-ended)
+            fields: Columns to return (default: all)
+
+        Returns:
+            Dictionary of 'epoch' and each field -> array views into the
+            memory-mapped files (copy them to keep them past file changes)
+        """
+        epochs = self._epochs(station_id, ext)
+        fields = list(fields or self.fields(station_id, ext))
+        if epochs is None:
+            result = {"epoch": np.empty(0, dtype=np.int64)}
+            result.update({name: np.empty(0, dtype=np.float32) for name in fields})
+            return result
+
+        lo = 0 if start is None else int(np.searchsorted(epochs, start, side="left"))
+        hi = len(epochs) if end is None else int(np.searchsorted(epochs, end, side="left"))
+        result = {"epoch": epochs[lo:hi]}
+        directory = self.directory(station_id, ext)
+        for name in fields:
+            column = np.memmap(os.path.join(directory, name + COLUMN_SUFFIX),
+                               dtype="<f4", mode="r", shape=(len(epochs),))
+            result[name] = column[lo:hi]
+        return result
+
+
+def read_history_file(path):
+    """Read a realtime2 or NDBC historical (optionally .gz) file into columns"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        return parse_realtime2(f.read())
+
+
+def main(argv=None):
+    """Import realtime2/historical files or the local store into the archive"""
+    import argparse
+
+    from sf_wave.rollup import Rollups
+    from sf_wave.store import TimeSeriesStore
+
+    parser = argparse.ArgumentParser(description="Build the memory-mapped history archive")
+    parser.add_argument("station", help="NDBC station ID")
+    parser.add_argument("ext", choices=sorted(SCHEMAS), help="realtime2 file kind")
+    parser.add_argument("files", nargs="*",
+                        help="realtime2 or historical files to import (default: the local store)")
+    parser.add_argument("--root", help=f"Archive directory (default: {DEFAULT_ARCHIVE_DIR})")
+    args = parser.parse_args(argv)
+
+    archive = Archive(args.root)
+    if args.files:
+        # Merge every file before appending so they can be given in any order
+        records = np.concatenate([to_records(read_history_file(path), args.ext)
+                                  for path in args.files])
+        added = archive.append(args.station, args.ext, records)
+        print(f"{len(args.files)} files: {added} rows")
+    else:
+        added = archive.append(args.station, args.ext,
+                               TimeSeriesStore().read(args.station, args.ext))
+        print(f"store: {added} rows")
+    print(f"{args.station}.{args.ext}: {archive.count(args.station, args.ext)} rows archived")
+    # Keep the chart rollups in step with the merged history
+    buckets = Rollups(source=archive).update(args.station, args.ext)
+    print(f"{args.station}.{args.ext}: {buckets} hourly rollup buckets updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Batch export of many stations as NDJSON, CSV or msgpack
+
+The scripts print human-readable text for a person at a terminal, and
+pipelines that scrape it break whenever a label changes. This command reads
+station IDs from a file or stdin and writes one machine-readable record per
+observation or spectral reading:
+
+    python -m sf_wave.batch stations.txt --format ndjson > latest.ndjson
+    cat stations.txt | python -m sf_wave.batch --format csv --rows 0 > history.csv
+
+Records are written as soon as each station's files arrive, through a single
+buffered binary writer. Only a bounded window of stations is in flight at
+once, so hundreds of stations are exported without holding every result in
+memory. Every record carries the station ID and a kind ("observation" for
+.txt rows, "reading" for .spec rows) followed by the record's fields, with
+times as UTC epoch seconds and missing values as null (empty in CSV).
+
+msgpack output needs the optional msgpack package (pip install msgpack).
+"""
+
+import contextlib
+import csv
+import io
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sf_wave.ndbc import fetch_realtime2
+from sf_wave.records import Observation, SpectralReading, record_dict, records_from_text
+from sf_wave.session import DEFAULT_CONNECTIONS_PER_HOST, get_session
+
+# Output formats understood by open_writer()
+FORMATS = ("ndjson", "csv", "msgpack")
+
+# Newest rows exported per station and file by default (0 exports the whole file)
+DEFAULT_ROWS = 5
+
+# Size of the output buffer (bytes)
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+# Stations in flight per pooled connection; bounds memory for long station lists
+WINDOW_PER_CONNECTION = 2
+
+# realtime2 file kind -> (record kind, record class)
+RECORD_TYPES = {
+    "txt": ("observation", Observation),
+    "spec": ("reading", SpectralReading),
+}
+
+# CSV columns: station and kind, then the union of every record class's fields
+FIELDS = list(dict.fromkeys(
+    ["station", "kind"]
+    + [name for _, record_class in RECORD_TYPES.values() for name in record_class.__slots__]))
+
+
+def read_station_ids(lines):
+    """
+    Station IDs from lines of text, one or more per line
+
+    Blank lines and anything after '#' are ignored, and repeated IDs are
+    yielded only once.
+    """
+    seen = set()
+    for line in lines:
+        for station_id in line.split("#", 1)[0].replace(",", " ").split():
+            station_id = station_id.upper()
+            if station_id not in seen:
+                seen.add(station_id)
+                yield station_id
+
+
+def fetch_station_records(station_id, extensions=("txt", "spec"), rows=DEFAULT_ROWS,
+                          session=None, catalog=None):
+    """
+    Fetch one station's realtime2 files and flatten them into plain dictionaries
+
+    Args:
+        station_id: NDBC station ID
+        extensions: realtime2 file kinds to export ("txt", "spec")
+        rows: Newest rows per file (0 or None for the whole file)
+        session: Session to use (default: the shared pooled session)
+        catalog: Optional StationCatalog used to skip files a station does not publish
+
+    Returns:
+        List of record dictionaries (see FIELDS)
+    """
+    records = []
+    for ext in extensions:
+        if catalog is not None and catalog.has_product(station_id, ext) is False:
+            continue
+        kind, record_class = RECORD_TYPES[ext]
+        data_text = fetch_realtime2(station_id, ext, session=session, latest_rows=rows or None)
+        if data_text is None:
+            continue
+        for record in records_from_text(data_text, record_class, rows):
+            records.append(dict({"station": station_id, "kind": kind}, **record_dict(record)))
+    return records
+
+
+def iter_records(station_ids, extensions=("txt", "spec"), rows=DEFAULT_ROWS,
+                 connections_per_host=DEFAULT_CONNECTIONS_PER_HOST, catalog=None):
+    """
+    Yield each station's record dictionaries as soon as its files arrive
+
+    At most connections_per_host * WINDOW_PER_CONNECTION stations are fetched
+    or waiting to be consumed at any time; the rest of station_ids is only read
+    as slots free up, so it may be a lazy iterator.
+
+    Yields:
+        (station ID, list of record dictionaries) in completion order
+    """
+    session = get_session(connections_per_host)
+    window = connections_per_host * WINDOW_PER_CONNECTION
+    station_ids = iter(station_ids)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=connections_per_host) as pool:
+        while True:
+            for station_id in station_ids:
+                in_flight[pool.submit(fetch_station_records, station_id, extensions, rows,
+                                      session, catalog)] = station_id
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                station_id = in_flight.pop(future)
+                try:
+                    yield station_id, future.result()
+                except Exception as e:
+                    print(f"Error exporting {station_id}: {e}")
+                    yield station_id, []
+
+
+class NdjsonWriter:
+    """One compact JSON object per line"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+
+    def close(self):
+        self.stream.flush()
+
+
+class CsvWriter:
+    """CSV with a header row of FIELDS; missing values are left empty"""
+
+    def __init__(self, stream):
+        self.text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.text, FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+    def close(self):
+        self.text.flush()
+        # Hand the binary stream back to its owner instead of closing it
+        self.text.detach()
+
+
+class MsgpackWriter:
+    """A stream of msgpack maps, one per record"""
+
+    def __init__(self, stream):
+        try:
+            import msgpack
+        except ImportError:
+            raise RuntimeError("msgpack output needs the msgpack package (pip install msgpack)")
+        self.stream = stream
+        self.packer = msgpack.Packer()
+
+    def write(self, record):
+        self.stream.write(self.packer.pack(record))
+
+    def close(self):
+        self.stream.flush()
+
+
+WRITERS = {"ndjson": NdjsonWriter, "csv": CsvWriter, "msgpack": MsgpackWriter}
+
+
+def open_writer(output_format, stream):
+    """Record writer for one of FORMATS on a binary stream"""
+    return WRITERS[output_format](stream)
+
+
+def export(station_ids, writer, extensions=("txt", "spec"), rows=DEFAULT_ROWS,
+           connections_per_host=DEFAULT_CONNECTIONS_PER_HOST, catalog=None):
+    """
+    Stream the records of many stations into a writer
+
+    Returns:
+        (stations exported, records written)
+    """
+    stations = written = 0
+    for _, records in iter_records(station_ids, extensions, rows, connections_per_host, catalog):
+        stations += 1
+        for record in records:
+            writer.write(record)
+        written += len(records)
+    return stations, written
+
+
+def main(argv=None):
+    """Export stations listed in a file (or stdin) as NDJSON, CSV or msgpack"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export buoy observations for many stations")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="File of station IDs, one per line (default: stdin)")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson",
+                        help="Output format (default: ndjson)")
+    parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--ext", action="append", choices=sorted(RECORD_TYPES),
+                        help="realtime2 file kinds to export (default: txt and spec)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help=f"Newest rows per station and file, 0 for all (default: {DEFAULT_ROWS})")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS_PER_HOST,
+                        help=f"Keep-alive connections to NDBC (default: {DEFAULT_CONNECTIONS_PER_HOST})")
+    args = parser.parse_args(argv)
+
+    from sf_wave.catalog import load_catalog
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    if args.output == "-":
+        stream = io.BufferedWriter(sys.stdout.buffer.raw if hasattr(sys.stdout.buffer, "raw")
+                                   else sys.stdout.buffer, WRITE_BUFFER_BYTES)
+    else:
+        stream = open(args.output, "wb", buffering=WRITE_BUFFER_BYTES)
+
+    try:
+        writer = open_writer(args.format, stream)
+        # Fetch errors are printed; keep them out of the records on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            stations, written = export(read_station_ids(source), writer, args.ext or list(RECORD_TYPES),
+                                       args.rows, args.connections, load_catalog(refresh=False))
+        writer.close()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        stream.flush()
+        if source is not sys.stdin:
+            source.close()
+        if args.output != "-":
+            stream.close()
+    print(f"{stations} stations, {written} records", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Persistent on-disk HTTP cache with conditional GET
+
+NDBC only publishes new realtime2 rows every 10-60 minutes and tide
+predictions never change, yet every run used to download the full files.
+Responses are now stored on disk keyed by URL together with their ETag and
+Last-Modified headers. A cached entry is served directly while it is younger
+than its endpoint's freshness TTL; after that the request is revalidated with
+If-None-Match/If-Modified-Since and a 304 is answered from disk. The least
+recently used entries are evicted once the cache grows past its size cap.
+Each process keeps a running total of the bytes it has cached (counted from
+disk on its first write), so the directory is only listed again when that
+total passes the cap, and eviction then frees a little more than needed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from sf_wave.config import base_url
+from sf_wave.session import get_session
+
+# Where cached responses live (override with SF_WAVE_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sf_wave", "http")
+
+# Total size of cached bodies before LRU eviction kicks in (override with SF_WAVE_CACHE_MAX_BYTES)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Eviction frees space down to this fraction of the cap, so a full cache is not rescanned on every write
+EVICT_FRACTION = 0.9
+
+# Freshness TTL in seconds per endpoint; the first matching URL prefix wins
+ENDPOINT_TTLS = [
+    (base_url("ndbc") + "/data/realtime2/", 60),
+    (base_url("coops") + "/", 30 * 60),
+    (base_url("nws") + "/", 15 * 60),
+]
+
+# TTL for any other URL: always revalidate
+DEFAULT_TTL = 0
+
+
+def endpoint_ttl(url):
+    """Return the freshness TTL (seconds) configured for a URL"""
+    for prefix, ttl in ENDPOINT_TTLS:
+        if url.startswith(prefix):
+            return ttl
+    return DEFAULT_TTL
+
+
+class CachedResponse:
+    """
+    A response answered from disk
+
+    Offers the parts of requests.Response the callers use (status_code,
+    headers, content, text, json()) without importing requests, which is
+    most of the startup time of a run served entirely from the cache.
+    """
+
+    status_code = 200
+    ok = True
+    from_cache = True
+
+    def __init__(self, url, body, content_type):
+        self.url = url
+        self.content = body
+        self.headers = {"Content-Type": content_type or ""}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+    def raise_for_status(self):
+        pass
+
+
+class HTTPCache:
+    """On-disk response cache keyed by URL"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get("SF_WAVE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = int(max_bytes or os.environ.get("SF_WAVE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self._lock = threading.Lock()
+        # Bytes of cached bodies, or None until this process first writes
+        self._total = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load(self, url):
+        """Return (metadata, body) for a cached URL, or (None, None)"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        if meta.get("url") != url or meta.get("size") != len(body):
+            return None, None
+        # Touch the metadata file so its mtime tracks the last access (LRU order)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def entry(self, url):
+        """Return (metadata, body) for a cached URL, or (None, None)"""
+        return self._load(url)
+
+    def store(self, url, body, headers, meta=None, write_body=True):
+        """Save a body fetched outside get() (e.g. by Range requests) with its validators"""
+        return self._store(url, body, headers, meta, write_body)
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store(self, url, body, headers, meta=None, write_body=True):
+        """Write a response body (unless only revalidated) and its validators to disk"""
+        meta_path, body_path = self._paths(url)
+        meta = dict(meta or {})
+        meta.update({
+            "url": url,
+            "size": len(body),
+            "fetched_at": time.time(),
+            "etag": headers.get("ETag", meta.get("etag")),
+            "last_modified": headers.get("Last-Modified", meta.get("last_modified")),
+            "content_type": headers.get("Content-Type", meta.get("content_type")),
+        })
+        added = 0
+        if write_body:
+            try:
+                added = -os.path.getsize(body_path)
+            except OSError:
+                pass
+            self._write_atomic(body_path, body)
+            added += len(body)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        self._account(added)
+        return meta
+
+    def _account(self, added):
+        """Add to the running byte total and evict only once it passes max_bytes"""
+        with self._lock:
+            if self._total is None:
+                # First write of this process: count what is on disk, this body included
+                self._total = self._scan()[1]
+            else:
+                self._total += added
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def _scan(self):
+        """List every entry as (last access, size, metadata path, body path), plus their total size"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            body_path = meta_path[:-len(".json")] + ".body"
+            try:
+                size = os.path.getsize(body_path)
+                atime = os.path.getmtime(meta_path)
+            except OSError:
+                continue
+            entries.append((atime, size, meta_path, body_path))
+            total += size
+        return entries, total
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in EVICT_FRACTION of max_bytes"""
+        with self._lock:
+            entries, total = self._scan()
+            entries.sort()
+            for atime, size, meta_path, body_path in entries:
+                if total <= self.max_bytes * EVICT_FRACTION:
+                    break
+                for path in (meta_path, body_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+            self._total = total
+
+    def get(self, url, session=None, ttl=None, **kwargs):
+        """
+        GET a URL through the cache
+
+        Args:
+            url: URL to fetch
+            session: Session to use for the network request (default: shared session)
+            ttl: Freshness TTL in seconds (default: endpoint_ttl(url))
+            **kwargs: Passed on to session.get (e.g. timeout)
+
+        Returns:
+            A requests.Response, or a CachedResponse (from_cache=True) for
+            responses served from disk
+        """
+        ttl = endpoint_ttl(url) if ttl is None else ttl
+        meta, body = self._load(url)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta is not None:
+            if time.time() - meta["fetched_at"] < ttl:
+                return CachedResponse(url, body, meta.get("content_type"))
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = (session or get_session()).get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            meta = self._store(url, body, response.headers, meta, write_body=False)
+            return CachedResponse(url, body, meta.get("content_type"))
+
+        if response.status_code == 200:
+            self._store(url, response.content, response.headers)
+        response.from_cache = False
+        return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide HTTP cache, creating it on first use"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
+
+
+def cached_get(url, session=None, ttl=None, **kwargs):
+    """GET a URL through the shared on-disk cache (see HTTPCache.get)"""
+    if os.environ.get("SF_WAVE_NO_CACHE"):
+        response = (session or get_session()).get(url, **kwargs)
+        response.from_cache = False
+        return response
+    return get_cache().get(url, session=session, ttl=ttl, **kwargs)
@@ -0,0 +1,339 @@
+"""
+NDBC station catalog built from activestations.xml
+
+Station metadata used to be typed in by hand (SF_BUOYS). NDBC publishes every
+active station in activestations.xml; this module streams that file through
+ElementTree.iterparse (clearing each element as soon as it is read) into one
+NumPy structured array: id, name, lat/lon, type and a bitmask of the data
+products the station publishes. The realtime2 directory listing adds which
+realtime2 files (.txt, .spec, .data_spec, ...) exist for each station, so
+callers can drop stations without e.g. a .spec file before making any
+requests.
+
+The table is saved as a single .npy file (plus a small JSON sidecar with the
+upstream ETag/Last-Modified validators), which np.load reads back in well
+under a millisecond. Once the cache is older than CATALOG_MAX_AGE the
+upstream files are revalidated with conditional GETs and only re-parsed if
+they changed.
+"""
+
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from sf_wave.config import base_url
+from sf_wave.session import get_session
+
+ACTIVE_STATIONS_URL = base_url("ndbc") + "/activestations.xml"
+REALTIME2_LISTING_URL = base_url("ndbc") + "/data/realtime2/"
+
+# Where the catalog cache lives (override with SF_WAVE_CATALOG_DIR)
+DEFAULT_CATALOG_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sf_wave", "catalog")
+
+# Seconds before a cached catalog is revalidated against NDBC
+CATALOG_MAX_AGE = 24 * 60 * 60
+
+# Data products, one bit each: activestations.xml flags, then realtime2 file extensions
+XML_PRODUCTS = ("met", "currents", "waterquality", "dart")
+REALTIME2_PRODUCTS = ("txt", "spec", "data_spec", "swdir", "swdir2", "swr1", "swr2", "ocean",
+                      "cwind", "supl", "srad", "rain", "adcp", "adcp2", "hkp", "drift", "dart")
+PRODUCTS = XML_PRODUCTS + tuple("realtime2." + ext for ext in REALTIME2_PRODUCTS)
+PRODUCT_BITS = {name: 1 << bit for bit, name in enumerate(PRODUCTS)}
+
+# Realtime2 files are listed as <a href="46026.spec">
+LISTING_PATTERN = re.compile(r'href="([A-Za-z0-9]+)\.([a-z0-9_]+)"')
+
+
+def product_bit(product):
+    """Bit for a product name; bare realtime2 extensions such as 'spec' are accepted"""
+    if product in PRODUCT_BITS:
+        return PRODUCT_BITS[product]
+    return PRODUCT_BITS["realtime2." + product]
+
+
+def parse_active_stations(source):
+    """
+    Stream activestations.xml into a list of station tuples
+
+    Args:
+        source: File name or binary file object
+
+    Returns:
+        List of (id, name, lat, lon, type, products) tuples
+    """
+    stations = []
+    for _, element in ET.iterparse(source, events=("end",)):
+        if element.tag != "station":
+            continue
+        attributes = element.attrib
+        products = 0
+        for name in XML_PRODUCTS:
+            if attributes.get(name) == "y":
+                products |= PRODUCT_BITS[name]
+        try:
+            lat, lon = float(attributes["lat"]), float(attributes["lon"])
+        except (KeyError, ValueError):
+            lat = lon = np.nan
+        stations.append((attributes.get("id", "").upper(), attributes.get("name", ""), lat, lon,
+                         attributes.get("type", ""), products))
+        element.clear()
+    return stations
+
+
+def parse_realtime2_listing(html):
+    """Map station ID -> product bits from the realtime2 directory listing"""
+    products = {}
+    for station_id, ext in LISTING_PATTERN.findall(html):
+        bit = PRODUCT_BITS.get("realtime2." + ext)
+        if bit:
+            products[station_id.upper()] = products.get(station_id.upper(), 0) | bit
+    return products
+
+
+def build_table(stations, realtime2_products=None):
+    """Pack station tuples (and realtime2 product bits) into a structured array"""
+    realtime2_products = realtime2_products or {}
+    id_width = max([len(s[0]) for s in stations] + [1])
+    name_width = max([len(s[1].encode("utf-8")) for s in stations] + [1])
+    type_width = max([len(s[4]) for s in stations] + [1])
+    dtype = np.dtype([("id", f"S{id_width}"), ("name", f"S{name_width}"), ("lat", "<f4"),
+                      ("lon", "<f4"), ("type", f"S{type_width}"), ("products", "<u4")])
+
+    table = np.empty(len(stations), dtype=dtype)
+    for i, (station_id, name, lat, lon, kind, products) in enumerate(stations):
+        table[i] = (station_id.encode("ascii", "replace"), name.encode("utf-8"), lat, lon,
+                    kind.encode("ascii", "replace"), products | realtime2_products.get(station_id, 0))
+    return np.sort(table, order="id")
+
+
+class StationCatalog:
+    """Array-backed table of NDBC stations, sorted by ID"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def ids(self):
+        return self.table["id"].astype(str)
+
+    def _find(self, station_id):
+        key = str(station_id).upper().encode("ascii", "replace")
+        i = int(np.searchsorted(self.table["id"], key))
+        if i < len(self.table) and self.table["id"][i] == key:
+            return i
+        return None
+
+    def __contains__(self, station_id):
+        return self._find(station_id) is not None
+
+    def station(self, station_id):
+        """
+        One station as a dictionary shaped like the SF_BUOYS entries
+
+        Returns:
+            {'id', 'name', 'lat', 'lon', 'type', 'products'}, or None if unknown
+        """
+        i = self._find(station_id)
+        if i is None:
+            return None
+        row = self.table[i]
+        return {
+            "id": row["id"].decode("ascii"),
+            "name": row["name"].decode("utf-8", "replace"),
+            "lat": round(float(row["lat"]), 4),
+            "lon": round(float(row["lon"]), 4),
+            "type": row["type"].decode("ascii"),
+            "products": [name for name, bit in PRODUCT_BITS.items() if row["products"] & bit],
+        }
+
+    def has_product(self, station_id, product):
+        """True if the station publishes a product; None if the station is not in the catalog"""
+        i = self._find(station_id)
+        if i is None:
+            return None
+        return bool(self.table["products"][i] & product_bit(product))
+
+    def with_products(self, *products):
+        """Catalog of the stations publishing every given product (e.g. 'spec')"""
+        mask = 0
+        for product in products:
+            mask |= product_bit(product)
+        return StationCatalog(self.table[(self.table["products"] & mask) == mask])
+
+    def of_type(self, *types):
+        """Catalog of the stations of the given types (e.g. 'buoy')"""
+        wanted = np.array([kind.encode("ascii") for kind in types])
+        return StationCatalog(self.table[np.isin(self.table["type"], wanted)])
+
+    def spatial_index(self):
+        """StationIndex over the stations that have coordinates"""
+        from sf_wave.spatial import StationIndex
+
+        located = self.table[~np.isnan(self.table["lat"])]
+        return StationIndex(located["id"].astype(str), located["lat"], located["lon"])
+
+
+class CatalogCache:
+    """The catalog's .npy table and the validators of the upstream files it was built from"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("SF_WAVE_CATALOG_DIR", DEFAULT_CATALOG_DIR)
+        self.table_path = os.path.join(self.root, "stations.npy")
+        self.meta_path = os.path.join(self.root, "stations.json")
+
+    def load(self):
+        """(StationCatalog, metadata), or (None, {}) if nothing is cached"""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            table = np.load(self.table_path)
+        except (OSError, ValueError):
+            return None, {}
+        return StationCatalog(table), meta
+
+    def save(self, table, meta):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.table_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, table)
+        os.replace(tmp_path, self.table_path)
+        self.touch(meta)
+
+    def touch(self, meta):
+        """Record a successful check of the upstream files"""
+        os.makedirs(self.root, exist_ok=True)
+        meta = dict(meta, checked=time.time())
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+
+def _conditional_get(session, url, validators):
+    """GET a URL with If-None-Match/If-Modified-Since from saved validators"""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return session.get(url, headers=headers, timeout=30, stream=True)
+
+
+def _validators(response):
+    return {"etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")}
+
+
+def refresh_catalog(cache=None, session=None, force=False):
+    """
+    Revalidate the cached catalog against NDBC and rebuild it if either file changed
+
+    Returns:
+        StationCatalog (the cached one if nothing changed or the request
+        failed), or None if there is no catalog at all
+    """
+    cache = cache or CatalogCache()
+    session = session or get_session()
+    catalog, meta = cache.load()
+    if force:
+        meta = {}
+
+    try:
+        stations_response = _conditional_get(session, ACTIVE_STATIONS_URL, meta.get("stations", {}))
+        listing_response = _conditional_get(session, REALTIME2_LISTING_URL, meta.get("listing", {}))
+        statuses = (stations_response.status_code, listing_response.status_code)
+        if catalog is not None and statuses == (304, 304):
+            stations_response.close()
+            listing_response.close()
+            cache.touch(meta)
+            return catalog
+        if any(status not in (200, 304) for status in statuses):
+            print(f"Error fetching station catalog: HTTP {statuses}")
+            return catalog
+
+        # A 304 for one file still needs its content to rebuild, so refetch it in full
+        if stations_response.status_code == 304:
+            stations_response = session.get(ACTIVE_STATIONS_URL, timeout=30, stream=True)
+        if listing_response.status_code == 304:
+            listing_response = session.get(REALTIME2_LISTING_URL, timeout=30)
+
+        stations_response.raw.decode_content = True
+        stations = parse_active_stations(stations_response.raw)
+        table = build_table(stations, parse_realtime2_listing(listing_response.text))
+    except Exception as e:
+        print(f"Error fetching station catalog: {e}")
+        return catalog
+
+    cache.save(table, {"stations": _validators(stations_response),
+                       "listing": _validators(listing_response)})
+    return StationCatalog(table)
+
+
+def load_catalog(refresh=None, cache=None, session=None):
+    """
+    Load the station catalog
+
+    Args:
+        refresh: True to revalidate now, False to only use the local cache,
+            None (default) to revalidate once it is older than CATALOG_MAX_AGE
+        cache: CatalogCache to use (default: the on-disk cache)
+        session: requests session for the refresh
+
+    Returns:
+        StationCatalog, or None if none is cached and it could not be fetched
+    """
+    cache = cache or CatalogCache()
+    catalog, meta = cache.load()
+    if refresh is False:
+        return catalog
+    if refresh is None and catalog is not None and time.time() - meta.get("checked", 0) < CATALOG_MAX_AGE:
+        return catalog
+    return refresh_catalog(cache, session)
+
+
+def main(argv=None):
+    """Refresh the station catalog, list stations, or find the nearest ones"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NDBC station catalog")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate against NDBC now")
+    parser.add_argument("--product", action="append", default=[],
+                        help="Only stations publishing this product (e.g. spec, met)")
+    parser.add_argument("--type", action="append", default=[], help="Only stations of this type (e.g. buoy)")
+    parser.add_argument("--near", metavar="LAT,LON", help="List the stations nearest to a point")
+    parser.add_argument("-k", type=int, default=5, help="Number of stations for --near (default: 5)")
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(refresh=True if args.refresh else None)
+    if catalog is None:
+        print("No station catalog available.")
+        return
+    if args.product:
+        catalog = catalog.with_products(*args.product)
+    if args.type:
+        catalog = catalog.of_type(*args.type)
+
+    if args.near:
+        lat, lon = (float(value) for value in args.near.split(","))
+        index = catalog.spatial_index()
+        stations, distances = index.nearest(lat, lon, args.k)
+        for station, distance in zip(stations[0], distances[0]):
+            if station >= 0:
+                info = catalog.station(index.ids[station])
+                print(f"{info['id']:>6}  {distance:7.1f} km  {info['name']}")
+        return
+
+    for station_id in catalog.ids:
+        info = catalog.station(station_id)
+        print(f"{info['id']:>6}  {info['lat']:8.3f} {info['lon']:9.3f}  {info['type']:<8} {info['name']}")
+    print(f"{len(catalog)} stations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Single entry point for every sf_wave command
+
+    python -m sf_wave                      # same as `forecast`
+    python -m sf_wave tides 46026 46237    # conditions, readings and tides
+    python -m sf_wave minimal              # compact report, served from the cache
+    python -m sf_wave serve --port 8080    # any module command (see MODULE_COMMANDS)
+
+The forecast commands replace the five sf_wave_forecast*.py scripts, which
+are now thin wrappers around them. Module commands are imported only when
+chosen, so `python -m sf_wave minimal` never loads the server, NumPy or
+(when the cache is fresh) requests.
+"""
+
+import sys
+
+# The five report variants; the scripts they replace are noted in each help line
+COMMANDS = {
+    "forecast": "Conditions and recent readings (sf_wave_forecast.py)",
+    "tides": "Conditions, recent readings and tides (sf_wave_forecast_with_tides.py)",
+    "simple": "Compact report for the default buoy (sf_wave_forecast_simple.py)",
+    "minimal": "Compact report fetched one file at a time (sf_wave_forecast_minimal.py)",
+    "minimal-tides": "Compact report with today's tides (sf_wave_forecast_minimal_with_tides.py)",
+}
+
+# Command used when the first argument is not a command name
+DEFAULT_COMMAND = "forecast"
+
+# Subcommands that hand the remaining arguments to a module's own main()
+MODULE_COMMANDS = {
+    "archive": "sf_wave.archive",
+    "batch": "sf_wave.batch",
+    "catalog": "sf_wave.catalog",
+    "daemon": "sf_wave.daemon",
+    "harmonics": "sf_wave.harmonics",
+    "model": "sf_wave.gridded",
+    "nowcast": "sf_wave.nowcast",
+    "partition": "sf_wave.partition",
+    "rolling": "sf_wave.rolling",
+    "rollup": "sf_wave.rollup",
+    "serve": "sf_wave.server",
+    "spectra": "sf_wave.spectra",
+    "standin": "sf_wave.standin",
+    "store": "sf_wave.store",
+    "tide-range": "sf_wave.tides",
+}
+
+
+def build_parser():
+    """Argument parser for the report commands"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m sf_wave", description="San Francisco wave and tide forecast",
+        epilog=f"Other commands: {', '.join(MODULE_COMMANDS)} (see `<command> --help`)")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    for name, description in COMMANDS.items():
+        command = subparsers.add_parser(name, help=description, description=description)
+        if name in ("forecast", "tides"):
+            command.add_argument("stations", nargs="*",
+                                 help="NDBC station IDs to fetch (default: the configured buoy)")
+            command.add_argument("--all", action="store_true",
+                                 help="Fetch every configured buoy")
+            command.add_argument("--connections", type=int,
+                                 help="Keep-alive connections per host in multi-station mode")
+        command.add_argument("--station", help="Default NDBC station ID for this run")
+        if name in ("tides", "minimal-tides"):
+            command.add_argument("--tide-station", help="NOAA tide station ID for this run")
+    return parser
+
+
+def main(argv=None):
+    """Run a report or module command"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in MODULE_COMMANDS:
+        from importlib import import_module
+
+        return import_module(MODULE_COMMANDS[argv[0]]).main(argv[1:])
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv.insert(0, DEFAULT_COMMAND)
+
+    args = build_parser().parse_args(argv)
+
+    from sf_wave import core
+    from sf_wave.config import get_config
+
+    config = get_config()
+    if args.station:
+        config.buoy_id = args.station.upper()
+        buoy = config.buoy()
+        config.buoy_name = buoy["name"] if buoy else f"Station {config.buoy_id}"
+    if getattr(args, "tide_station", None):
+        config.tide_station = args.tide_station
+
+    if args.command in ("forecast", "tides"):
+        buoy_ids = [station_id.upper() for station_id in args.stations]
+        if args.all:
+            buoy_ids += [buoy["id"] for buoy in config.buoys]
+        core.run_forecast(config, buoy_ids, tides=args.command == "tides",
+                          connections_per_host=args.connections)
+    else:
+        core.run_compact(config, tides=args.command == "minimal-tides",
+                         concurrent=args.command == "simple",
+                         swell_period=args.command != "simple")
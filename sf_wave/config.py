@@ -0,0 +1,139 @@
+"""
+Settings shared by every subcommand
+
+The five scripts each carried their own copy of the buoy list, coordinates
+and station IDs as module-level constants. They live here once, as literals
+in a module whose bytecode Python caches, so reading them costs nothing at
+startup. A JSON file (SF_WAVE_CONFIG, default ~/.config/sf_wave/config.json)
+may override any Config field; it is only opened when it exists, e.g.
+
+    {"buoy_id": "46026", "tide_station": "9414750", "recent_readings": 3}
+"""
+
+import os
+
+# San Francisco coordinates (approximate)
+SF_LAT = 37.7749
+SF_LONG = -122.4194
+
+# San Francisco Bar buoy, the default station
+BUOY_ID = "46237"
+BUOY_NAME = "San Francisco Bar"
+
+# San Francisco tide station ID
+SF_TIDE_STATION = "9414290"
+
+# Number of recent readings shown (and fetched from the head of the .spec file)
+RECENT_READINGS = 5
+
+# List of buoys near San Francisco
+# These are the most relevant NDBC buoys near San Francisco Bay
+SF_BUOYS = (
+    {"id": "46026", "name": "San Francisco", "lat": 37.759, "lon": -122.833},
+    {"id": "46237", "name": "San Francisco Bar", "lat": 37.786, "lon": -122.634},
+    {"id": "46214", "name": "Point Reyes", "lat": 37.946, "lon": -123.470},
+    {"id": "46013", "name": "Bodega Bay", "lat": 38.238, "lon": -123.307},
+    {"id": "46012", "name": "Half Moon Bay", "lat": 37.363, "lon": -122.881},
+)
+
+# Sixteen compass points, clockwise from north
+DIRECTIONS = ("N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+              "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW")
+
+# Base URL of each NOAA service; SF_WAVE_NDBC_URL, SF_WAVE_COOPS_URL and
+# SF_WAVE_NWS_URL override them at import time (e.g. to run against the
+# sf_wave.standin record/replay server)
+NOAA_BASE_URLS = {
+    "ndbc": "https://www.ndbc.noaa.gov",
+    "coops": "https://api.tidesandcurrents.noaa.gov",
+    "nws": "https://marine.weather.gov",
+}
+
+
+def base_url(service):
+    """Base URL of a NOAA service ("ndbc", "coops" or "nws"), without a trailing slash"""
+    return os.environ.get(f"SF_WAVE_{service.upper()}_URL", NOAA_BASE_URLS[service]).rstrip("/")
+
+
+# CO-OPS high/low tide predictions for one day
+TIDE_URL = (base_url("coops") + "/api/prod/datagetter?date={date}"
+            "&station={station_id}&product=predictions&datum=MLLW&time_zone=lst_ldt"
+            "&units=english&format=json&interval=hilo")
+
+# NWS marine point forecast, used when a buoy has no spectral data
+MARINE_FORECAST_URL = base_url("nws") + "/MapClick.php?lat={lat}&lon={lon}&FcstType=json"
+
+# Local wave model output read by sf_wave.gridded (override with SF_WAVE_GRID_DIR)
+DEFAULT_GRID_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "grids")
+
+# File name extensions treated as model output
+GRID_EXTENSIONS = (".grb2", ".grib2", ".grb", ".grib", ".nc", ".nc4", ".cdf")
+
+# User overrides (override the location with SF_WAVE_CONFIG)
+DEFAULT_CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".config", "sf_wave", "config.json")
+
+
+class Config:
+    """Resolved settings: the defaults above plus any user overrides"""
+
+    __slots__ = ("lat", "lon", "buoy_id", "buoy_name", "tide_station", "recent_readings", "buoys")
+
+    def __init__(self, **overrides):
+        self.lat = SF_LAT
+        self.lon = SF_LONG
+        self.buoy_id = BUOY_ID
+        self.buoy_name = BUOY_NAME
+        self.tide_station = SF_TIDE_STATION
+        self.recent_readings = RECENT_READINGS
+        self.buoys = SF_BUOYS
+        for name, value in overrides.items():
+            if name not in self.__slots__:
+                raise TypeError(f"Unknown setting: {name}")
+            setattr(self, name, tuple(value) if name == "buoys" else value)
+
+    def buoy(self, buoy_id=None):
+        """The configured buoy with this ID (default: the default buoy), or None"""
+        buoy_id = buoy_id or self.buoy_id
+        for buoy in self.buoys:
+            if buoy["id"] == buoy_id:
+                return buoy
+        return None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Config({fields})"
+
+
+_config = None
+
+
+def get_config():
+    """Return the process-wide Config, reading the override file on first use"""
+    global _config
+    if _config is None:
+        path = os.environ.get("SF_WAVE_CONFIG", DEFAULT_CONFIG_PATH)
+        overrides = {}
+        if os.path.exists(path):
+            import json
+
+            try:
+                with open(path) as f:
+                    overrides = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading config {path}: {e}")
+        try:
+            _config = Config(**overrides)
+        except TypeError as e:
+            print(f"Error in config {path}: {e}")
+            _config = Config()
+    return _config
+
+
+def find_grid_files(grid_dir=None):
+    """Model files in grid_dir (default SF_WAVE_GRID_DIR), sorted by name"""
+    grid_dir = grid_dir or os.environ.get("SF_WAVE_GRID_DIR", DEFAULT_GRID_DIR)
+    try:
+        names = sorted(os.listdir(grid_dir))
+    except OSError:
+        return []
+    return [os.path.join(grid_dir, name) for name in names if name.lower().endswith(GRID_EXTENSIONS)]
@@ -0,0 +1,518 @@
+"""
+Fetch, parse and display logic shared by every forecast subcommand
+
+The five sf_wave_forecast*.py scripts used to be near-copies of each other.
+Their logic lives here once and `python -m sf_wave <command>` picks the
+variant. Only light standard library modules and sf_wave.config/records are
+imported up front: requests is loaded by the first network request, and
+NumPy only by the paths that predict tides, search the spatial index or
+read model grids, so a run answered from the cache starts quickly.
+"""
+
+from datetime import datetime
+from math import radians, cos, sin, asin, sqrt
+
+from sf_wave.config import (DIRECTIONS, MARINE_FORECAST_URL, RECENT_READINGS, SF_BUOYS, SF_LAT,
+                            SF_LONG, SF_TIDE_STATION, TIDE_URL, find_grid_files)
+from sf_wave.records import (ForecastPeriod, Observation, SpectralReading, TideEvent,
+                             format_epoch, format_number, is_missing, records_from_text)
+
+# Readings shown by the compact (simple/minimal) output
+COMPACT_READINGS = 3
+
+# What each compact-report task fetches, for the progress lines
+FETCH_LABELS = {'current': "current sea conditions", 'spec': "recent wave data", 'tides': "tide data"}
+
+# Hours of model forecast shown by the full report
+MODEL_HOURS = 24
+
+# Closing line of every report
+NOTE = "\nNote: If data is showing as N/A, it may be temporarily unavailable from NOAA."
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Calculate the great circle distance between two points
+    on the earth (specified in decimal degrees)
+    """
+    # Convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    r = 6371  # Radius of earth in kilometers
+    return c * r
+
+def find_closest_buoy(lat=SF_LAT, lon=SF_LONG, buoys=SF_BUOYS):
+    """Find the closest buoy to a point (default: San Francisco)"""
+    from sf_wave.spatial import StationIndex
+
+    stations, distances = StationIndex.from_stations(buoys).nearest(lat, lon)
+    return buoys[stations[0, 0]], float(distances[0, 0])
+
+def get_station(buoy_id, buoys=SF_BUOYS):
+    """Look up a buoy in the configured list, then in the cached station catalog"""
+    for buoy in buoys:
+        if buoy["id"] == buoy_id:
+            return buoy
+
+    from sf_wave.catalog import load_catalog
+
+    catalog = load_catalog(refresh=False)
+    station = catalog.station(buoy_id) if catalog is not None else None
+    if station is not None:
+        return station
+    return {"id": buoy_id, "name": f"Station {buoy_id}", "lat": None, "lon": None}
+
+def get_stations_data(buoy_ids, connections_per_host=None, readings=RECENT_READINGS):
+    """
+    Fetch current conditions and recent wave data for many buoys at once
+
+    Args:
+        buoy_ids: NDBC station IDs to fetch
+        connections_per_host: Pooled keep-alive connections to NDBC
+        readings: Recent .spec rows to keep per station
+
+    Returns:
+        Dictionary mapping station ID to {'txt': current conditions, 'spec': recent readings}
+    """
+    from sf_wave.catalog import load_catalog
+    from sf_wave.ndbc import fetch_stations
+    from sf_wave.session import DEFAULT_CONNECTIONS_PER_HOST
+
+    parsers = {'txt': parse_buoy_data,
+               'spec': lambda data_text: parse_spectral_data(data_text, readings)}
+    # Skip files the cached catalog says a station does not publish (no network needed)
+    return fetch_stations(buoy_ids, parsers=parsers,
+                          connections_per_host=connections_per_host or DEFAULT_CONNECTIONS_PER_HOST,
+                          latest_rows=readings, catalog=load_catalog(refresh=False))
+
+def get_buoy_data(buoy_id):
+    """Fetch the latest data from the specified buoy"""
+    from sf_wave.ndbc import fetch_latest_rows
+
+    # Only the newest row of the realtime2 file is needed, so fetch just its head
+    data_text = fetch_latest_rows(buoy_id, 'txt', 1)
+    if data_text is None:
+        return None
+    return parse_buoy_data(data_text)
+
+def parse_buoy_data(data_text):
+    """Parse the text data from NDBC into an Observation for the most recent row"""
+    records = records_from_text(data_text.strip(), Observation, 1)
+    return records[0] if records else None
+
+def get_wave_forecast(buoy_id, readings=RECENT_READINGS, fallback=True):
+    """
+    Get wave forecast data for the specified buoy
+
+    Without .spec data this is the NWS marine forecast (ForecastPeriods)
+    unless fallback is False, in which case it is None.
+    """
+    from sf_wave.ndbc import fetch_latest_rows
+
+    # Use spectral data for more detailed wave information (newest rows only)
+    data_text = fetch_latest_rows(buoy_id, 'spec', readings)
+    if data_text is None:
+        # Try alternative API
+        return get_alternative_forecast(buoy_id) if fallback else None
+    return parse_spectral_data(data_text, readings)
+
+def get_model_forecast(stations, hours=MODEL_HOURS):
+    """
+    Wave model forecast at each station from local grid files (see sf_wave.gridded)
+
+    Returns:
+        Dictionary mapping station ID to a list of (epoch, wave height,
+        period, direction) for the next `hours`, or None without model files
+    """
+    if not find_grid_files():
+        return None
+    import time
+
+    from sf_wave.gridded import point_forecast
+
+    stations = [station for station in stations if station.get("lat") is not None]
+    forecast = point_forecast(stations) if stations else None
+    if forecast is None:
+        return None
+    now = time.time()
+    columns = [j for j, epoch in enumerate(forecast['epoch'].tolist()) if now - 3600 <= epoch <= now + hours * 3600]
+
+    def value(name, i, j, digits):
+        return round(float(forecast[name][i, j]), digits) if name in forecast else None
+
+    return {station['id']: [(int(forecast['epoch'][j]), value('hs', i, j, 2), value('period', i, j, 1),
+                             value('direction', i, j, 0)) for j in columns]
+            for i, station in enumerate(stations)}
+
+def parse_spectral_data(data_text, readings=RECENT_READINGS):
+    """Parse the spectral data from NDBC into SpectralReadings (newest first)"""
+    try:
+        return records_from_text(data_text.strip(), SpectralReading, readings) or None
+    except Exception as e:
+        print(f"Error parsing spectral data: {e}")
+        return None
+
+def get_cached_records(buoy_id, ext, rows):
+    """
+    Newest records of a whole realtime2 file fetched through the response cache
+
+    The compact commands read the full file so repeated runs within the
+    cache TTL are answered from disk without any request.
+    """
+    from sf_wave.ndbc import fetch_realtime2
+
+    record_class = Observation if ext == 'txt' else SpectralReading
+    return fetch_realtime2(buoy_id, ext, parser=lambda text: records_from_text(text, record_class, rows))
+
+def get_alternative_forecast(buoy_id, lat=SF_LAT, lon=SF_LONG):
+    """Get forecast data from an alternative source if NDBC forecast is unavailable"""
+    from sf_wave.cache import cached_get
+
+    # Using NOAA Marine Forecast API as an alternative
+    url = MARINE_FORECAST_URL.format(lat=lat, lon=lon)
+
+    try:
+        response = cached_get(url)
+        if response.status_code == 200:
+            data = response.json()
+            forecasts = []
+
+            # Extract relevant forecast data
+            for i in range(min(len(data.get('time', {}).get('startPeriodName', [])), 5)):
+                # Marine forecast doesn't always include wave data, only text
+                forecasts.append(ForecastPeriod(data['time']['startPeriodName'][i],
+                                                data['data']['weather'][i],
+                                                data['data']['text'][i]))
+
+            return forecasts
+        else:
+            print(f"Error fetching alternative forecast: HTTP {response.status_code}")
+            return None
+    except Exception as e:
+        print(f"Error fetching alternative forecast: {e}")
+        return None
+
+def get_tide_data(station_id=SF_TIDE_STATION, date="today", offline=True):
+    """
+    Fetch high and low tide data for the specified station and date
+
+    Today's tides are predicted offline when the station's harmonic
+    constants have been saved (python -m sf_wave.harmonics fetch 9414290);
+    otherwise they come from the CO-OPS API, through the per-day tide cache.
+
+    Args:
+        station_id: NOAA tide station ID (default: San Francisco station)
+        date: Date for tide predictions (default: today)
+        offline: Try the offline harmonic prediction first (loads NumPy)
+
+    Returns:
+        List of TideEvent records, with times in the station's time zone
+    """
+    if date == "today":
+        if offline:
+            from sf_wave.harmonics import predict_tide_events
+
+            events = predict_tide_events(station_id)
+            if events is not None:
+                return events
+        from sf_wave.tides import get_station_zone, get_tide_range
+
+        # Today at the station, not on this machine
+        today = datetime.now(get_station_zone(station_id)).date()
+        days = get_tide_range([station_id], today, today)[station_id]
+        return next(iter(days.values()), None)
+
+    from sf_wave.cache import cached_get
+    from sf_wave.tides import get_station_zone
+
+    url = TIDE_URL.format(date=date, station_id=station_id)
+
+    try:
+        response = cached_get(url)
+        if response.status_code == 200:
+            data = response.json()
+            zone = get_station_zone(station_id)
+            return [TideEvent.from_prediction(tide, zone) for tide in data.get('predictions', [])]
+        else:
+            print(f"Error fetching tide data: HTTP {response.status_code}")
+            return None
+    except Exception as e:
+        print(f"Error fetching tide data: {e}")
+        return None
+
+def get_tide_window(station_id=SF_TIDE_STATION, offline=True):
+    """
+    High and low tides from yesterday through tomorrow at the station
+
+    The current level is interpolated between the extremes either side of
+    now, which before today's first or after today's last extreme lie on
+    the neighbouring days.
+
+    Args:
+        station_id: NOAA tide station ID (default: San Francisco station)
+        offline: Try the offline harmonic prediction first (loads NumPy)
+
+    Returns:
+        List of TideEvent records in time order, or None if today's tides
+        are not available
+    """
+    if offline:
+        from sf_wave.harmonics import predict_tide_events
+
+        events = predict_tide_events(station_id, around=1)
+        if events is not None:
+            return events
+    from datetime import timedelta
+
+    from sf_wave.tides import get_station_zone, get_tide_range
+
+    today = datetime.now(get_station_zone(station_id)).date()
+    days = get_tide_range([station_id], today - timedelta(days=1), today + timedelta(days=1))[station_id]
+    if today not in days:
+        return None
+    return [event for day in sorted(days) for event in days[day]]
+
+def todays_events(tide_data):
+    """The events of tide_data that fall on today in the station's time zone"""
+    zone = next((tide.time.tzinfo for tide in tide_data if tide.time), None)
+    today = datetime.now(zone).date()
+    return [tide for tide in tide_data if tide.time is None or tide.time.date() == today]
+
+def display_tide_data(tide_data, show_level=True):
+    """
+    Display today's high and low tides (and the current level unless show_level is False)
+
+    tide_data may span several days (see get_tide_window): only today's
+    rows are listed, while the current level uses all of them.
+    """
+    if not tide_data:
+        print("No tide data available.")
+        return
+
+    print("\n===== HIGH AND LOW TIDES TODAY =====")
+
+    for tide in todays_events(tide_data):
+        tide_time = tide.time.strftime('%Y-%m-%d %H:%M') if tide.time else 'Unknown'
+        tide_height = 'Unknown' if is_missing(tide.height) else format_number(tide.height)
+
+        print(f"{tide.kind} Tide: {tide_time}, {tide_height} ft")
+
+    if not show_level:
+        return
+
+    from sf_wave.tidecurve import TideCurve
+
+    # Current level from the cosine curve between the extremes either side of now
+    now = TideCurve.from_events(tide_data).now()
+    if now["height"] is not None:
+        trend = "Rising" if now["rising"] else "Falling"
+        print(f"Now: {now['height']:.1f} ft, {trend} {abs(now['rate']):.2f} ft/h")
+
+def get_direction_text(degrees):
+    """Convert degrees to cardinal direction"""
+    try:
+        index = round(float(degrees) / 22.5) % 16
+        return DIRECTIONS[index]
+    except:
+        return "Unknown"
+
+def display_measurement(label, value, unit="", is_direction=False):
+    """Display one measurement, or note that it is not available"""
+    if is_missing(value):
+        print(f"{label}: Data not available")
+    elif is_direction:
+        print(f"{label}: {format_number(value)}° ({get_direction_text(value)})")
+    else:
+        print(f"{label}: {format_number(value)}{unit}")
+
+def display_current_conditions(buoy, data):
+    """Display current sea conditions from an Observation"""
+    if not data:
+        print("No current condition data available.")
+        return
+
+    print(f"\n===== CURRENT SEA CONDITIONS AT {buoy['name']} BUOY ({buoy['id']}) =====")
+    print(f"Date/Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Wave data
+    display_measurement("Wave Height", data.wave_height, " m")
+    display_measurement("Dominant Wave Period", data.dominant_period, " sec")
+    display_measurement("Average Wave Period", data.average_period, " sec")
+    display_measurement("Wave Direction", data.wave_direction, is_direction=True)
+
+    # Wind data
+    display_measurement("Wind Speed", data.wind_speed, " m/s")
+    display_measurement("Wind Direction", data.wind_direction, is_direction=True)
+
+    # Water temperature
+    display_measurement("Water Temperature", data.water_temperature, "°C")
+
+def display_forecast(forecasts, readings=RECENT_READINGS, buoy=None):
+    """
+    Display recent SpectralReadings (or NWS ForecastPeriods from the fallback source)
+
+    The heading names `buoy` when given, as multi-station reports need.
+    """
+    station = f" AT {buoy['name']} ({buoy['id']})" if buoy else ""
+    if not forecasts:
+        print(f"No forecast data available for {buoy['name']} ({buoy['id']})." if buoy
+              else "No forecast data available.")
+        return
+
+    print(f"\n===== RECENT WAVE DATA{station} (LAST {readings} READINGS) =====")
+
+    for i, forecast in enumerate(forecasts[:readings]):
+        if isinstance(forecast, ForecastPeriod):
+            # Text forecast from the alternative source: no wave measurements
+            print(f"\nReading {i+1}: {forecast.name}")
+            print(f"Weather: {forecast.weather}")
+            print(f"Forecast: {forecast.text}")
+            continue
+
+        print(f"\nReading {i+1}: {format_epoch(forecast.time)}")
+        display_measurement("Wave Height", forecast.wave_height, " m")
+        display_measurement("Wave Direction", forecast.wave_direction, is_direction=True)
+        display_measurement("Wave Period", forecast.period, " sec")
+
+def display_model_forecast(rows, buoy=None):
+    """Display model forecast rows from get_model_forecast() (headed with `buoy` when given)"""
+    if not rows:
+        return
+
+    station = f" AT {buoy['name']} ({buoy['id']})" if buoy else ""
+    print(f"\n===== MODEL FORECAST{station} (NEXT {MODEL_HOURS} HOURS) =====")
+    for epoch, wave_height, period, direction in rows:
+        print(f"\n{format_epoch(epoch)}")
+        display_measurement("Wave Height", wave_height, " m")
+        display_measurement("Wave Period", period, " sec")
+        display_measurement("Wave Direction", direction, is_direction=True)
+
+def display_recent_readings(readings, swell_period=False):
+    """Display the compact list of recent SpectralReadings"""
+    if not readings:
+        print("No recent wave data available.")
+        return
+
+    print("\n===== RECENT WAVE READINGS =====")
+    for i, reading in enumerate(readings):
+        print(f"\nReading {i+1}: {format_epoch(reading.time)}")
+        display_measurement("Wave Height", reading.wave_height, " m")
+        display_measurement("Wave Direction", reading.wave_direction, is_direction=True)
+        if swell_period:
+            # SwP is typically closest to the dominant period
+            display_measurement("Wave Period", reading.swell_period, " sec (Swell Period)")
+        else:
+            display_measurement("Wave Period", reading.period, " sec")
+
+def run_forecast(config, buoy_ids=(), tides=True, connections_per_host=None):
+    """
+    Full report: conditions and recent readings for one or many buoys, plus tides
+
+    Args:
+        config: sf_wave.config.Config
+        buoy_ids: Stations to report (default: the configured buoy)
+        tides: Include today's tides and the current tide level
+        connections_per_host: Pooled keep-alive connections in multi-station mode
+    """
+    from sf_wave.fetch import fetch_concurrently
+
+    buoy_ids = list(dict.fromkeys(buoy_ids))
+    if tides:
+        print("San Francisco Wave and Tide Forecast")
+        print("===================================")
+    elif buoy_ids:
+        # Each station's blocks carry its own name
+        print(f"San Francisco Wave Forecast - {len(buoy_ids)} Stations")
+        print("=" * 62)
+    else:
+        print(f"San Francisco Wave Forecast - Station {config.buoy_id} ({config.buoy_name})")
+        print("=" * 62)
+
+    readings = config.recent_readings
+    tasks = {}
+    if tides:
+        tasks['tides'] = (get_tide_window, config.tide_station)
+
+    if buoy_ids:
+        # Multi-station mode: fan out over one pooled session
+        print(f"\nFetching data for {len(buoy_ids)} stations{' and tide data' if tides else ''}...")
+        tasks['stations'] = (get_stations_data, buoy_ids, connections_per_host, readings)
+        buoys = [get_station(buoy_id, config.buoys) for buoy_id in buoy_ids]
+        tasks['model'] = (get_model_forecast, buoys)
+        results = fetch_concurrently(tasks)
+        stations = results['stations'] or {}
+        model = results['model'] or {}
+        # Stations without spectral data get the marine forecast at their position, as in single-station mode
+        fallbacks = {buoy['id']: (get_alternative_forecast, buoy['id'],
+                                  SF_LAT if buoy.get('lat') is None else buoy['lat'],
+                                  SF_LONG if buoy.get('lon') is None else buoy['lon'])
+                     for buoy in buoys if not stations.get(buoy['id'], {}).get('spec')}
+        alternatives = fetch_concurrently(fallbacks) if fallbacks else {}
+        for buoy in buoys:
+            station_data = stations.get(buoy['id'], {})
+            display_current_conditions(buoy, station_data.get('txt'))
+            display_forecast(station_data.get('spec') or alternatives.get(buoy['id']), readings, buoy)
+            display_model_forecast(model.get(buoy['id']), buoy)
+    else:
+        buoy = config.buoy() or get_station(config.buoy_id, config.buoys)
+        # Fetch current conditions, recent wave data (and tides) concurrently
+        print("\nFetching current sea conditions, recent wave data and tide data..." if tides
+              else "\nFetching current sea conditions and recent wave data...")
+        tasks['buoy'] = (get_buoy_data, buoy['id'])
+        tasks['waves'] = (get_wave_forecast, buoy['id'], readings)
+        tasks['model'] = (get_model_forecast, [buoy])
+        results = fetch_concurrently(tasks)
+        display_current_conditions(buoy, results['buoy'])
+        display_forecast(results['waves'], readings)
+        display_model_forecast((results['model'] or {}).get(buoy['id']))
+
+    if tides:
+        display_tide_data(results['tides'])
+    print(NOTE)
+
+def run_compact(config, tides=False, concurrent=True, swell_period=False):
+    """
+    Compact report for the configured buoy (the simple and minimal variants)
+
+    Both realtime2 files are read whole through the response cache, so runs
+    within the cache TTL need no network and never import requests.
+
+    Args:
+        config: sf_wave.config.Config
+        tides: Also list today's high and low tides (without the current level)
+        concurrent: Fetch the files at the same time instead of one by one
+        swell_period: Show the swell period (SwP) rather than the average period
+    """
+    title = "Wave and Tide Forecast" if tides else "Wave Forecast"
+    print(f"San Francisco {title} - Station {config.buoy_id} ({config.buoy_name})")
+    print("=" * (70 if tides else 60))
+
+    buoy = {"id": config.buoy_id, "name": config.buoy_name}
+    tasks = {
+        'current': (get_cached_records, buoy['id'], 'txt', 1),
+        'spec': (get_cached_records, buoy['id'], 'spec', COMPACT_READINGS),
+    }
+    if tides:
+        tasks['tides'] = (get_tide_data, config.tide_station, "today", False)
+
+    if concurrent:
+        from sf_wave.fetch import fetch_concurrently
+
+        print("\nFetching current sea conditions and recent wave data...")
+        results = fetch_concurrently(tasks)
+    else:
+        results = {}
+        for name, task in tasks.items():
+            print(f"\nFetching {FETCH_LABELS[name]}...")
+            results[name] = task[0](*task[1:])
+
+    display_current_conditions(buoy, (results['current'] or [None])[0])
+    display_recent_readings(results['spec'], swell_period)
+    if tides:
+        display_tide_data(results['tides'], show_level=False)
+    print(NOTE)
@@ -0,0 +1,279 @@
+"""
+Long-running polling daemon with cadence-aware scheduling
+
+Running the scripts from cron refetches on a fixed schedule whether or not
+NOAA has published anything. The daemon instead keeps, for every station and
+realtime2 file kind, the newest stored observation time, the station's
+reporting interval (from sf_wave.store) and how long after an observation's
+timestamp NDBC usually publishes it. The next poll is scheduled just after
+the next row is expected, with a little jitter so stations sharing a cadence
+do not all poll at once:
+
+    due = newest + interval + publish lag + POLL_DELAY + jitter
+
+The publish lag is learned from the polls themselves: when a row shows up
+after one or more empty polls it was published between the last empty poll
+and the one that found it, and the middle of that bracket is recorded. A row
+found on the first try was published at some unknown earlier moment, so its
+sample is taken LAG_PROBE earlier than planned; the estimate then drifts
+down until a poll comes up empty and brackets it again.
+
+A poll that finds nothing new is retried after RETRY_DELAY, doubling each
+time; while a row is merely late the delay is capped at a fraction of the
+station's interval, and once a station has been silent for several intervals
+it backs off exponentially again from RETRY_DELAY up to MAX_BACKOFF. Failed requests back off the
+same way. A single thread pool caps the number of polls in flight across all
+stations.
+"""
+
+import heapq
+import itertools
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sf_wave.store import SCHEMAS, TimeSeriesStore, poll_station
+
+# Polls allowed in flight at once, across all stations
+DEFAULT_CONCURRENCY = 4
+
+# First retry after a poll that found nothing new (seconds); doubles per empty poll
+RETRY_DELAY = 20
+
+# Longest wait between polls of a silent or failing station (seconds)
+MAX_BACKOFF = 6 * 60 * 60
+
+# Intervals a row may be late before the station counts as silent
+SILENT_INTERVALS = 3
+
+# Random delay (seconds) added to every scheduled poll
+JITTER = 10
+
+# Publish lag samples kept per station
+LAG_SAMPLES = 8
+
+# Poll this long (seconds) after a row's expected publish time
+POLL_DELAY = 30
+
+# How much earlier (seconds) than planned a row found on the first try is assumed to have appeared
+LAG_PROBE = 30
+
+
+class StationSchedule:
+    """Polling state of one station and realtime2 file kind"""
+
+    __slots__ = ("station_id", "ext", "newest", "interval", "lags", "empty_polls", "silent_polls",
+                 "last_empty", "failures", "due")
+
+    def __init__(self, station_id, ext, newest=None, interval=None):
+        self.station_id = station_id
+        self.ext = ext
+        self.newest = newest
+        self.interval = interval
+        self.lags = []
+        self.empty_polls = 0
+        self.silent_polls = 0
+        self.last_empty = None
+        self.failures = 0
+        self.due = 0.0
+
+    def publish_lag(self):
+        """Typical delay between an observation's timestamp and its publication (seconds)"""
+        return statistics.median(self.lags) if self.lags else 0.0
+
+    def expected(self):
+        """When the next row should appear upstream (UTC epoch seconds), or None if unknown"""
+        if self.newest is None:
+            return None
+        return self.newest + self.interval + self.publish_lag()
+
+    def __repr__(self):
+        return (f"StationSchedule({self.station_id}.{self.ext}, newest={self.newest}, "
+                f"interval={self.interval}, due={self.due:.0f})")
+
+
+class PollingDaemon:
+    """Polls many stations on their own cadence with a global concurrency limit"""
+
+    def __init__(self, station_ids, extensions=("txt", "spec"), store=None,
+                 concurrency=DEFAULT_CONCURRENCY, session=None, poll=None, clock=time.time):
+        """
+        Args:
+            station_ids: NDBC station IDs to poll
+            extensions: realtime2 file kinds to poll for every station
+            store: TimeSeriesStore that receives new rows (default: the local store)
+            concurrency: Most polls in flight at once
+            session: requests session shared by all polls
+            poll: Function (store, station_id, ext, session) -> rows added or
+                None on failure (default: sf_wave.store.poll_station)
+            clock: Function returning the current time in epoch seconds
+        """
+        self.store = store or TimeSeriesStore()
+        self.concurrency = concurrency
+        self.session = session
+        self.poll = poll or (lambda store, station_id, ext, session:
+                             poll_station(store, station_id, ext, session=session))
+        self.clock = clock
+        self.stats = {"polls": 0, "updates": 0, "rows": 0, "failures": 0}
+        self._queue = []
+        self._order = itertools.count()
+        self._stop = threading.Event()
+
+        now = clock()
+        for station_id in dict.fromkeys(station_ids):
+            for ext in extensions:
+                schedule = StationSchedule(station_id, ext, self.store.newest_epoch(station_id, ext),
+                                           self.store.interval(station_id, ext))
+                # Catch up right away if a row is already expected
+                expected = schedule.expected()
+                schedule.due = now if expected is None else max(now, expected) + random.uniform(0, JITTER)
+                self._push(schedule)
+
+    def _push(self, schedule):
+        heapq.heappush(self._queue, (schedule.due, next(self._order), schedule))
+
+    def schedules(self):
+        return [entry[2] for entry in sorted(self._queue)]
+
+    def plan(self, schedule, added, now):
+        """
+        Update a station's state after a poll and choose its next poll time
+
+        Args:
+            schedule: The StationSchedule that was polled
+            added: Rows the poll appended (None if it failed)
+            now: When the poll finished (epoch seconds)
+
+        Returns:
+            The next poll time (epoch seconds)
+        """
+        if added is None:
+            schedule.failures += 1
+            schedule.due = now + min(MAX_BACKOFF, RETRY_DELAY * 2 ** schedule.failures) + random.uniform(0, JITTER)
+            return schedule.due
+        schedule.failures = 0
+
+        if added:
+            caught_up = schedule.newest is not None
+            schedule.newest = self.store.newest_epoch(schedule.station_id, schedule.ext)
+            schedule.interval = self.store.interval(schedule.station_id, schedule.ext)
+            if schedule.last_empty is not None:
+                # Published between the last empty poll and this one
+                published = (schedule.last_empty + now) / 2
+            else:
+                # Published at some point before this poll: assume it was earlier than
+                # planned so the estimate keeps probing for a shorter lag
+                published = now - POLL_DELAY - LAG_PROBE
+            if caught_up:
+                schedule.lags = (schedule.lags + [max(0.0, published - schedule.newest)])[-LAG_SAMPLES:]
+            schedule.empty_polls = 0
+            schedule.silent_polls = 0
+            schedule.last_empty = None
+            due = schedule.newest + schedule.interval + schedule.publish_lag() + POLL_DELAY
+            schedule.due = max(due, now + RETRY_DELAY) + random.uniform(0, JITTER)
+            return schedule.due
+
+        schedule.empty_polls += 1
+        schedule.last_empty = now
+        expected = schedule.expected()
+        if expected is not None and now - expected < SILENT_INTERVALS * schedule.interval:
+            # Only late so far: keep checking several times per interval
+            delay = min(RETRY_DELAY * 2 ** (schedule.empty_polls - 1), schedule.interval / 4)
+        else:
+            # Silent: back off from RETRY_DELAY again, counting only the silent polls
+            schedule.silent_polls += 1
+            delay = RETRY_DELAY * 2 ** (schedule.silent_polls - 1)
+        schedule.due = now + min(delay, MAX_BACKOFF) + random.uniform(0, JITTER)
+        return schedule.due
+
+    def _poll(self, schedule):
+        return self.poll(self.store, schedule.station_id, schedule.ext, self.session)
+
+    def _finish(self, schedule, future):
+        try:
+            added = future.result()
+        except Exception as e:
+            print(f"Error polling {schedule.station_id}.{schedule.ext}: {e}")
+            added = None
+        self.stats["polls"] += 1
+        if added is None:
+            self.stats["failures"] += 1
+        elif added:
+            self.stats["updates"] += 1
+            self.stats["rows"] += added
+            print(f"{schedule.station_id}.{schedule.ext}: {added} new rows")
+        self.plan(schedule, added, self.clock())
+        self._push(schedule)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, duration=None):
+        """
+        Poll until stop() is called (or for `duration` seconds)
+
+        Returns:
+            The stats dictionary (polls, updates, rows, failures)
+        """
+        deadline = None if duration is None else self.clock() + duration
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not self._stop.is_set() and (deadline is None or self.clock() < deadline):
+                now = self.clock()
+                while self._queue and self._queue[0][0] <= now and len(in_flight) < self.concurrency:
+                    _, _, schedule = heapq.heappop(self._queue)
+                    in_flight[pool.submit(self._poll, schedule)] = schedule
+
+                if len(in_flight) >= self.concurrency:
+                    # Every slot is busy: nothing can start until a poll finishes
+                    timeout = None
+                else:
+                    timeout = max(0.0, self._queue[0][0] - now) if self._queue else 1.0
+                if deadline is not None:
+                    remaining = max(0.0, deadline - now)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(in_flight.pop(future), future)
+                else:
+                    self._stop.wait(timeout)
+
+            for future in list(in_flight):
+                self._finish(in_flight.pop(future), future)
+        return self.stats
+
+
+def main(argv=None):
+    """Poll stations continuously and merge new rows into the local store"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Poll NDBC stations as new rows are published")
+    parser.add_argument("stations", nargs="+", help="NDBC station IDs")
+    parser.add_argument("--ext", action="append", choices=sorted(SCHEMAS),
+                        help="realtime2 file kinds to poll (default: txt and spec)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Polls in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--root", help="Store directory")
+    parser.add_argument("--nowcast", action="store_true",
+                        help="Update each station's nowcast as new .txt rows arrive")
+    args = parser.parse_args(argv)
+
+    poll = None
+    if args.nowcast:
+        from sf_wave.nowcast import poll_and_update as poll
+    daemon = PollingDaemon(args.stations, args.ext or sorted(SCHEMAS),
+                           TimeSeriesStore(args.root), args.concurrency, poll=poll)
+    try:
+        stats = daemon.run(args.duration)
+    except KeyboardInterrupt:
+        stats = daemon.stats
+    print(f"{stats['polls']} polls, {stats['updates']} with new rows, "
+          f"{stats['rows']} rows, {stats['failures']} failures")
+
+
+if __name__ == "__main__":
+    main()
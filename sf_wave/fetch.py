@@ -0,0 +1,38 @@
+"""
+Concurrent fetch stage shared by the forecast scripts
+
+Every upstream NOAA request is a blocking HTTP call, so instead of issuing
+them one after another the scripts hand them to this stage, which runs them
+on a thread pool and returns once all of them have finished. Wall-clock time
+is then roughly the slowest single request rather than the sum of them.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch_concurrently(tasks, max_workers=None):
+    """
+    Run several fetch functions at once and collect their results
+
+    Args:
+        tasks: Mapping of name -> (function, arg1, arg2, ...) tuples
+        max_workers: Size of the thread pool (default: one thread per task)
+
+    Returns:
+        Dictionary mapping each task name to the value its function returned,
+        or None if the function raised
+    """
+    if not tasks:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as pool:
+        futures = {name: pool.submit(task[0], *task[1:]) for name, task in tasks.items()}
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"Error fetching {name}: {e}")
+            results[name] = None
+    return results
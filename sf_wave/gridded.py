@@ -0,0 +1,621 @@
+"""
+Point forecasts from gridded wave model output (WAVEWATCH III style)
+
+get_wave_forecast() only has past buoy readings. Wave models publish real
+forecasts as grids: GRIB2 files (one message per field and forecast hour)
+or NetCDF files (time x lat x lon variables). This module pulls the values
+at a set of stations out of such files in a local directory, for every
+forecast hour at once, without decoding whole grids:
+
+- NetCDF classic (CDF-1, CDF-2 and 64-bit data CDF-5) headers are parsed
+  directly and each variable becomes a strided numpy.memmap view of the
+  file, so gathering the cells around the stations only reads the pages
+  holding them. NetCDF-4 (HDF5) files are read through the optional
+  netCDF4 package, slicing the stations' bounding box so only the chunks
+  covering it are decompressed.
+- GRIB2 files are indexed by walking the section headers. For simple
+  packing (template 5.0) the bits of each wanted grid point are read from
+  the memory-mapped data section, using the bitmap (if any) to find the
+  packed position. Other packings (complex, JPEG 2000, PNG) can only be
+  decoded whole; convert them first with
+  `wgrib2 in.grb2 -set_grib_type simple -grib_out out.grb2`.
+
+Stations are located once per grid, with nearest-cell or bilinear weights.
+Land cells (fill values or bitmap gaps) are dropped from the interpolation
+and the remaining weights renormalized, which matters for buoys a few
+cells off the coast.
+"""
+
+import os
+import struct
+from datetime import datetime, timezone
+
+import numpy as np
+
+from sf_wave.config import DEFAULT_GRID_DIR, find_grid_files
+
+# Reported parameters: GRIB2 (discipline, category, number) and NetCDF variable names
+PARAMETERS = {
+    "hs": ((10, 0, 3), ("hs", "HTSGW_surface", "swh", "VHM0")),
+    "period": ((10, 0, 11), ("tp", "PERPW_surface", "pp1d", "VTPK")),
+    "direction": ((10, 0, 10), ("dp", "DIRPW_surface", "mwd", "VMDR")),
+}
+
+# Interpolation methods accepted by extract_points()
+METHODS = ("nearest", "bilinear")
+
+# Coordinate variable names tried in NetCDF files
+LATITUDE_NAMES = ("latitude", "lat", "y")
+LONGITUDE_NAMES = ("longitude", "lon", "x")
+TIME_NAMES = ("time", "valid_time")
+
+# NetCDF classic type codes -> NumPy dtypes (big-endian on disk)
+NC_TYPES = {1: "i1", 2: "S1", 3: ">i2", 4: ">i4", 5: ">f4", 6: ">f8",
+            7: "u1", 8: ">u2", 9: ">u4", 10: ">i8", 11: ">u8"}
+
+# NetCDF classic header tags
+NC_DIMENSION, NC_VARIABLE, NC_ATTRIBUTE = 10, 11, 12
+
+# Seconds per unit of GRIB2 code table 4.4 and of CF time units
+GRIB_TIME_UNITS = {0: 60, 1: 3600, 2: 86400, 10: 3 * 3600, 11: 6 * 3600, 12: 12 * 3600, 13: 1}
+CF_TIME_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# GRIB2 product templates whose parameter and forecast time fields sit where 4.0 has them
+PRODUCT_TEMPLATES = (0, 1, 8, 11)
+
+# Set bits in each byte value
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+
+class Grid:
+    """Rectilinear latitude/longitude grid: 1-D axes in the file's own order"""
+
+    __slots__ = ("lats", "lons", "periodic")
+
+    def __init__(self, lats, lons):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        step = abs(self.lons[1] - self.lons[0]) if len(self.lons) > 1 else 0.0
+        self.periodic = bool(step) and abs(step * len(self.lons) - 360.0) < step / 2
+
+    @property
+    def shape(self):
+        return len(self.lats), len(self.lons)
+
+    def key(self):
+        return (len(self.lats), len(self.lons), float(self.lats[0]), float(self.lons[0]),
+                float(self.lats[-1]), float(self.lons[-1]))
+
+    def _axis(self, axis, values, periodic):
+        """Lower neighbour index and fraction toward the next one along an axis"""
+        descending = len(axis) > 1 and axis[0] > axis[-1]
+        ascending_axis = axis[::-1] if descending else axis
+        if periodic:
+            values = ascending_axis[0] + (values - ascending_axis[0]) % 360.0
+            extended = np.append(ascending_axis, ascending_axis[0] + 360.0)
+        else:
+            extended = ascending_axis
+        n = len(ascending_axis)
+        lower = np.clip(np.searchsorted(extended, values, side="right") - 1, 0, max(len(extended) - 2, 0))
+        span = extended[np.minimum(lower + 1, len(extended) - 1)] - extended[lower]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(span > 0, (values - extended[lower]) / span, 0.0)
+        outside = (fraction < -1e-9) | (fraction > 1 + 1e-9)
+        upper = (lower + 1) % n if periodic else np.minimum(lower + 1, n - 1)
+        if descending:
+            lower, upper = n - 1 - lower, n - 1 - upper
+        return lower, upper, np.clip(fraction, 0.0, 1.0), outside
+
+    def locate(self, lats, lons, method="bilinear"):
+        """
+        Grid cells and weights for a batch of points
+
+        Args:
+            lats, lons: Point coordinates (decimal degrees, any longitude convention)
+            method: "nearest" (one cell) or "bilinear" (four cells)
+
+        Returns:
+            (rows, columns, weights), each (points, cells); points outside
+            the grid get NaN weights
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if not self.periodic and len(self.lons):
+            # Match the grid's longitude convention (0..360 or -180..180)
+            lons = lons % 360.0 if self.lons.max() > 180 else (lons + 180.0) % 360.0 - 180.0
+        j0, j1, fy, out_y = self._axis(self.lats, lats, False)
+        i0, i1, fx, out_x = self._axis(self.lons, lons, self.periodic)
+
+        rows = np.stack([j0, j0, j1, j1], axis=1)
+        columns = np.stack([i0, i1, i0, i1], axis=1)
+        weights = np.stack([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx], axis=1)
+        if method == "nearest":
+            best = np.argmax(weights, axis=1)[:, None]
+            rows = np.take_along_axis(rows, best, axis=1)
+            columns = np.take_along_axis(columns, best, axis=1)
+            weights = np.ones_like(rows, dtype=np.float64)
+        weights[out_y | out_x] = np.nan
+        return rows, columns, weights
+
+
+def combine(values, weights):
+    """
+    Weighted sum over the cells of each point, skipping missing cells
+
+    Args:
+        values: (times, points, cells) field values, NaN where missing
+        weights: (points, cells) from Grid.locate()
+
+    Returns:
+        (points, times) array
+    """
+    valid = np.isfinite(values) & np.isfinite(weights)[None]
+    used = np.where(valid, weights[None], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = (np.where(valid, values, 0.0) * used).sum(axis=2) / used.sum(axis=2)
+    return result.T
+
+
+def combine_directions(values, weights):
+    """combine() for directions in degrees, averaging unit vectors so 350 and 10 give 0"""
+    radians = np.radians(values)
+    east = combine(np.sin(radians), weights)
+    north = combine(np.cos(radians), weights)
+    return np.degrees(np.arctan2(east, north)) % 360.0
+
+
+def parse_time_units(units):
+    """CF "<unit>s since <date>" -> (seconds per unit, epoch seconds of the origin), or None"""
+    try:
+        unit, origin = units.split(" since ")
+        unit = unit.strip().lower().rstrip("s")
+        origin = origin.strip().replace("T", " ").rstrip("Z").replace(" UTC", "")
+        if len(origin) == 10:
+            origin += " 00:00:00"
+        start = datetime.fromisoformat(origin).replace(tzinfo=timezone.utc)
+        return CF_TIME_UNITS[unit], start.timestamp()
+    except (ValueError, KeyError):
+        return None
+
+
+class _HeaderReader:
+    """Cursor over a NetCDF classic header"""
+
+    def __init__(self, buffer, version):
+        self.buffer = buffer
+        self.offset = 4
+        self.count_format = ">q" if version == 5 else ">i"
+        self.begin_format = ">i" if version == 1 else ">q"
+
+    def unpack(self, fmt):
+        (value,) = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def count(self):
+        return self.unpack(self.count_format)
+
+    def name(self):
+        length = self.count()
+        text = bytes(self.buffer[self.offset:self.offset + length]).decode("utf-8", "replace")
+        self.offset += -(-length // 4) * 4
+        return text
+
+    def attributes(self):
+        tag, entries = self.unpack(">i"), self.count()
+        if tag not in (0, NC_ATTRIBUTE):
+            raise ValueError(f"bad attribute tag {tag}")
+        attributes = {}
+        for _ in range(entries):
+            name = self.name()
+            nc_type, length = self.unpack(">i"), self.count()
+            dtype = np.dtype(NC_TYPES[nc_type])
+            raw = bytes(self.buffer[self.offset:self.offset + length * dtype.itemsize])
+            self.offset += -(-length * dtype.itemsize // 4) * 4
+            if nc_type == 2:
+                attributes[name] = raw.decode("utf-8", "replace").rstrip("\0")
+            else:
+                values = np.frombuffer(raw, dtype)
+                attributes[name] = values[0] if length == 1 else values
+        return attributes
+
+
+class NetcdfFile:
+    """
+    Variables of a NetCDF file as lazily read arrays
+
+    Classic files are memory-mapped; `variables` maps each name to
+    (array, attributes) where the array is a numpy.memmap view (or a
+    netCDF4 Variable with automatic masking and scaling off).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.variables = {}
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        if magic[:3] == b"CDF":
+            self._read_classic(magic[3])
+        elif magic == b"\x89HDF":
+            self._read_hdf5()
+        else:
+            raise ValueError("not a NetCDF file")
+
+    def _read_classic(self, version):
+        if version not in (1, 2, 5):
+            raise ValueError(f"unsupported NetCDF version {version}")
+        data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        header = _HeaderReader(data, version)
+        numrecs = header.count()
+
+        tag, entries = header.unpack(">i"), header.count()
+        if tag not in (0, NC_DIMENSION):
+            raise ValueError(f"bad dimension tag {tag}")
+        dimensions = [(header.name(), header.count()) for _ in range(entries)]
+        header.attributes()
+
+        tag, entries = header.unpack(">i"), header.count()
+        if tag not in (0, NC_VARIABLE):
+            raise ValueError(f"bad variable tag {tag}")
+        layout = []
+        for _ in range(entries):
+            name = header.name()
+            dimension_ids = [header.count() for _ in range(header.count())]
+            attributes = header.attributes()
+            nc_type = header.unpack(">i")
+            vsize = header.count() if version == 5 else header.unpack(">i")
+            begin = header.unpack(header.begin_format)
+            layout.append((name, dimension_ids, attributes, nc_type, vsize, begin))
+
+        # Record variables are interleaved: one slab of each per record
+        is_record = [bool(ids) and dimensions[ids[0]][1] == 0 for _, ids, *_ in layout]
+        record_vars = [entry for entry, record in zip(layout, is_record) if record]
+        record_size = sum(entry[4] for entry in record_vars)
+        if len(record_vars) == 1:
+            _, ids, _, nc_type, _, _ = record_vars[0]
+            record_size = np.dtype(NC_TYPES[nc_type]).itemsize * int(np.prod([dimensions[i][1] for i in ids[1:]]))
+        if numrecs in (-1, 0xFFFFFFFF) and record_vars and record_size:
+            numrecs = (len(data) - min(entry[5] for entry in record_vars)) // record_size
+
+        for (name, ids, attributes, nc_type, vsize, begin), record in zip(layout, is_record):
+            if nc_type == 2:
+                continue
+            dtype = np.dtype(NC_TYPES[nc_type])
+            shape = [dimensions[i][1] for i in ids]
+            if record:
+                shape[0] = numrecs
+            strides = [dtype.itemsize] * len(shape)
+            for k in range(len(shape) - 2, -1, -1):
+                strides[k] = strides[k + 1] * shape[k + 1]
+            if record:
+                strides[0] = record_size
+            array = np.ndarray(tuple(shape), dtype, buffer=data, offset=begin, strides=tuple(strides))
+            self.variables[name] = (array, attributes)
+
+    def _read_hdf5(self):
+        try:
+            import netCDF4
+        except ImportError:
+            raise ValueError("NetCDF-4 files need the netCDF4 package "
+                             "(or convert with `nccopy -k classic in.nc out.nc`)")
+        dataset = netCDF4.Dataset(self.path)
+        dataset.set_auto_maskandscale(False)
+        for name, variable in dataset.variables.items():
+            attributes = {key: variable.getncattr(key) for key in variable.ncattrs()}
+            self.variables[name] = (variable, attributes)
+
+    def find(self, names):
+        """First variable present among `names`, or None"""
+        for name in names:
+            if name in self.variables:
+                return self.variables[name]
+        return None
+
+
+def _unpack(raw, attributes):
+    """Raw stored values -> floats with fill values as NaN and scale/offset applied"""
+    values = np.asarray(raw, dtype=np.float64)
+    for key in ("_FillValue", "missing_value"):
+        if key in attributes:
+            values[np.isin(raw, np.atleast_1d(attributes[key]))] = np.nan
+    values *= float(attributes.get("scale_factor", 1.0))
+    values += float(attributes.get("add_offset", 0.0))
+    return values
+
+
+def _gather(variable, rows, columns):
+    """
+    Values at (rows, columns) of a (time, lat, lon) or (lat, lon) variable
+
+    Slices the bounding box of the cells first, so a memmap touches only
+    the pages and a netCDF4 variable only the chunks that hold them.
+    """
+    top, bottom = int(rows.min()), int(rows.max()) + 1
+    left, right = int(columns.min()), int(columns.max()) + 1
+    if variable.ndim == 2:
+        box = np.asarray(variable[top:bottom, left:right])[None]
+    else:
+        box = np.asarray(variable[:, top:bottom, left:right])
+    return box[:, rows - top, columns - left]
+
+
+def _extract_netcdf(path, lats, lons, parameters, method):
+    netcdf = NetcdfFile(path)
+    latitude, longitude = netcdf.find(LATITUDE_NAMES), netcdf.find(LONGITUDE_NAMES)
+    if latitude is None or longitude is None:
+        raise ValueError("no latitude/longitude coordinates")
+    grid = Grid(np.asarray(latitude[0][:]), np.asarray(longitude[0][:]))
+    rows, columns, weights = grid.locate(lats, lons, method)
+
+    epochs = np.zeros(1, dtype=np.int64)
+    time = netcdf.find(TIME_NAMES)
+    if time is not None:
+        units = parse_time_units(str(time[1].get("units", "")))
+        if units is None:
+            raise ValueError(f"unknown time units {time[1].get('units')!r}")
+        epochs = np.round(np.asarray(time[0][:], dtype=np.float64) * units[0] + units[1]).astype(np.int64)
+
+    fields = {}
+    for name, (_, names) in parameters.items():
+        variable = netcdf.find(names)
+        if variable is None:
+            continue
+        values = _unpack(_gather(variable[0], rows, columns), variable[1])
+        fields[name] = values[:len(epochs)]
+    return epochs, fields, weights
+
+
+def _signed(value, bits):
+    """GRIB2 sign-magnitude integer"""
+    sign = 1 << (bits - 1)
+    return -(value & (sign - 1)) if value & sign else value
+
+
+class Grib2Message:
+    """Offsets and metadata of one GRIB2 field, read from its section headers"""
+
+    __slots__ = ("parameter", "epoch", "grid", "points", "reference", "binary_scale",
+                 "decimal_scale", "bits", "bitmap_offset", "data_offset", "data_end", "template")
+
+    def __init__(self, data, start, end):
+        discipline = int(data[start + 6])
+        offset = start + 16
+        self.parameter = self.grid = self.template = self.bitmap_offset = self.data_offset = None
+        reference_time = forecast = None
+        while offset < end - 4:
+            length, number = struct.unpack_from(">IB", data, offset)
+            if number == 1:
+                year, month, day, hour, minute, second = struct.unpack_from(">HBBBBB", data, offset + 12)
+                reference_time = datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+            elif number == 3:
+                self.grid = self._grid(data, offset)
+            elif number == 4:
+                template, category, parameter = struct.unpack_from(">HBB", data, offset + 7)
+                if template not in PRODUCT_TEMPLATES:
+                    raise ValueError(f"product template 4.{template} not supported")
+                unit, value = struct.unpack_from(">BI", data, offset + 17)
+                self.parameter = (discipline, category, parameter)
+                forecast = value * GRIB_TIME_UNITS.get(unit, 3600)
+            elif number == 5:
+                self.points, self.template = struct.unpack_from(">IH", data, offset + 5)
+                if self.template == 0:
+                    self.reference, binary, decimal, self.bits = struct.unpack_from(">fHHB", data, offset + 11)
+                    self.binary_scale, self.decimal_scale = _signed(binary, 16), _signed(decimal, 16)
+                    if self.bits > 32:
+                        raise ValueError(f"{self.bits}-bit packing not supported")
+            elif number == 6:
+                indicator = int(data[offset + 5])
+                if indicator == 0:
+                    self.bitmap_offset = offset + 6
+                elif indicator != 255:
+                    raise ValueError(f"bitmap indicator {indicator} not supported")
+            elif number == 7:
+                self.data_offset, self.data_end = offset + 5, offset + length
+            offset += length
+        if None in (reference_time, forecast, self.grid, self.template, self.data_offset):
+            raise ValueError(f"incomplete GRIB2 message at byte {start}")
+        self.epoch = int(reference_time.timestamp()) + forecast
+
+    @staticmethod
+    def _grid(data, offset):
+        template = struct.unpack_from(">H", data, offset + 12)[0]
+        if template != 0:
+            raise ValueError(f"grid template 3.{template} not supported (regular lat/lon only)")
+        nx, ny, la1, lo1, _, la2, lo2, di, dj, scanning = struct.unpack_from(">II8xIIBIIIIB", data, offset + 30)
+        if scanning & 0xB0:
+            raise ValueError(f"scanning mode {scanning:#04x} not supported")
+        lats = np.linspace(_signed(la1, 32) / 1e6, _signed(la2, 32) / 1e6, ny)
+        lons = lo1 / 1e6 + np.arange(nx) * (di / 1e6)
+        return Grid(lats, lons)
+
+    def sample(self, data, flat):
+        """Decode only the grid points at the flat indices `flat` (NaN where the bitmap is off)"""
+        if self.template != 0:
+            raise ValueError(f"data template 5.{self.template} cannot be read per point "
+                             "(convert with wgrib2 -set_grib_type simple)")
+        values = np.full(flat.shape, np.nan)
+        position = flat.astype(np.int64)
+        present = np.ones(flat.shape, dtype=bool)
+        if self.bitmap_offset is not None:
+            # Only points with their bit set are packed: position = set bits before the point
+            byte, bit = position // 8, position % 8
+            bitmap = data[self.bitmap_offset:self.bitmap_offset + int(byte.max()) + 1].astype(np.int64)
+            present = (bitmap[byte] >> (7 - bit)) & 1 == 1
+            before = np.concatenate(([0], np.cumsum(POPCOUNT[bitmap])))
+            position = before[byte] + POPCOUNT[bitmap[byte] >> (8 - bit)]
+
+        scale = 2.0 ** self.binary_scale / 10.0 ** self.decimal_scale
+        if self.bits == 0:
+            values[present] = self.reference / 10.0 ** self.decimal_scale
+            return values
+        start = position * self.bits
+        byte = self.data_offset + start // 8
+        window = np.zeros(position.shape, dtype=np.uint64)
+        for k in range(5):
+            index = np.minimum(byte + k, self.data_end - 1)
+            window = (window << np.uint64(8)) | data[index].astype(np.uint64)
+        shift = (40 - (start % 8) - self.bits).astype(np.uint64)
+        packed = (window >> shift) & np.uint64((1 << self.bits) - 1)
+        decoded = self.reference / 10.0 ** self.decimal_scale + packed.astype(np.float64) * scale
+        values[present] = decoded[present]
+        return values
+
+
+def scan_grib2(data):
+    """Index every GRIB2 message of a memory-mapped file: list of Grib2Message"""
+    messages = []
+    offset = 0
+    size = len(data)
+    while offset + 16 <= size:
+        if bytes(data[offset:offset + 4]) != b"GRIB":
+            found = bytes(data[offset:min(size, offset + 65536)]).find(b"GRIB")
+            if found < 0:
+                offset += 65536 - 3
+                continue
+            offset += found
+            continue
+        edition = int(data[offset + 7])
+        length = struct.unpack_from(">Q", data, offset + 8)[0]
+        if edition != 2:
+            raise ValueError(f"GRIB edition {edition} not supported")
+        messages.append(Grib2Message(data, offset, offset + length))
+        offset += length
+    return messages
+
+
+def _extract_grib2(path, lats, lons, parameters, method):
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    wanted = {code: name for name, (code, _) in parameters.items()}
+    messages = [message for message in scan_grib2(data) if message.parameter in wanted]
+    if not messages:
+        return np.zeros(0, dtype=np.int64), {}, None
+
+    grid = messages[0].grid
+    if any(message.grid.key() != grid.key() for message in messages):
+        raise ValueError("fields on different grids")
+    rows, columns, weights = grid.locate(lats, lons, method)
+    flat = rows * grid.shape[1] + columns
+
+    epochs = np.array(sorted({message.epoch for message in messages}), dtype=np.int64)
+    fields = {}
+    for message in messages:
+        name = wanted[message.parameter]
+        if name not in fields:
+            fields[name] = np.full((len(epochs),) + flat.shape, np.nan)
+        fields[name][np.searchsorted(epochs, message.epoch)] = message.sample(data, flat)
+    return epochs, fields, weights
+
+
+def extract_points(paths, lats, lons, parameters=None, method="bilinear"):
+    """
+    Model values at many points for every forecast hour in a set of files
+
+    Files may hold any mix of times and parameters (e.g. one GRIB2 file per
+    forecast hour). When several files cover the same valid time the one
+    sorting last by path wins, so with run-stamped names the newest run does.
+
+    Args:
+        paths: GRIB2 or NetCDF files
+        lats, lons: Point coordinates
+        parameters: Subset of PARAMETERS (default: all)
+        method: "nearest" or "bilinear"
+
+    Returns:
+        Dictionary with 'epoch' (times,) and one (points, times) array per
+        parameter found, or None if no file could be read
+    """
+    if method not in METHODS:
+        print(f"Unknown interpolation method: {method}")
+        return None
+    parameters = {name: PARAMETERS[name] for name in (parameters or PARAMETERS)}
+    lats, lons = np.atleast_1d(lats), np.atleast_1d(lons)
+
+    pieces = []
+    for order, path in enumerate(sorted(paths)):
+        try:
+            with open(path, "rb") as f:
+                magic = f.read(4)
+            extract = _extract_grib2 if magic == b"GRIB" else _extract_netcdf
+            epochs, fields, weights = extract(path, lats, lons, parameters, method)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            print(f"Error reading model file {path}: {e}")
+            continue
+        for name, values in fields.items():
+            combined = combine_directions(values, weights) if name == "direction" else combine(values, weights)
+            pieces.append((name, order, epochs, combined))
+    if not pieces:
+        return None
+
+    epochs = np.unique(np.concatenate([piece[2] for piece in pieces]))
+    result = {"epoch": epochs}
+    for name, _, piece_epochs, values in sorted(pieces, key=lambda piece: piece[1]):
+        if name not in result:
+            result[name] = np.full((len(lats), len(epochs)), np.nan)
+        columns = np.searchsorted(epochs, piece_epochs)
+        filled = np.isfinite(values)
+        target = result[name][:, columns]
+        result[name][:, columns] = np.where(filled, values, target)
+    return result
+
+
+def point_forecast(stations, grid_dir=None, method="bilinear"):
+    """
+    Model forecast for station dicts (with 'lat' and 'lon', like config.SF_BUOYS)
+
+    Returns:
+        extract_points() result, or None without model files
+    """
+    paths = find_grid_files(grid_dir)
+    if not paths:
+        return None
+    return extract_points(paths, [station["lat"] for station in stations],
+                          [station["lon"] for station in stations], method=method)
+
+
+def main(argv=None):
+    """Print model forecasts for configured or catalog stations"""
+    import argparse
+
+    from sf_wave.config import get_config
+    from sf_wave.core import get_station
+    from sf_wave.records import format_epoch
+
+    parser = argparse.ArgumentParser(description="Point forecasts from local GRIB2/NetCDF wave model files")
+    parser.add_argument("stations", nargs="*", help="NDBC station IDs (default: every configured buoy)")
+    parser.add_argument("--dir", help=f"Model file directory (default: {DEFAULT_GRID_DIR})")
+    parser.add_argument("--method", choices=METHODS, default="bilinear", help="Interpolation (default: bilinear)")
+    parser.add_argument("--hours", type=int, default=24, help="Forecast hours to print (default: 24)")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    stations = list(config.buoys)
+    if args.stations:
+        stations = [get_station(station_id.upper(), config.buoys) for station_id in args.stations]
+        for station in stations:
+            if station["lat"] is None:
+                print(f"Unknown station {station['id']}")
+        stations = [station for station in stations if station["lat"] is not None]
+    if not stations:
+        return
+
+    paths = find_grid_files(args.dir)
+    if not paths:
+        print(f"No model files in {args.dir or os.environ.get('SF_WAVE_GRID_DIR', DEFAULT_GRID_DIR)}")
+        return
+    forecast = extract_points(paths, [s["lat"] for s in stations], [s["lon"] for s in stations],
+                              method=args.method)
+    if forecast is None:
+        return
+
+    shown = forecast["epoch"][:args.hours]
+    for i, station in enumerate(stations):
+        print(f"\n{station['id']} {station.get('name', '')}".rstrip())
+        print(f"  {'Time (UTC)':<16}  {'Hs m':>5}  {'Per s':>5}  {'Dir':>5}")
+        for j, epoch in enumerate(shown):
+            values = [forecast[name][i, j] if name in forecast else np.nan for name in PARAMETERS]
+            text = "  ".join(f"{value:5.1f}" if np.isfinite(value) else f"{'-':>5}" for value in values)
+            print(f"  {format_epoch(int(epoch))}  {text}")
+
+
+if __name__ == "__main__":
+    main()
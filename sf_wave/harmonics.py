@@ -0,0 +1,573 @@
+"""
+Offline harmonic tide prediction
+
+get_tide_data() asks the CO-OPS API for every run. Tide predictions are a
+sum of harmonic constituents, so once a station's constants are saved
+locally the same water levels and high/low events can be computed for any
+time range without a network request:
+
+    h(t) = Z0 + sum_i f_i(t) * A_i * cos(V_i(t) + u_i(t) - G_i)
+
+A_i and G_i are the constituent amplitude and Greenwich phase published by
+CO-OPS, V_i is the equilibrium argument (from the mean longitudes of the
+moon, sun, lunar perigee, lunar node and solar perigee), and f_i/u_i are the
+nodal factor and angle. Node factors follow the usual Schureman-based series
+in the longitude of the moon's node and, as CO-OPS does, are evaluated once
+per calendar year (at mid-year). Z0 is the height of mean sea level above
+the requested datum (MLLW by default).
+
+Everything is vectorized over time with NumPy. Arbitrary times cost one
+(times x constituents) matrix product plus a cosine. Evenly spaced times
+(predict_range, extremes) step each constituent's phasor along the grid
+instead, so a year of 6-minute levels or its highs and lows takes a few
+milliseconds.
+
+Constants live in one JSON file per station (see load_constituents), along
+with the station's time zone, which sets the local day predict_tide_events
+covers; use `python -m sf_wave.harmonics fetch 9414290` once to download them
+from the CO-OPS metadata API, `record`/`check` to compare predictions with
+saved CO-OPS prediction fixtures, and `synthetic` to check the predictor and
+extreme finder against a pure M2 tide whose extremes are known exactly.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from sf_wave.config import base_url
+from sf_wave.records import station_zone
+
+# Where station constituent files live (override with SF_WAVE_TIDE_DIR)
+DEFAULT_TIDE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "tides")
+
+HARCON_URL = base_url("coops") + "/mdapi/prod/webapi/stations/{station_id}/harcon.json?units={units}"
+DATUMS_URL = base_url("coops") + "/mdapi/prod/webapi/stations/{station_id}/datums.json?units={units}"
+PREDICTIONS_URL = (base_url("coops") + "/api/prod/datagetter?begin_date={begin}&end_date={end}"
+                   "&station={station_id}&product=predictions&datum={datum}&time_zone=gmt&units=english"
+                   "&format=json&interval={interval}")
+
+# Rates of the astronomical arguments in degrees per hour:
+# T (mean solar hour angle), s (moon), h (sun), p (lunar perigee), N (lunar node), p1 (solar perigee)
+ARGUMENT_RATES = np.array([15.0, 0.5490165, 0.0410686, 0.0046418, -0.0022064, 0.0000020])
+
+# name: ((T, s, h, p, N, p1) multipliers, phase offset in degrees, nodal correction)
+CONSTITUENTS = {
+    "M2": ((2, -2, 2, 0, 0, 0), 0, "M2"),
+    "S2": ((2, 0, 0, 0, 0, 0), 0, None),
+    "N2": ((2, -3, 2, 1, 0, 0), 0, "M2"),
+    "K1": ((1, 0, 1, 0, 0, 0), -90, "K1"),
+    "M4": ((4, -4, 4, 0, 0, 0), 0, "M4"),
+    "O1": ((1, -2, 1, 0, 0, 0), 90, "O1"),
+    "M6": ((6, -6, 6, 0, 0, 0), 0, "M6"),
+    "MK3": ((3, -2, 3, 0, 0, 0), -90, "MK3"),
+    "S4": ((4, 0, 0, 0, 0, 0), 0, None),
+    "MN4": ((4, -5, 4, 1, 0, 0), 0, "M4"),
+    "NU2": ((2, -3, 4, -1, 0, 0), 0, "M2"),
+    "S6": ((6, 0, 0, 0, 0, 0), 0, None),
+    "MU2": ((2, -4, 4, 0, 0, 0), 0, "M2"),
+    "2N2": ((2, -4, 2, 2, 0, 0), 0, "M2"),
+    "OO1": ((1, 2, 1, 0, 0, 0), -90, "OO1"),
+    "LAM2": ((2, -1, 0, 1, 0, 0), 180, "M2"),
+    "S1": ((1, 0, 0, 0, 0, 0), 0, None),
+    "M1": ((1, -1, 1, 1, 0, 0), -90, "O1"),
+    "J1": ((1, 1, 1, -1, 0, 0), -90, "J1"),
+    "MM": ((0, 1, 0, -1, 0, 0), 0, "MM"),
+    "SSA": ((0, 0, 2, 0, 0, 0), 0, None),
+    "SA": ((0, 0, 1, 0, 0, 0), 0, None),
+    "MSF": ((0, 2, -2, 0, 0, 0), 0, "MSF"),
+    "MF": ((0, 2, 0, 0, 0, 0), 0, "MF"),
+    "RHO": ((1, -3, 3, -1, 0, 0), 90, "O1"),
+    "Q1": ((1, -3, 1, 1, 0, 0), 90, "O1"),
+    "T2": ((2, 0, -1, 0, 0, 1), 0, None),
+    "R2": ((2, 0, 1, 0, 0, -1), 180, None),
+    "2Q1": ((1, -4, 1, 2, 0, 0), 90, "O1"),
+    "P1": ((1, 0, -1, 0, 0, 0), 90, None),
+    "2SM2": ((2, 2, -2, 0, 0, 0), 0, "2SM2"),
+    "M3": ((3, -3, 3, 0, 0, 0), 0, "M3"),
+    "L2": ((2, -1, 2, -1, 0, 0), 180, "M2"),
+    "2MK3": ((3, -4, 3, 0, 0, 0), 90, "2MK3"),
+    "K2": ((2, 0, 2, 0, 0, 0), 0, "K2"),
+    "M8": ((8, -8, 8, 0, 0, 0), 0, "M8"),
+    "MS4": ((4, -2, 2, 0, 0, 0), 0, "M2"),
+}
+
+# CO-OPS spells a few constituent names differently
+ALIASES = {"RHO1": "RHO", "LAMBDA2": "LAM2"}
+
+SECONDS_PER_DAY = 86400.0
+
+# Largest extreme time (seconds) and height errors the synthetic check accepts
+SYNTHETIC_TIME_TOLERANCE = 60
+SYNTHETIC_HEIGHT_TOLERANCE = 1e-3
+
+# predict() steps phasors along evenly spaced epochs longer than this
+GRID_MIN_POINTS = 64
+
+# J2000.0 (2000-01-01 12:00 UTC) as UTC epoch seconds
+J2000_EPOCH = 946728000.0
+
+# Mean longitudes of s, h, p, N, p1 at J2000 (degrees) and their rates (degrees per Julian century)
+LONGITUDES_J2000 = np.array([218.3164477, 280.46646, 83.3532465, 125.04452, 282.93735])
+LONGITUDE_RATES = np.array([481267.88123421, 36000.76983, 4069.0137287, -1934.136261, 1.71946])
+
+# Exact rates of T, s, h, p, N, p1 in degrees per second, for stepping phasors along a time grid
+ARGUMENT_SPEEDS = np.concatenate([[360.0], LONGITUDE_RATES / 36525.0]) / SECONDS_PER_DAY
+
+
+def astronomical_arguments(epochs):
+    """
+    Mean astronomical arguments (degrees) at UTC epoch seconds
+
+    Returns:
+        Array of shape (len(epochs), 6): T, s, h, p, N, p1
+    """
+    days = (np.asarray(epochs, dtype=np.float64) - J2000_EPOCH) / SECONDS_PER_DAY
+    centuries = days / 36525.0
+    arguments = np.empty(days.shape + (6,))
+    # Mean solar hour angle at Greenwich is 0 at noon UT (J2000 is at noon)
+    arguments[..., 0] = np.mod(days, 1.0) * 360.0
+    arguments[..., 1:] = LONGITUDES_J2000 + LONGITUDE_RATES * centuries[..., None]
+    return arguments
+
+
+def node_factors(node_longitude):
+    """
+    Nodal factors f and angles u (degrees) for each nodal correction type
+
+    Args:
+        node_longitude: Longitude of the moon's ascending node N (degrees), any shape
+
+    Returns:
+        Dictionary mapping correction type -> (f, u)
+    """
+    n = np.radians(np.asarray(node_longitude, dtype=np.float64))
+    cos1, cos2, cos3 = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    sin1, sin2, sin3 = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+
+    m2 = (1.0004 - 0.0373 * cos1 + 0.0002 * cos2, -2.14 * sin1)
+    k1 = (1.0060 + 0.1150 * cos1 - 0.0088 * cos2 + 0.0006 * cos3,
+          -8.86 * sin1 + 0.68 * sin2 - 0.07 * sin3)
+    o1 = (1.0089 + 0.1871 * cos1 - 0.0147 * cos2 + 0.0014 * cos3,
+          10.80 * sin1 - 1.34 * sin2 + 0.19 * sin3)
+    factors = {
+        "M2": m2,
+        "K1": k1,
+        "O1": o1,
+        "K2": (1.0241 + 0.2863 * cos1 + 0.0083 * cos2 - 0.0015 * cos3,
+               -17.74 * sin1 + 0.68 * sin2 - 0.04 * sin3),
+        "J1": (1.0129 + 0.1676 * cos1 - 0.0170 * cos2 + 0.0016 * cos3,
+               -12.94 * sin1 + 1.34 * sin2 - 0.19 * sin3),
+        "OO1": (1.1027 + 0.6504 * cos1 + 0.0317 * cos2 - 0.0014 * cos3,
+                -36.68 * sin1 + 4.02 * sin2 - 0.57 * sin3),
+        "MF": (1.0429 + 0.4135 * cos1 - 0.0040 * cos2,
+               -23.74 * sin1 + 2.68 * sin2 - 0.38 * sin3),
+        "MM": (1.0000 - 0.1300 * cos1 + 0.0013 * cos2, np.zeros_like(n)),
+        # Compound tides combine the factors of their parents
+        "M3": (m2[0] ** 1.5, 1.5 * m2[1]),
+        "M4": (m2[0] ** 2, 2 * m2[1]),
+        "M6": (m2[0] ** 3, 3 * m2[1]),
+        "M8": (m2[0] ** 4, 4 * m2[1]),
+        "MK3": (m2[0] * k1[0], m2[1] + k1[1]),
+        "2MK3": (m2[0] ** 2 * k1[0], 2 * m2[1] - k1[1]),
+        "MSF": (m2[0], -m2[1]),
+        "2SM2": (m2[0], -m2[1]),
+        None: (np.ones_like(n), np.zeros_like(n)),
+    }
+    return factors
+
+
+def constituent_speed(name):
+    """Angular speed of a constituent in degrees per hour"""
+    multipliers, _, _ = CONSTITUENTS[name]
+    return float(np.dot(multipliers, ARGUMENT_RATES))
+
+
+class HarmonicConstants:
+    """Harmonic constants of one station"""
+
+    def __init__(self, station_id, names, amplitudes, phases, datum_offset=0.0,
+                 units="feet", datum="MLLW", zone=None):
+        self.station_id = station_id
+        # Station's local time zone (None: this machine's)
+        self.zone = zone
+        self.names = list(names)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.phases = np.asarray(phases, dtype=np.float64)
+        self.datum_offset = float(datum_offset)
+        self.units = units
+        self.datum = datum
+
+        table = np.array([CONSTITUENTS[name][0] for name in self.names], dtype=np.float64)
+        self._multipliers = table.reshape(len(self.names), 6)
+        self._offsets = np.array([CONSTITUENTS[name][1] for name in self.names], dtype=np.float64)
+        self._node_types = [CONSTITUENTS[name][2] for name in self.names]
+
+    @classmethod
+    def from_dict(cls, data):
+        names, amplitudes, phases = [], [], []
+        for constituent in data["constituents"]:
+            name = constituent["name"].upper()
+            name = ALIASES.get(name, name)
+            if name not in CONSTITUENTS or not constituent["amplitude"]:
+                continue
+            names.append(name)
+            amplitudes.append(constituent["amplitude"])
+            phases.append(constituent["phase_gmt"])
+        return cls(data["station"], names, amplitudes, phases, data.get("datum_offset", 0.0),
+                   data.get("units", "feet"), data.get("datum", "MLLW"),
+                   station_zone(data.get("utc_offset"), data.get("observes_dst", False)))
+
+    def _nodal_corrections(self, epochs):
+        """f and u (degrees) per time and constituent, evaluated at mid-year like CO-OPS"""
+        years = np.asarray(epochs, dtype="datetime64[s]").astype("datetime64[Y]")
+        unique_years, year_index = np.unique(years, return_inverse=True)
+        mid_years = (unique_years.astype("datetime64[s]").astype(np.int64)
+                     + int(182.5 * SECONDS_PER_DAY))
+        node = astronomical_arguments(mid_years)[:, 4]
+        factors = node_factors(node)
+
+        f = np.empty((len(unique_years), len(self.names)))
+        u = np.empty((len(unique_years), len(self.names)))
+        for column, node_type in enumerate(self._node_types):
+            f[:, column], u[:, column] = factors[node_type]
+        return f[year_index.ravel()], u[year_index.ravel()]
+
+    def predict(self, epochs):
+        """
+        Water level at each UTC epoch second, above the constants' datum
+
+        Evenly spaced epochs (the usual case) go through _predict_grid.
+
+        Args:
+            epochs: Array-like of UTC epoch seconds (any length)
+
+        Returns:
+            float64 array of water levels in the constants' units
+        """
+        epochs = np.atleast_1d(np.asarray(epochs, dtype=np.int64))
+        if len(epochs) > GRID_MIN_POINTS:
+            steps = np.diff(epochs)
+            if steps[0] > 0 and (steps == steps[0]).all():
+                return self._predict_grid(int(epochs[0]), len(epochs), int(steps[0]))
+        arguments = astronomical_arguments(epochs)
+        # Equilibrium arguments for every (time, constituent) pair in one product
+        equilibrium = arguments @ self._multipliers.T + self._offsets
+        f, u = self._nodal_corrections(epochs)
+        phase = np.radians(equilibrium + u - self.phases)
+        return self.datum_offset + (f * self.amplitudes * np.cos(phase)).sum(axis=1)
+
+    def _predict_grid(self, start, count, interval):
+        """
+        Water levels at start + k * interval for k < count
+
+        V is linear in time, so along a grid each constituent is a phasor
+        turning by a fixed angle per step: its terms are one (blocks x
+        constituents) and one (block x constituents) table of complex
+        exponentials, and each level the real part of their product,
+        which a single complex matrix product evaluates for a whole block.
+        Nodal corrections are constant within a calendar year, so each
+        year is its own grid.
+        """
+        levels = np.empty(count)
+        speeds = np.radians(self._multipliers @ ARGUMENT_SPEEDS) * interval
+        first = 0
+        while first < count:
+            epoch = start + first * interval
+            year = np.datetime64(epoch, "s").astype("datetime64[Y]")
+            next_year = int((year + 1).astype("datetime64[s]").astype(np.int64))
+            last = min(count, first + -(-(next_year - epoch) // interval))
+            f, u = (values[0] for values in self._nodal_corrections(np.array([epoch], dtype=np.int64)))
+            phase = np.radians(astronomical_arguments(np.array([epoch]))[0] @ self._multipliers.T
+                               + self._offsets + u - self.phases)
+            size = last - first
+            block = int(np.sqrt(size)) + 1
+            blocks = -(-size // block)
+            inner = np.exp(1j * np.arange(block)[:, None] * speeds)
+            outer = f * self.amplitudes * np.exp(1j * (phase + np.arange(blocks)[:, None] * block * speeds))
+            levels[first:last] = (outer @ inner.T).real.ravel()[:size]
+            first = last
+        return self.datum_offset + levels
+
+    def predict_range(self, start, end, interval=360):
+        """
+        Water levels every `interval` seconds in [start, end)
+
+        Returns:
+            (epochs, levels) arrays
+        """
+        epochs = np.arange(int(start), int(end), int(interval), dtype=np.int64)
+        return epochs, self.predict(epochs)
+
+    def extremes(self, start, end, interval=360):
+        """
+        High and low waters in [start, end)
+
+        Levels are sampled every `interval` seconds; each local extremum is
+        refined by fitting a parabola through it and its two neighbours.
+
+        Returns:
+            (epochs, heights, is_high) arrays
+        """
+        epochs, levels = self.predict_range(start - interval, end + interval, interval)
+        slope = np.sign(np.diff(levels))
+        turning = np.flatnonzero(slope[:-1] != slope[1:]) + 1
+        before, at, after = levels[turning - 1], levels[turning], levels[turning + 1]
+        curvature = before - 2 * at + after
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = np.where(curvature != 0, 0.5 * (before - after) / curvature, 0.0)
+        times = epochs[turning] + shift * interval
+        heights = at - 0.25 * (before - after) * shift
+        is_high = curvature < 0
+        keep = (times >= start) & (times < end)
+        return times[keep].round().astype(np.int64), heights[keep], is_high[keep]
+
+
+def constituent_path(station_id, directory=None):
+    directory = directory or os.environ.get("SF_WAVE_TIDE_DIR", DEFAULT_TIDE_DIR)
+    return os.path.join(directory, f"{station_id}.json")
+
+
+def load_constituents(station_id, directory=None):
+    """
+    Load a station's harmonic constants from its local JSON file
+
+    The file holds {"station", "units", "datum", "datum_offset",
+    "utc_offset", "observes_dst",
+    "constituents": [{"name", "amplitude", "phase_gmt", "speed"}, ...]},
+    where datum_offset is mean sea level above the datum and utc_offset
+    (standard-time hours) and observes_dst give the station's time zone.
+    Files saved before the zone was recorded use this machine's.
+    """
+    with open(constituent_path(station_id, directory)) as f:
+        return HarmonicConstants.from_dict(json.load(f))
+
+
+def constants_dict(station_id, harcon, datums, zone=None, datum="MLLW", units="english"):
+    """
+    Build a constants file's contents from CO-OPS metadata responses
+
+    Args:
+        station_id: CO-OPS station ID
+        harcon, datums: Parsed harcon.json and datums.json responses
+        zone: {"utc_offset", "observes_dst"} of the station, if known
+        datum: Datum the predictions are referred to
+        units: "english" or "metric", as requested from the API
+    """
+    levels = {entry["name"]: entry["value"] for entry in datums.get("datums", [])}
+    zone = zone or {}
+    return {
+        "station": station_id,
+        "units": "feet" if units == "english" else "meters",
+        "datum": datum,
+        "datum_offset": levels.get("MSL", 0.0) - levels.get(datum, 0.0),
+        "utc_offset": zone.get("utc_offset"),
+        "observes_dst": zone.get("observes_dst", False),
+        "constituents": [
+            {"name": entry["name"], "amplitude": entry["amplitude"],
+             "phase_gmt": entry["phase_GMT"], "speed": entry["speed"]}
+            for entry in harcon.get("HarmonicConstituents", [])
+        ],
+    }
+
+
+def fetch_constituents(station_id, directory=None, datum="MLLW", units="english"):
+    """Download a station's constants from the CO-OPS metadata API and save them locally"""
+    from sf_wave.cache import cached_get
+    from sf_wave.tides import fetch_station_zone
+
+    metadata_units = "english" if units == "english" else "metric"
+    harcon = cached_get(HARCON_URL.format(station_id=station_id, units=metadata_units)).json()
+    datums = cached_get(DATUMS_URL.format(station_id=station_id, units=metadata_units)).json()
+    data = constants_dict(station_id, harcon, datums, fetch_station_zone(station_id), datum, units)
+    path = constituent_path(station_id, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+    return path
+
+
+def local_day_bounds(day=None, zone=None):
+    """
+    UTC epoch seconds of local midnight at the start and end of a day
+
+    Args:
+        day: The local date (default: today in `zone`)
+        zone: tzinfo of the station (default: this machine's time zone)
+    """
+    day = day or datetime.now(zone).date()
+    start = datetime(day.year, day.month, day.day, tzinfo=zone)
+    end = datetime.fromordinal(day.toordinal() + 1).replace(tzinfo=zone)
+    if zone is None:
+        start, end = start.astimezone(), end.astimezone()
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def predict_tide_events(station_id, day=None, directory=None, around=0):
+    """
+    High and low tides for a station-local day, predicted from saved constants
+
+    Args:
+        station_id: CO-OPS station ID
+        day: The local date (default: today at the station)
+        directory: Constants directory (default: CONSTANTS_DIR)
+        around: Also include this many days before and after `day`
+
+    Returns:
+        List of TideEvent records (times in the station's zone, like CO-OPS
+        lst_ldt), or None if the station has no local constants file
+    """
+    from sf_wave.records import TideEvent
+
+    try:
+        constants = load_constituents(station_id, directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    day = day or datetime.now(constants.zone).date()
+    start, _ = local_day_bounds(day - timedelta(days=around), constants.zone)
+    _, end = local_day_bounds(day + timedelta(days=around), constants.zone)
+    times, heights, is_high = constants.extremes(start, end)
+    return [TideEvent(datetime.fromtimestamp(int(epoch), constants.zone), round(float(height), 3), bool(high))
+            for epoch, height, high in zip(times, heights, is_high)]
+
+
+def _parse_coops_time(text):
+    return int(datetime.strptime(text, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc).timestamp())
+
+
+def compare_with_fixture(constants, fixture):
+    """
+    Compare predictions with a saved CO-OPS predictions response (GMT times)
+
+    Args:
+        constants: HarmonicConstants of the fixture's station
+        fixture: Parsed CO-OPS JSON ({"predictions": [{"t", "v", ["type"]}, ...]})
+
+    Returns:
+        Dictionary with the number of points and the largest height (and for
+        hi/lo fixtures, time in minutes) differences
+    """
+    predictions = fixture.get("predictions", [])
+    epochs = np.array([_parse_coops_time(p["t"]) for p in predictions], dtype=np.int64)
+    expected = np.array([float(p["v"]) for p in predictions])
+    result = {"points": len(epochs)}
+    if not len(epochs):
+        return result
+
+    if "type" in predictions[0]:
+        times, heights, _ = constants.extremes(epochs.min() - 6 * 3600, epochs.max() + 6 * 3600, 60)
+        nearest = np.abs(times[None, :] - epochs[:, None]).argmin(axis=1)
+        result["max_time_error_minutes"] = float(np.abs(times[nearest] - epochs).max() / 60)
+        result["max_height_error"] = float(np.abs(heights[nearest] - expected).max())
+    else:
+        result["max_height_error"] = float(np.abs(constants.predict(epochs) - expected).max())
+    return result
+
+
+def synthetic_check(amplitude=2.0, phase=75.0, datum_offset=3.0, begin="2024-03-10", days=3):
+    """
+    Compare predict/extremes with the exact extremes of a pure M2 tide
+
+    A lone M2 constituent is h(t) = Z0 + f*A*cos(V(t) + u - G), with V
+    growing at the M2 speed, so its highs fall where V + u - G is a multiple
+    of 360 degrees (height Z0 + f*A) and its lows half a cycle later.
+
+    Returns:
+        Dictionary with the number of extremes and the largest time (seconds)
+        and height errors of extremes() and of predict() at the exact times
+    """
+    constants = HarmonicConstants("synthetic", ["M2"], [amplitude], [phase], datum_offset)
+    start = datetime.strptime(begin, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    end = start + days * SECONDS_PER_DAY
+    f, u = (values[0, 0] for values in constants._nodal_corrections(np.array([start], dtype=np.int64)))
+    multipliers, offset, _ = CONSTITUENTS["M2"]
+    angle = float(np.dot(astronomical_arguments(np.array([start]))[0], multipliers)) + offset + u - phase
+    speed = constituent_speed("M2") / 3600.0
+
+    # Extremes every half cycle from the first one after `start`; highs at even multiples of 180 degrees
+    half_cycle = 180.0 / speed
+    expected_times = start + np.arange((-angle % 180.0) / speed, end - start, half_cycle)
+    expected_high = np.round((angle + (expected_times - start) * speed) / 180.0).astype(np.int64) % 2 == 0
+    expected_heights = datum_offset + np.where(expected_high, f, -f) * amplitude
+
+    times, heights, is_high = constants.extremes(start, end)
+    result = {"extremes": len(times)}
+    if len(times) != len(expected_times) or (is_high != expected_high).any():
+        result["mismatch"] = True
+        return result
+    result["max_time_error_seconds"] = float(np.abs(times - expected_times).max())
+    result["max_height_error"] = float(np.abs(heights - expected_heights).max())
+    result["max_predict_error"] = float(np.abs(constants.predict(expected_times.round())
+                                               - expected_heights).max())
+    return result
+
+
+def main(argv=None):
+    """Download constants, predict tides offline, or check against CO-OPS fixtures"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline harmonic tide predictions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="Download a station's harmonic constants")
+    fetch.add_argument("station")
+
+    predict = commands.add_parser("predict", help="Predict high and low tides")
+    predict.add_argument("station")
+    predict.add_argument("--begin", help="First day (YYYY-MM-DD, UTC; default: today)")
+    predict.add_argument("--days", type=int, default=1)
+
+    record = commands.add_parser("record", help="Save CO-OPS predictions as a fixture")
+    record.add_argument("station")
+    record.add_argument("begin", help="YYYYMMDD")
+    record.add_argument("end", help="YYYYMMDD")
+    record.add_argument("output", help="Fixture file to write")
+    record.add_argument("--interval", default="hilo", choices=["hilo", "6", "60"])
+
+    check = commands.add_parser("check", help="Compare predictions with saved CO-OPS fixtures")
+    check.add_argument("station")
+    check.add_argument("fixtures", nargs="+", help="CO-OPS predictions JSON files")
+
+    commands.add_parser("synthetic", help="Check predictions against an exact pure M2 tide")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "fetch":
+        print(f"Saved {fetch_constituents(args.station)}")
+    elif args.command == "record":
+        from sf_wave.cache import cached_get
+
+        url = PREDICTIONS_URL.format(begin=args.begin, end=args.end, station_id=args.station,
+                                     datum="MLLW", interval=args.interval)
+        with open(args.output, "w") as f:
+            json.dump(cached_get(url).json(), f, indent=1)
+        print(f"Saved {args.output}")
+    elif args.command == "predict":
+        constants = load_constituents(args.station)
+        begin = args.begin or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        start = datetime.strptime(begin, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+        times, heights, is_high = constants.extremes(start, start + args.days * SECONDS_PER_DAY)
+        for epoch, height, high in zip(times, heights, is_high):
+            moment = datetime.fromtimestamp(int(epoch), timezone.utc).astimezone(constants.zone)
+            print(f"{'High' if high else 'Low'} Tide: {moment:%Y-%m-%d %H:%M %Z}, "
+                  f"{height:.3f} {constants.units}")
+    elif args.command == "check":
+        constants = load_constituents(args.station)
+        for path in args.fixtures:
+            with open(path) as f:
+                print(path, compare_with_fixture(constants, json.load(f)))
+    elif args.command == "synthetic":
+        result = synthetic_check()
+        print(result)
+        if (result.get("mismatch") or result["max_time_error_seconds"] > SYNTHETIC_TIME_TOLERANCE
+                or max(result["max_height_error"], result["max_predict_error"]) > SYNTHETIC_HEIGHT_TOLERANCE):
+            print("FAILED")
+            return 1
+        print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
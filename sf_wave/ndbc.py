@@ -0,0 +1,277 @@
+"""
+NDBC realtime2 file access for one or many buoy stations
+
+Fetches the realtime2 .txt/.spec files of any set of stations in parallel
+over the shared pooled session and merges them into a single result set.
+
+realtime2 files hold ~45 days of rows ordered newest first, so callers that
+only need the latest few rows can use fetch_latest_rows(), which asks for
+the head of the file with HTTP Range requests instead of the whole body.
+The head is kept in the response cache with the file's validators: within
+the TTL it is served from disk, after that one conditional Range request
+(usually a 304) revalidates it.
+"""
+
+import os
+import time
+
+from sf_wave.cache import cached_get, endpoint_ttl, get_cache
+from sf_wave.config import base_url
+from sf_wave.session import DEFAULT_CONNECTIONS_PER_HOST, get_session
+
+# NDBC realtime2 data file (the last ~45 days of observations, newest first)
+REALTIME2_URL = base_url("ndbc") + "/data/realtime2/{buoy_id}.{ext}"
+
+
+# First Range request size; the two header lines plus ~40 rows fit in 4 KB
+DEFAULT_HEAD_BYTES = 4096
+
+# Stop widening the Range past this many bytes and read the rest as a stream
+DEFAULT_MAX_HEAD_BYTES = 256 * 1024
+
+# Cache key suffix of a file's head; a URL fragment, so it never names the full file
+HEAD_CACHE_SUFFIX = "#head"
+
+# Times a Range read starts over from byte 0 because the file changed under it
+MAX_RESTARTS = 3
+
+
+def realtime2_url(buoy_id, ext):
+    """Build the realtime2 URL for a station and file extension"""
+    return REALTIME2_URL.format(buoy_id=buoy_id, ext=ext)
+
+
+def _head_text(lines, rows):
+    """Join the '#' header lines and the first `rows` data rows back into file text"""
+    kept = []
+    count = 0
+    for line in lines:
+        if line.startswith('#'):
+            kept.append(line)
+        elif line.strip():
+            if count == rows:
+                break
+            kept.append(line)
+            count += 1
+    return '\n'.join(kept) + '\n', count
+
+
+def _parse_head(body, complete, rows):
+    """Header lines and up to `rows` rows of a file's first bytes, plus the row count"""
+    text = body.decode('utf-8', errors='replace')
+    if not complete:
+        # Drop the trailing partial line; it is completed by the next range
+        text = text[:text.rfind('\n') + 1]
+    return _head_text(text.split('\n'), rows)
+
+
+def _stream_head(response, rows):
+    """Read a full (200) response line by line, stopping after `rows` data rows"""
+    lines = []
+    count = 0
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            lines.append(line)
+            if line.strip() and not line.startswith('#'):
+                count += 1
+                if count == rows:
+                    break
+    finally:
+        response.close()
+    return _head_text(lines, rows)[0]
+
+
+def fetch_latest_rows(buoy_id, ext, rows, session=None,
+                      head_bytes=DEFAULT_HEAD_BYTES, max_head_bytes=DEFAULT_MAX_HEAD_BYTES):
+    """
+    Fetch only the newest rows of a realtime2 file
+
+    The head of the file is requested with a Range header. If the chunk does
+    not yet contain `rows` complete rows the range is doubled and only the
+    missing bytes are requested. Servers that ignore Range (HTTP 200) are read
+    as a stream and the connection is dropped once enough rows have arrived.
+
+    The head is cached like a full response. Within the TTL it is served
+    without a request. After that the first Range request carries
+    If-None-Match/If-Modified-Since, and a 304 keeps the cached bytes.
+    Later ranges carry If-Range, so a file replaced mid-read comes back
+    whole (200) and is streamed from byte 0. A 206 with a changed validator
+    also restarts the read.
+
+    Args:
+        buoy_id: NDBC station ID
+        ext: File extension ("txt", "spec", ...)
+        rows: Number of data rows wanted (newest first)
+        session: Session to use (default: the shared pooled session)
+        head_bytes: Size of the first Range request
+        max_head_bytes: Largest range requested before streaming the rest
+
+    Returns:
+        File text with the header lines and up to `rows` data rows, None on error
+    """
+    url = realtime2_url(buoy_id, ext)
+    cache = None if os.environ.get("SF_WAVE_NO_CACHE") else get_cache()
+    key = url + HEAD_CACHE_SUFFIX
+    meta, cached = cache.entry(key) if cache else (None, None)
+    if meta is not None:
+        head, count = _parse_head(cached, meta.get("complete"), rows)
+        if time.time() - meta["fetched_at"] < endpoint_ttl(url) and (count >= rows or meta.get("complete")):
+            return head
+
+    session = session or get_session()
+    # Ask for identity encoding so byte ranges line up with the text itself
+    headers = {'Accept-Encoding': 'identity'}
+    if meta is not None:
+        if meta.get("etag"):
+            headers['If-None-Match'] = meta["etag"]
+        elif meta.get("last_modified"):
+            headers['If-Modified-Since'] = meta["last_modified"]
+    body = b''
+    end = head_bytes
+    # ETag (or Last-Modified) of the file version `body` was read from
+    validator = None
+    last_headers = {}
+    restarts = 0
+
+    def save(data, response_headers, complete):
+        if cache is not None:
+            cache.store(key, data, response_headers, {"complete": complete})
+
+    try:
+        while True:
+            start = len(body)
+            headers['Range'] = f"bytes={start}-{end - 1}"
+            if validator:
+                headers['If-Range'] = validator
+            response = session.get(url, headers=headers, stream=True)
+            # Only the first request is conditional on the cached head
+            headers.pop('If-None-Match', None)
+            headers.pop('If-Modified-Since', None)
+
+            if response.status_code == 304 and meta is not None:
+                # Unchanged since the cached head: continue from its end if it is short
+                response.close()
+                meta = cache.store(key, cached, response.headers, meta, write_body=False)
+                body, validator = cached, meta.get("etag") or meta.get("last_modified")
+                complete = bool(meta.get("complete"))
+                end = max(end, len(body))
+            elif response.status_code == 200:
+                # Range not supported, or the file changed since If-Range: stream it from byte 0
+                text = _stream_head(response, rows)
+                save(text.encode('utf-8'), response.headers, False)
+                return text
+            elif response.status_code == 416:
+                # Requested past the end of the file: what we have is everything
+                response.close()
+                complete = True
+            elif response.status_code == 206:
+                current = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                if validator and current and current != validator:
+                    # The file changed between two ranges: start over from byte 0
+                    response.close()
+                    restarts += 1
+                    if restarts > MAX_RESTARTS:
+                        print(f"Error fetching {buoy_id}.{ext}: file kept changing during the read")
+                        return None
+                    body, end, validator = b'', head_bytes, None
+                    headers.pop('If-Range', None)
+                    continue
+                validator = validator or current
+                body += response.content
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                complete = len(body) < end or (total.isdigit() and len(body) >= int(total))
+                last_headers = response.headers
+            else:
+                response.close()
+                print(f"Error fetching {buoy_id}.{ext}: HTTP {response.status_code}")
+                return None
+
+            head, count = _parse_head(body, complete, rows)
+            if count >= rows or complete:
+                if body is not cached:
+                    save(body, last_headers, complete)
+                return head
+
+            if end >= max_head_bytes:
+                # Still not enough rows: fall back to streaming the whole body
+                del headers['Range']
+                headers.pop('If-Range', None)
+                return _stream_head(session.get(url, headers=headers, stream=True), rows)
+            end = min(end * 2, max_head_bytes)
+    except Exception as e:
+        print(f"Error fetching {buoy_id}.{ext}: {e}")
+        return None
+
+
+def fetch_realtime2(buoy_id, ext, parser=None, session=None, latest_rows=None):
+    """
+    Fetch one realtime2 file
+
+    Args:
+        buoy_id: NDBC station ID
+        ext: File extension ("txt", "spec", ...)
+        parser: Optional function applied to the response text
+        session: Session to use (default: the shared pooled session)
+        latest_rows: Only fetch this many of the newest rows (see fetch_latest_rows)
+
+    Returns:
+        The parsed data (or raw text when no parser is given), None on error
+    """
+    if latest_rows:
+        text = fetch_latest_rows(buoy_id, ext, latest_rows, session=session)
+        if text is None:
+            return None
+        return parser(text) if parser else text
+
+    url = realtime2_url(buoy_id, ext)
+    try:
+        response = cached_get(url, session=session)
+        if response.status_code != 200:
+            print(f"Error fetching {buoy_id}.{ext}: HTTP {response.status_code}")
+            return None
+        return parser(response.text) if parser else response.text
+    except Exception as e:
+        print(f"Error fetching {buoy_id}.{ext}: {e}")
+        return None
+
+
+def fetch_stations(buoy_ids, parsers=None, extensions=("txt", "spec"),
+                   connections_per_host=DEFAULT_CONNECTIONS_PER_HOST, latest_rows=None,
+                   catalog=None):
+    """
+    Fetch realtime2 files for many stations in parallel over one pooled session
+
+    Args:
+        buoy_ids: Iterable of NDBC station IDs
+        parsers: Optional mapping of extension -> parser function
+        extensions: realtime2 files to fetch for every station
+        connections_per_host: Keep-alive connections (and worker threads) to use
+        latest_rows: Only fetch this many of the newest rows of each file
+        catalog: Optional sf_wave.catalog.StationCatalog; files it lists as
+            not published are skipped (None) without a request
+
+    Returns:
+        Dictionary mapping each station ID to {extension: data}
+    """
+    from sf_wave.fetch import fetch_concurrently
+
+    parsers = parsers or {}
+    session = get_session(connections_per_host)
+    buoy_ids = list(dict.fromkeys(buoy_ids))
+
+    merged = {buoy_id: {} for buoy_id in buoy_ids}
+    tasks = {}
+    for buoy_id in buoy_ids:
+        for ext in extensions:
+            if catalog is not None and catalog.has_product(buoy_id, ext) is False:
+                merged[buoy_id][ext] = None
+                continue
+            tasks[(buoy_id, ext)] = (fetch_realtime2, buoy_id, ext, parsers.get(ext), session,
+                                      latest_rows)
+    results = fetch_concurrently(tasks, max_workers=connections_per_host)
+
+    for (buoy_id, ext), data in results.items():
+        merged[buoy_id][ext] = data
+    return merged
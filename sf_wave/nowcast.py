@@ -0,0 +1,446 @@
+"""
+Short-term nowcasts of wave height and period from the realtime2 feed
+
+The reports only repeat the last few readings. This module forecasts the
+next hours at a station with one online autoregressive model per variable:
+
+    y[t] = c + a1 y[t-1] + ... + ap y[t-p] + e[t]
+
+fitted on hourly means by recursive least squares with exponential
+forgetting (a Kalman filter over the coefficients), so each new hour costs a
+fixed (p+1) x (p+1) update however long the history is. Wave height is
+modelled in log space, which keeps forecasts positive and makes the error
+multiplicative. The one-step residual variance is tracked the same way;
+h-step bands come from the AR model's impulse response
+(var_h = s^2 * sum of psi_k^2 for k < h).
+
+Rows are folded into the current hour as they arrive. When an hour is
+complete its mean updates the model; hours with no data are bridged with the
+model's own prediction (without learning from it) up to MAX_GAP_HOURS,
+after which the lags start over. The full state of every station (model
+coefficients, covariance, lags and the unfinished hour) is saved as JSON
+after each catch-up, so a restart only reads the store rows newer than the
+last one seen.
+
+backtest() replays stored history through a fresh model, forecasting every
+horizon at every hour, and reports error, skill against persistence, band
+coverage and update throughput.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from sf_wave.store import TimeSeriesStore, poll_station
+
+# Where model state lives (override with SF_WAVE_NOWCAST_DIR)
+DEFAULT_NOWCAST_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "nowcast")
+
+# Modelled .txt columns; True means the model works on the log of the value
+VARIABLES = {"WVHT": True, "DPD": False, "APD": False}
+
+# Model time step (seconds): observations are averaged per hour
+STEP = 3600
+
+# Autoregressive order (hours of lags)
+AR_ORDER = 3
+
+# Forgetting factor of the recursive least squares fit (~1 / (1 - f) hours of memory)
+FORGETTING = 0.99
+
+# Initial coefficient covariance; also the cap on its trace, against wind-up in flat spells
+INITIAL_COVARIANCE = 10.0
+
+# Residual variance assumed before any hour has been predicted
+INITIAL_VARIANCE = 0.05
+
+# Longest run of empty hours bridged with the model's own prediction
+MAX_GAP_HOURS = 6
+
+# Hours forecast by default
+DEFAULT_HOURS = 12
+
+# Two-sided band: 90% of a normal distribution
+BAND_Z = 1.645
+
+# Horizons (hours) scored by backtest()
+BACKTEST_HORIZONS = (1, 3, 6, 12)
+
+# Hours of history fed to a backtest model before it is scored
+WARMUP_HOURS = 48
+
+
+class OnlineAR:
+    """Autoregressive model of one variable, fitted one hour at a time"""
+
+    __slots__ = ("order", "forgetting", "theta", "covariance", "lags", "variance", "updates")
+
+    def __init__(self, order=AR_ORDER, forgetting=FORGETTING):
+        self.order = order
+        self.forgetting = forgetting
+        # Start from persistence: y[t] = y[t-1]
+        self.theta = np.zeros(order + 1)
+        self.theta[1] = 1.0
+        self.covariance = np.eye(order + 1) * INITIAL_COVARIANCE
+        self.lags = []
+        self.variance = INITIAL_VARIANCE
+        self.updates = 0
+
+    def _regressors(self):
+        return np.concatenate(([1.0], self.lags[::-1]))
+
+    def predict(self):
+        """One-step prediction, or None until `order` hours have been seen"""
+        if len(self.lags) < self.order:
+            return None
+        return float(self.theta @ self._regressors())
+
+    def update(self, value):
+        """Learn from the next hour's value and shift it into the lags"""
+        if len(self.lags) == self.order:
+            x = self._regressors()
+            error = value - float(self.theta @ x)
+            px = self.covariance @ x
+            gain = px / (self.forgetting + x @ px)
+            self.theta = self.theta + gain * error
+            covariance = (self.covariance - np.outer(gain, px)) / self.forgetting
+            covariance = (covariance + covariance.T) / 2
+            trace = np.trace(covariance)
+            if trace > INITIAL_COVARIANCE * (self.order + 1):
+                covariance *= INITIAL_COVARIANCE * (self.order + 1) / trace
+            self.covariance = covariance
+            self.variance = self.forgetting * self.variance + (1 - self.forgetting) * error * error
+            self.updates += 1
+        self.lags = (self.lags + [value])[-self.order:]
+
+    def bridge(self):
+        """Fill an hour with no data with the model's prediction (no learning)"""
+        prediction = self.predict()
+        if prediction is not None:
+            self.lags = (self.lags + [prediction])[-self.order:]
+        return prediction is not None
+
+    def reset_lags(self):
+        self.lags = []
+
+    def forecast(self, hours, latest=None):
+        """
+        Forecast the next `hours` values
+
+        Args:
+            hours: Steps to forecast
+            latest: Value of a step not learned from yet (the hour still
+                being filled), used as the newest lag
+
+        Returns:
+            (means, standard deviations) as arrays, or None before the lags are full
+        """
+        lags = list(self.lags) if latest is None else (self.lags + [latest])[-self.order:]
+        if len(lags) < self.order:
+            return None
+        means = np.empty(hours)
+        for h in range(hours):
+            means[h] = self.theta[0] + sum(a * y for a, y in zip(self.theta[1:], lags[::-1]))
+            lags = (lags + [means[h]])[-self.order:]
+        # Impulse response weights of the AR recursion
+        psi = np.zeros(hours)
+        psi[0] = 1.0
+        for k in range(1, hours):
+            psi[k] = sum(self.theta[i] * psi[k - i] for i in range(1, min(k, self.order) + 1))
+        return means, np.sqrt(self.variance * np.cumsum(psi ** 2))
+
+    def to_dict(self):
+        return {"order": self.order, "forgetting": self.forgetting, "theta": self.theta.tolist(),
+                "covariance": self.covariance.tolist(), "lags": list(self.lags),
+                "variance": self.variance, "updates": self.updates}
+
+    @classmethod
+    def from_dict(cls, state):
+        model = cls(state["order"], state["forgetting"])
+        model.theta = np.array(state["theta"])
+        model.covariance = np.array(state["covariance"])
+        model.lags = list(state["lags"])
+        model.variance = state["variance"]
+        model.updates = state["updates"]
+        return model
+
+
+class StationNowcast:
+    """Models of every VARIABLES column of one station, plus the hour being filled"""
+
+    def __init__(self, station_id):
+        self.station_id = station_id
+        self.models = {name: OnlineAR() for name in VARIABLES}
+        # Newest observation folded in, the hour it falls in and that hour's running sums
+        self.newest = None
+        self.hour = None
+        self.sums = {name: [0.0, 0] for name in VARIABLES}
+
+    def _close_hour(self):
+        for name, (total, count) in self.sums.items():
+            model = self.models[name]
+            if count:
+                model.update(total / count)
+            elif not model.bridge():
+                model.reset_lags()
+        self.sums = {name: [0.0, 0] for name in VARIABLES}
+
+    def ingest(self, records):
+        """
+        Fold in store records (oldest first); rows not newer than the last one are skipped
+
+        Rows are summed per hour with NumPy; the models then step once per hour.
+
+        Returns:
+            Number of rows used
+        """
+        if self.newest is not None:
+            records = records[records["epoch"] > self.newest]
+        if not len(records):
+            return 0
+        epochs = records["epoch"].astype(np.int64)
+        hours = epochs - epochs % STEP
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(hours)) + 1))
+        totals, counts = {}, {}
+        for name, log in VARIABLES.items():
+            values = records[name].astype(np.float64)
+            valid = ~np.isnan(values)
+            values = np.where(valid, np.log(np.maximum(values, 0.01)) if log else values, 0.0)
+            totals[name] = np.add.reduceat(values, starts)
+            counts[name] = np.add.reduceat(valid.astype(np.int64), starts)
+
+        for i, hour in enumerate(hours[starts].tolist()):
+            if self.hour is not None and hour > self.hour:
+                self._close_hour()
+                gap = (hour - self.hour) // STEP - 1
+                for _ in range(min(gap, MAX_GAP_HOURS + 1)):
+                    self._close_hour()
+                if gap > MAX_GAP_HOURS:
+                    for model in self.models.values():
+                        model.reset_lags()
+            self.hour = hour
+            for name in VARIABLES:
+                self.sums[name][0] += float(totals[name][i])
+                self.sums[name][1] += int(counts[name][i])
+        self.newest = int(epochs[-1])
+        return len(records)
+
+    def forecast(self, hours=DEFAULT_HOURS):
+        """
+        Forecast every variable for the hours after the newest observation's
+
+        The mean of the hour still being filled stands in as the newest lag
+        (the model only learns from it once the hour is complete).
+
+        Returns:
+            Dictionary with 'epoch' (start of each forecast hour) and, per
+            variable with enough history, (mean, low, high) arrays of the
+            90% band; None before any observation
+        """
+        if self.hour is None:
+            return None
+        result = {"epoch": self.hour + STEP * np.arange(1, hours + 1)}
+        for name, model in self.models.items():
+            total, count = self.sums[name]
+            forecast = model.forecast(hours, total / count if count else model.predict())
+            if forecast is None:
+                continue
+            means, deviations = forecast
+            low, high = means - BAND_Z * deviations, means + BAND_Z * deviations
+            if VARIABLES[name]:
+                means, low, high = np.exp(means), np.exp(low), np.exp(high)
+            result[name] = (means, low, high)
+        return result
+
+    def to_dict(self):
+        return {"station": self.station_id, "newest": self.newest, "hour": self.hour,
+                "sums": self.sums, "models": {name: model.to_dict() for name, model in self.models.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        nowcast = cls(state["station"])
+        nowcast.newest = state["newest"]
+        nowcast.hour = state["hour"]
+        nowcast.sums = {name: list(state["sums"].get(name, [0.0, 0])) for name in VARIABLES}
+        for name, model_state in state["models"].items():
+            if name in VARIABLES:
+                nowcast.models[name] = OnlineAR.from_dict(model_state)
+        return nowcast
+
+
+class NowcastState:
+    """Saved StationNowcast per station under one directory"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("SF_WAVE_NOWCAST_DIR", DEFAULT_NOWCAST_DIR)
+
+    def path(self, station_id):
+        return os.path.join(self.root, f"{station_id}.json")
+
+    def load(self, station_id):
+        """Saved nowcast of a station, or a fresh one"""
+        try:
+            with open(self.path(station_id)) as f:
+                return StationNowcast.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Error reading nowcast state for {station_id}: {e}")
+            return StationNowcast(station_id)
+
+    def save(self, nowcast):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(nowcast.station_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(nowcast.to_dict(), f)
+        os.replace(tmp_path, path)
+
+
+def catch_up(station_id, store=None, state=None):
+    """
+    Feed a station's saved nowcast the store rows it has not seen and save it
+
+    Returns:
+        (StationNowcast, rows used)
+    """
+    store = store or TimeSeriesStore()
+    state = state or NowcastState()
+    nowcast = state.load(station_id)
+    start = None if nowcast.newest is None else nowcast.newest + 1
+    used = nowcast.ingest(store.read(station_id, "txt", start=start))
+    if used:
+        state.save(nowcast)
+    return nowcast, used
+
+
+def poll_and_update(store, station_id, ext, session=None):
+    """sf_wave.store.poll_station(), then catch up the station's nowcast on new .txt rows"""
+    added = poll_station(store, station_id, ext, session=session)
+    if added and ext == "txt":
+        catch_up(station_id, store)
+    return added
+
+
+def backtest(records, horizons=BACKTEST_HORIZONS, warmup=WARMUP_HOURS):
+    """
+    Replay history through a fresh model and score its forecasts
+
+    Rows are fed an hour at a time; after each hour every variable is
+    forecast max(horizons) hours ahead and compared with the observed
+    hourly means. Persistence (the hour just observed) is the baseline for
+    skill.
+
+    Args:
+        records: Store records of one station (.txt schema, oldest first)
+        horizons: Forecast hours to score
+        warmup: Hours ingested before scoring starts
+
+    Returns:
+        Dictionary mapping each variable to {horizon: {'mae', 'persistence_mae',
+        'skill', 'coverage', 'n'}}, plus 'rows_per_second' and 'hours'
+    """
+    epochs = records["epoch"]
+    hour_of = epochs - epochs % STEP
+    hours, first = np.unique(hour_of, return_index=True)
+    index = np.searchsorted(hours, hour_of)
+    observed = {}
+    for name in VARIABLES:
+        values = records[name].astype(np.float64)
+        valid = ~np.isnan(values)
+        counts = np.bincount(index[valid], minlength=len(hours))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            observed[name] = np.bincount(index[valid], values[valid], len(hours)) / counts
+
+    nowcast = StationNowcast("backtest")
+    longest = max(horizons)
+    forecasts = {}
+    start = time.perf_counter()
+    bounds = list(first) + [len(records)]
+    for i in range(len(hours)):
+        nowcast.ingest(records[bounds[i]:bounds[i + 1]])
+        if i >= warmup:
+            forecasts[i] = nowcast.forecast(longest)
+    elapsed = time.perf_counter() - start
+
+    result = {"rows_per_second": len(records) / elapsed if elapsed else float("inf"),
+              "hours": len(hours)}
+    position = {hour: i for i, hour in enumerate(hours)}
+    for name in VARIABLES:
+        scores = {}
+        for horizon in horizons:
+            errors, persistence, inside = [], [], []
+            for i, forecast in forecasts.items():
+                if forecast is None or name not in forecast:
+                    continue
+                target = position.get(hours[i] + horizon * STEP)
+                if target is None or np.isnan(observed[name][target]) or np.isnan(observed[name][i]):
+                    continue
+                means, low, high = forecast[name]
+                actual = observed[name][target]
+                errors.append(abs(means[horizon - 1] - actual))
+                persistence.append(abs(observed[name][i] - actual))
+                inside.append(low[horizon - 1] <= actual <= high[horizon - 1])
+            if errors:
+                mae, persistence_mae = float(np.mean(errors)), float(np.mean(persistence))
+                scores[horizon] = {"mae": mae, "persistence_mae": persistence_mae,
+                                   "skill": 1 - mae / persistence_mae if persistence_mae else float("nan"),
+                                   "coverage": float(np.mean(inside)), "n": len(errors)}
+        result[name] = scores
+    return result
+
+
+def main(argv=None):
+    """Print a station's nowcast, or backtest it over stored history"""
+    import argparse
+
+    from sf_wave.records import format_epoch
+
+    parser = argparse.ArgumentParser(description="Short-term wave nowcast from stored observations")
+    parser.add_argument("station", help="NDBC station ID")
+    parser.add_argument("--hours", type=int, default=DEFAULT_HOURS,
+                        help=f"Hours to forecast (default: {DEFAULT_HOURS})")
+    parser.add_argument("--backtest", action="store_true", help="Score the model over stored history")
+    parser.add_argument("--reset", action="store_true", help="Discard saved state and refit from history")
+    parser.add_argument("--root", help="Store directory")
+    args = parser.parse_args(argv)
+
+    store = TimeSeriesStore(args.root)
+    if args.backtest:
+        records = store.read(args.station, "txt")
+        if not len(records):
+            print(f"No stored observations for station {args.station}")
+            return
+        result = backtest(records)
+        print(f"{len(records)} rows, {result['hours']} hours, {result['rows_per_second']:,.0f} rows/s")
+        print(f"{'Variable':<8} {'Hours':>5} {'MAE':>7} {'Persist':>7} {'Skill':>6} {'In 90%':>6} {'N':>6}")
+        for name in VARIABLES:
+            for horizon, score in result[name].items():
+                print(f"{name:<8} {horizon:5d} {score['mae']:7.3f} {score['persistence_mae']:7.3f} "
+                      f"{score['skill']:6.2f} {score['coverage']:6.2f} {score['n']:6d}")
+        return
+
+    state = NowcastState()
+    if args.reset and os.path.exists(state.path(args.station)):
+        os.remove(state.path(args.station))
+    nowcast, used = catch_up(args.station, store, state)
+    forecast = nowcast.forecast(args.hours)
+    if forecast is None:
+        print(f"No stored observations for station {args.station}")
+        return
+    print(f"Station {args.station}: {used} new rows, last observation {format_epoch(nowcast.newest)}")
+    print(f"{'Hour (UTC)':<17} " + " ".join(f"{name + ' (90%)':>21}" for name in VARIABLES))
+    for i, epoch in enumerate(forecast["epoch"]):
+        cells = []
+        for name in VARIABLES:
+            if name in forecast:
+                mean, low, high = (values[i] for values in forecast[name])
+                cells.append(f"{mean:6.2f} ({low:5.2f}-{high:5.2f})".rjust(21))
+            else:
+                cells.append(f"{'-':>21}")
+        print(f"{format_epoch(int(epoch)):<17} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
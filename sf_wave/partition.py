@@ -0,0 +1,371 @@
+"""
+Swell and wind-sea partitioning of directional wave spectra
+
+The .spec summary splits the sea state into one swell and one wind-sea
+number, so a long-period NW swell and a southerly swell running at the same
+time come out as a single blended "swell". This module separates every
+wave train in a station's spectral history:
+
+1. The directional spectrum E(f, theta) of every timestamp is rebuilt from
+   the .data_spec density and the .swdir/.swdir2/.swr1/.swr2 coefficients
+   with the maximum entropy method. NDBC's truncated Fourier series would be
+   cheaper, but its negative and mirrored lobes show up as phantom swells.
+   The maximum entropy estimate has its own artefact: an ordinary
+   unimodal swell often comes out as two lobes mirrored about its mean
+   direction, which step 3 merges back together.
+2. Watershed by steepest ascent: each (f, theta) cell points at its highest
+   neighbour (directions wrap around), and pointer jumping follows those
+   links to a local peak, labelling every cell with its partition.
+3. Partitions holding less than MIN_ENERGY_FRACTION of a timestamp's energy
+   are folded into the nearest stronger partition, as are partitions whose
+   peaks lie within MERGE_FREQUENCY and MERGE_DIRECTION of a stronger one
+   and twin lobes mirrored about a stronger peak's alpha1. Two real swells
+   with the same period arriving symmetrically about their mean direction
+   are indistinguishable from such twins in NDBC's four coefficients and
+   are reported as one train.
+
+All timestamps are processed together as one (time, frequency, direction)
+array; the only Python loops run over neighbour offsets and partition ranks.
+Partitions peaking above NDBC's swell/wind-sea separation frequency are
+flagged as wind sea.
+"""
+
+import sys
+
+import numpy as np
+
+from sf_wave.spectra import bandwidths
+
+# Direction bins of the rebuilt directional spectrum
+DIRECTION_BINS = 36
+
+# r1 and r2 are capped below 1, where the maximum entropy estimate is singular
+MAX_R1 = 0.99
+
+# Partitions with less than this share of a timestamp's energy are merged away
+MIN_ENERGY_FRACTION = 0.05
+
+# Peaks inside this ellipse around a stronger peak are the same wave train
+# (fraction of the peak frequency, degrees)
+MERGE_FREQUENCY = 0.15
+MERGE_DIRECTION = 45.0
+
+# The maximum entropy method splits a single swell into two lobes mirrored
+# about its mean direction alpha1: peaks within MERGE_FREQUENCY of a stronger
+# one, less than TWIN_SEPARATION degrees from it and whose midpoint lies
+# within TWIN_DIRECTION degrees of the stronger peak's alpha1 are merged
+TWIN_DIRECTION = 10.0
+TWIN_SEPARATION = 150.0
+
+# Hs error (m) allowed when --check partitions a synthetic 1 m swell
+SYNTHETIC_HS_TOLERANCE = 0.05
+
+# Most partitions reported per timestamp (by energy)
+MAX_PARTITIONS = 4
+
+# One row per partition per timestamp
+PARTITION_DTYPE = np.dtype([
+    ("epoch", "<i8"),
+    ("rank", "<i2"),
+    ("hs", "<f4"),
+    ("tp", "<f4"),
+    ("tm01", "<f4"),
+    ("peak_direction", "<f4"),
+    ("mean_direction", "<f4"),
+    ("energy_fraction", "<f4"),
+    ("wind_sea", "?"),
+])
+
+
+def directional_spectrum(spectra, bins=DIRECTION_BINS):
+    """
+    Rebuild E(f, theta) for every timestamp with the maximum entropy method
+
+    Bins without directional data get an isotropic distribution; each bin's
+    distribution is normalized so the energy of S(f) is preserved.
+
+    Returns:
+        (density, directions): density is a (time, frequency, direction)
+        array in m^2/Hz/bin; directions are the bin centers in degrees
+    """
+    directions = (np.arange(bins) + 0.5) * 360.0 / bins
+    theta = np.radians(directions)
+
+    def coefficient(values):
+        if values is None:
+            return np.zeros_like(spectra.density)
+        return np.nan_to_num(values)
+
+    # First two circular moments of the distribution, from NDBC's direction files
+    r1 = np.minimum(coefficient(spectra.r1), MAX_R1)
+    r2 = np.minimum(coefficient(spectra.r2), MAX_R1)
+    c1 = r1 * np.exp(1j * np.radians(coefficient(spectra.alpha1)))
+    c2 = r2 * np.exp(2j * np.radians(coefficient(spectra.alpha2)))
+
+    # Lygre & Krogstad (1986): the smoothest distribution matching both moments;
+    # single precision is plenty for the (time, frequency, direction) part
+    phi1 = ((c1 - c2 * np.conj(c1)) / (1 - np.abs(c1) ** 2)).astype(np.complex64)
+    phi2 = (c2 - c1 * phi1).astype(np.complex64)
+    rotation = np.exp(-1j * theta).astype(np.complex64)
+    residual = 1 - phi1[..., None] * rotation - phi2[..., None] * (rotation * rotation)
+    spreading = 1.0 / np.maximum(residual.real ** 2 + residual.imag ** 2, np.float32(1e-12))
+    spreading /= spreading.sum(axis=2, keepdims=True)
+
+    return np.nan_to_num(spectra.density).astype(np.float32)[..., None] * spreading, directions
+
+
+def watershed(values):
+    """
+    Label each cell of a (time, frequency, direction) array with its peak
+
+    Returns:
+        Integer array of the same shape holding the flat index of the local
+        maximum each cell climbs to
+    """
+    times, frequencies, directions = values.shape
+    # Directions wrap around: pad one bin on each side so every shift is a view
+    padded = np.concatenate([values[..., -1:], values, values[..., :1]], axis=2)
+    offsets = [(df, dd) for df in (-1, 0, 1) for dd in (-1, 0, 1) if df or dd]
+
+    # Index into offsets of each cell's highest neighbour (-1: the cell is a peak).
+    # Masked writes are slow on scattered masks, so both updates are plain arithmetic
+    best = values.copy()
+    step = np.full(values.shape, -1, dtype=np.int8)
+    higher = np.empty(values.shape, dtype=bool)
+    for code, (df, dd) in enumerate(offsets):
+        rows = slice(max(0, -df), frequencies - max(0, df))
+        neighbour = padded[:, max(0, df):frequencies + min(0, df), 1 + dd:1 + dd + directions]
+        region, current = higher[:, rows], step[:, rows]
+        np.greater(neighbour, best[:, rows], out=region)
+        np.maximum(best[:, rows], neighbour, out=best[:, rows])
+        current += region.view(np.int8) * (np.int8(code) - current)
+
+    # Flat offset of every (code, direction) move, directions wrapping around; the
+    # extra last row (code -1) keeps peaks in place
+    index = np.int32 if values.size < 2 ** 31 else np.int64
+    direction_index = np.arange(directions)
+    moves = np.zeros((len(offsets) + 1, directions), dtype=index)
+    for code, (df, dd) in enumerate(offsets):
+        moves[code] = df * directions + (direction_index + dd) % directions - direction_index
+    parent = np.arange(values.size, dtype=index).reshape(values.shape)
+    parent += moves[step, direction_index]
+    parent = parent.reshape(-1)
+    while True:
+        jumped = parent[parent]
+        if np.array_equal(jumped, parent):
+            return parent.reshape(values.shape)
+        parent = jumped
+
+
+def partition_spectra(spectra, bins=DIRECTION_BINS, max_partitions=MAX_PARTITIONS):
+    """
+    Split every timestamp of a Spectra into wave trains
+
+    Args:
+        spectra: sf_wave.spectra.Spectra (directional files optional)
+        bins: Direction bins of the rebuilt directional spectrum
+        max_partitions: Most partitions kept per timestamp
+
+    Returns:
+        Structured array of PARTITION_DTYPE, ordered by timestamp (as in
+        spectra) and then by energy; rank 0 is the most energetic train
+    """
+    # Without directional data every bin is isotropic: one direction bin finds the same peaks
+    if spectra.alpha1 is None:
+        bins = 1
+    # Climb the density, since NDBC bins widen above 0.1 Hz; sum the energy per cell
+    density, directions = directional_spectrum(spectra, bins)
+    times, n_frequencies, n_directions = density.shape
+    roots = watershed(density).reshape(-1)
+    energy = density * bandwidths(spectra.frequencies)[None, :, None]
+
+    # Number the peak cells, then take energy-weighted sums per raw partition
+    cells = np.flatnonzero(roots == np.arange(roots.size, dtype=roots.dtype))
+    number = np.zeros(roots.size, dtype=roots.dtype)
+    number[cells] = np.arange(len(cells))
+    labels = number[roots]
+    theta = np.radians(directions)
+    sums = {
+        "m0": np.bincount(labels, energy.reshape(-1), len(cells)),
+        "m1": np.bincount(labels, (energy * spectra.frequencies[None, :, None]).reshape(-1), len(cells)),
+        "cos": np.bincount(labels, (energy * np.cos(theta)).reshape(-1), len(cells)),
+        "sin": np.bincount(labels, (energy * np.sin(theta)).reshape(-1), len(cells)),
+    }
+    nonempty = sums["m0"] > 0
+    peaks = cells[nonempty]
+    sums = {key: values[nonempty] for key, values in sums.items()}
+    peak_time = peaks // (n_frequencies * n_directions)
+    peak_frequency = spectra.frequencies[(peaks // n_directions) % n_frequencies]
+    peak_direction = directions[peaks % n_directions]
+    # Mean direction (alpha1) of each peak's frequency bin, the axis twin lobes mirror about
+    peak_alpha1 = (np.asarray(spectra.alpha1, dtype=np.float64)[peak_time, (peaks // n_directions) % n_frequencies]
+                   if spectra.alpha1 is not None else np.full(len(peaks), np.nan))
+    total = np.bincount(peak_time, sums["m0"], times)
+
+    # Lay the partitions of each timestamp out in rows of a (time, rank) table, strongest first
+    order = np.lexsort((-sums["m0"], peak_time))
+    peaks, peak_time = peaks[order], peak_time[order]
+    sums = {key: values[order] for key, values in sums.items()}
+    peak_frequency, peak_direction = peak_frequency[order], peak_direction[order]
+    peak_alpha1 = peak_alpha1[order]
+    counts = np.bincount(peak_time, minlength=times)
+    rank = np.arange(len(peaks)) - np.repeat(np.cumsum(counts) - counts, counts)
+    width = int(counts.max()) if len(peaks) else 0
+    slot = np.full((times, max(width, 1)), -1, dtype=np.int64)
+    slot[peak_time, rank] = np.arange(len(peaks))
+
+    # Merge weak partitions, near-duplicate peaks and twin lobes into the closest stronger survivor
+    target = np.arange(len(peaks))
+    minor = sums["m0"] < MIN_ENERGY_FRACTION * total[peak_time]
+    for r in range(1, width):
+        current = slot[:, r]
+        present = current >= 0
+        candidates = slot[:, :r]
+        valid = (candidates >= 0) & present[:, None]
+        candidates = np.where(valid, candidates, 0)
+        own = np.where(present, current, 0)
+        # Distance in peak frequency (relative) and direction (wrapped) to each stronger peak
+        frequency_gap = np.abs(peak_frequency[candidates] - peak_frequency[own][:, None]) / peak_frequency[own][:, None]
+        direction_gap = np.abs((peak_direction[candidates] - peak_direction[own][:, None] + 180) % 360 - 180)
+        distance = (frequency_gap / MERGE_FREQUENCY) ** 2 + (direction_gap / MERGE_DIRECTION) ** 2
+        # Twin lobes: same frequency peak, mirrored about the stronger peak's alpha1
+        midpoint = (peak_direction[own][:, None]
+                    + ((peak_direction[candidates] - peak_direction[own][:, None] + 180) % 360 - 180) / 2)
+        skew = np.abs((midpoint - peak_alpha1[candidates] + 180) % 360 - 180)
+        twin = (frequency_gap < MERGE_FREQUENCY) & (skew < TWIN_DIRECTION) & (direction_gap < TWIN_SEPARATION)
+        distance = np.where(twin, 0.0, distance)
+        surviving = valid & (target[candidates] == candidates)
+        distance = np.where(surviving, distance, np.inf)
+        nearest = np.argmin(distance, axis=1)
+        close = np.take_along_axis(distance, nearest[:, None], axis=1)[:, 0]
+        merge = present & np.isfinite(close) & (minor[own] | (close < 1.0))
+        target[own[merge]] = candidates[merge, nearest[merge]]
+        # A merged twin pair peaks between its lobes
+        paired = merge & np.take_along_axis(twin, nearest[:, None], axis=1)[:, 0]
+        peak_direction[candidates[paired, nearest[paired]]] = midpoint[paired, nearest[paired]] % 360
+    target = target[target]
+
+    # Re-aggregate the merged partitions
+    survivors, label = np.unique(target, return_inverse=True)
+    merged = {key: np.bincount(label, values, len(survivors)) for key, values in sums.items()}
+    survivor_time = peak_time[survivors]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result_order = np.lexsort((-merged["m0"], survivor_time))
+        survivor_counts = np.bincount(survivor_time, minlength=times)
+        survivor_rank = np.empty(len(survivors), dtype=np.int64)
+        survivor_rank[result_order] = (np.arange(len(survivors))
+                                       - np.repeat(np.cumsum(survivor_counts) - survivor_counts, survivor_counts))
+        keep = result_order[survivor_rank[result_order] < max_partitions]
+
+        directional = spectra.alpha1 is not None
+        separation = spectra.separation if spectra.separation is not None else np.full(times, np.nan)
+        result = np.empty(len(keep), dtype=PARTITION_DTYPE)
+        result["epoch"] = spectra.epochs[survivor_time[keep]]
+        result["rank"] = survivor_rank[keep]
+        result["hs"] = 4 * np.sqrt(merged["m0"][keep])
+        result["tp"] = 1.0 / peak_frequency[survivors[keep]]
+        result["tm01"] = merged["m0"][keep] / merged["m1"][keep]
+        result["peak_direction"] = peak_direction[survivors[keep]] if directional else np.nan
+        result["mean_direction"] = (np.degrees(np.arctan2(merged["sin"][keep], merged["cos"][keep])) % 360
+                                    if directional else np.nan)
+        result["energy_fraction"] = merged["m0"][keep] / total[survivor_time[keep]]
+        result["wind_sea"] = peak_frequency[survivors[keep]] > separation[survivor_time[keep]]
+    return result
+
+
+def synthetic_spectra(trains, rows=1, frequencies=None, interval=1800):
+    """
+    Spectra of superposed cos-2s wave trains, with NDBC's per-bin moments
+
+    Args:
+        trains: (peak_frequency, direction, spread s, hs) per train, each a
+            Gaussian in frequency 8% of its peak frequency wide
+        rows: Identical timestamps `interval` seconds apart
+        frequencies: Bin centers (Hz); defaults to NDBC's 47-bin layout
+
+    Returns:
+        Spectra with density, separation and alpha1/alpha2/r1/r2 filled in
+    """
+    from sf_wave.spectra import Spectra
+
+    if frequencies is None:
+        frequencies = np.concatenate([[0.02], np.arange(0.0325, 0.0926, 0.005),
+                                      np.arange(0.10, 0.351, 0.01), np.arange(0.365, 0.486, 0.02)])
+    density, first, second = 0.0, 0.0, 0.0
+    for peak, direction, spread, hs in trains:
+        energy = np.exp(-0.5 * ((frequencies - peak) / (0.08 * peak)) ** 2)
+        energy *= (hs / 4) ** 2 / (energy * bandwidths(frequencies)).sum()
+        angle = np.radians(direction)
+        density = density + energy
+        first = first + energy * spread / (spread + 1) * np.exp(1j * angle)
+        second = second + energy * spread * (spread - 1) / ((spread + 1) * (spread + 2)) * np.exp(2j * angle)
+    first, second = first / np.maximum(density, 1e-30), second / np.maximum(density, 1e-30)
+    rows_of = lambda values: np.tile(values, (rows, 1))
+    return Spectra("synthetic", np.arange(rows)[::-1] * interval, frequencies, rows_of(density),
+                   np.full(rows, 0.1), rows_of(np.degrees(np.angle(first)) % 360),
+                   rows_of(np.degrees(np.angle(second)) / 2 % 360), rows_of(np.abs(first)), rows_of(np.abs(second)))
+
+
+def synthetic_check(direction=300.0, period=14.3, spreads=(10, 5), hs=1.0):
+    """
+    Partition single narrow swells, which must come back as one train
+
+    The maximum entropy estimate of a narrow cos-2s swell is bimodal, so
+    this fails if its twin lobes are reported as two swells.
+
+    Returns:
+        List of (spread, partitions) where partitions holds (hs, tp,
+        peak_direction, energy_fraction) tuples
+    """
+    results = []
+    for spread in spreads:
+        partitions = partition_spectra(synthetic_spectra([(1.0 / period, direction, spread, hs)]))
+        results.append((spread, [(float(row["hs"]), float(row["tp"]), float(row["peak_direction"]),
+                                  float(row["energy_fraction"])) for row in partitions]))
+    return results
+
+
+def main(argv=None):
+    """Print the wave trains found in a station's recent spectra"""
+    import argparse
+
+    from sf_wave.records import format_epoch
+    from sf_wave.spectra import fetch_spectra
+
+    parser = argparse.ArgumentParser(description="Split NDBC spectra into swell and wind-sea partitions")
+    parser.add_argument("station", nargs="?", help="NDBC station ID")
+    parser.add_argument("--rows", type=int, default=5, help="Newest timestamps to print (default: 5)")
+    parser.add_argument("--check", action="store_true",
+                        help="Partition synthetic single swells instead; exit 1 unless each is one train")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failed, direction = False, 300.0
+        for spread, partitions in synthetic_check(direction):
+            print(f"s={spread}: " + ", ".join(f"{hs:.2f} m {tp:.1f} s {direction:.0f}° {fraction * 100:.0f}%"
+                                               for hs, tp, direction, fraction in partitions))
+            failed |= (len(partitions) != 1 or abs((partitions[0][2] - direction + 180) % 360 - 180)
+                       > 360 / DIRECTION_BINS or abs(partitions[0][0] - 1.0) > SYNTHETIC_HS_TOLERANCE)
+        print("FAIL" if failed else "OK")
+        return 1 if failed else 0
+    if args.station is None:
+        parser.error("a station ID is required unless --check is given")
+
+    spectra = fetch_spectra(args.station)
+    if spectra is None:
+        print(f"No spectral data for station {args.station}")
+        return 1
+    partitions = partition_spectra(spectra)
+    print(f"{spectra!r}")
+    for epoch in spectra.epochs[:args.rows]:
+        print(f"\n{format_epoch(int(epoch))}")
+        for row in partitions[partitions["epoch"] == epoch]:
+            direction = f"{row['mean_direction']:5.0f}°" if np.isfinite(row["mean_direction"]) else "    -"
+            kind = "wind sea" if row["wind_sea"] else "swell"
+            print(f"  {row['hs']:4.1f} m  {row['tp']:4.1f} s  {direction}  "
+                  f"{row['energy_fraction'] * 100:3.0f}%  {kind}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Compact typed records for buoy observations, spectral summaries and tides
+
+The scripts used to pass rows around as dicts of strings and call float()
+again at display time. These record classes parse every number once at
+ingest (NaN for NDBC's 'MM' and other missing values) and use __slots__, so
+a row costs a few hundred bytes instead of a dict plus one string per
+column. For whole-history work use sf_wave.columnar, whose column arrays
+can be turned into records with observations_from_columns().
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+# Placeholder stored for any missing measurement
+MISSING = float("nan")
+
+# Text NOAA uses for missing values
+MISSING_TEXT = ("MM", "N/A", "")
+
+# CO-OPS station standard-time offset (hours) and DST flag -> zone whose rules lst_ldt follows
+STATION_ZONES = {
+    (-4, False): "America/Puerto_Rico",
+    (-5, True): "America/New_York",
+    (-6, True): "America/Chicago",
+    (-7, True): "America/Denver",
+    (-7, False): "America/Phoenix",
+    (-8, True): "America/Los_Angeles",
+    (-9, True): "America/Anchorage",
+    (-10, True): "America/Adak",
+    (-10, False): "Pacific/Honolulu",
+    (10, False): "Pacific/Guam",
+    (-11, False): "Pacific/Pago_Pago",
+}
+
+
+def parse_number(text):
+    """Parse a numeric field, returning NaN for missing or malformed values"""
+    if text is None or text in MISSING_TEXT:
+        return MISSING
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def is_missing(value):
+    """Return True for a missing (NaN or None) measurement"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def format_number(value):
+    """Format a measurement the way NDBC prints it (no trailing zeros)"""
+    return f"{value:g}"
+
+
+def row_epoch(row):
+    """Merge the YY/MM/DD/hh/mm fields of a realtime2 row into UTC epoch seconds"""
+    try:
+        moment = datetime(int(row["YY"]), int(row["MM"]), int(row["DD"]),
+                          int(row["hh"]), int(row["mm"]), tzinfo=timezone.utc)
+    except (KeyError, ValueError):
+        return None
+    return int(moment.timestamp())
+
+
+def format_epoch(epoch):
+    """Format UTC epoch seconds like the realtime2 timestamp columns"""
+    if epoch is None:
+        return "Unknown"
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def plain_value(value):
+    """JSON-friendly form of a record field: None for missing numbers, ISO text for datetimes"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="minutes")
+    return value
+
+
+def record_dict(record):
+    """A record's fields as a plain dictionary (see plain_value)"""
+    return {name: plain_value(getattr(record, name)) for name in record.__slots__}
+
+
+class Observation:
+    """One row of a realtime2 .txt file (standard meteorological data)"""
+
+    __slots__ = ("time", "wind_direction", "wind_speed", "gust", "wave_height",
+                 "dominant_period", "average_period", "wave_direction",
+                 "pressure", "air_temperature", "water_temperature")
+
+    # realtime2 column -> attribute
+    COLUMNS = {
+        "WDIR": "wind_direction",
+        "WSPD": "wind_speed",
+        "GST": "gust",
+        "WVHT": "wave_height",
+        "DPD": "dominant_period",
+        "APD": "average_period",
+        "MWD": "wave_direction",
+        "PRES": "pressure",
+        "ATMP": "air_temperature",
+        "WTMP": "water_temperature",
+    }
+
+    def __init__(self, time=None, **values):
+        self.time = time
+        for attribute in self.COLUMNS.values():
+            setattr(self, attribute, values.pop(attribute, MISSING))
+        if values:
+            raise TypeError(f"Unknown Observation fields: {', '.join(values)}")
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an observation from a {column: text} realtime2 row"""
+        values = {attribute: parse_number(row.get(column))
+                  for column, attribute in cls.COLUMNS.items()}
+        return cls(row_epoch(row), **values)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Observation({fields})"
+
+
+class SpectralReading:
+    """One row of a realtime2 .spec file (spectral wave summary)"""
+
+    __slots__ = ("time", "wave_height", "swell_height", "swell_period",
+                 "wind_wave_height", "wind_wave_period", "swell_direction",
+                 "wind_wave_direction", "steepness", "average_period",
+                 "wave_direction")
+
+    # realtime2 column -> attribute, for numeric columns
+    COLUMNS = {
+        "WVHT": "wave_height",
+        "SwH": "swell_height",
+        "SwP": "swell_period",
+        "WWH": "wind_wave_height",
+        "WWP": "wind_wave_period",
+        "APD": "average_period",
+        "MWD": "wave_direction",
+    }
+
+    # realtime2 column -> attribute, for text columns (compass points, steepness)
+    TEXT_COLUMNS = {
+        "SwD": "swell_direction",
+        "WWD": "wind_wave_direction",
+        "STEEPNESS": "steepness",
+    }
+
+    def __init__(self, time=None, **values):
+        self.time = time
+        for attribute in self.COLUMNS.values():
+            setattr(self, attribute, values.pop(attribute, MISSING))
+        for attribute in self.TEXT_COLUMNS.values():
+            setattr(self, attribute, values.pop(attribute, None))
+        if values:
+            raise TypeError(f"Unknown SpectralReading fields: {', '.join(values)}")
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a reading from a {column: text} realtime2 .spec row"""
+        values = {attribute: parse_number(row.get(column))
+                  for column, attribute in cls.COLUMNS.items()}
+        for column, attribute in cls.TEXT_COLUMNS.items():
+            text = row.get(column)
+            values[attribute] = None if text in MISSING_TEXT else text
+        return cls(row_epoch(row), **values)
+
+    @property
+    def period(self):
+        """Best available wave period (NDBC .spec files carry APD, not DPD)"""
+        return self.average_period
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"SpectralReading({fields})"
+
+
+class ForecastPeriod:
+    """One period of the NWS marine point forecast (text only, no wave data)"""
+
+    __slots__ = ("name", "weather", "text")
+
+    def __init__(self, name, weather, text):
+        self.name = name
+        self.weather = weather
+        self.text = text
+
+    def __repr__(self):
+        return f"ForecastPeriod(name={self.name!r}, weather={self.weather!r}, text={self.text!r})"
+
+
+def station_zone(utc_offset, observes_dst=False):
+    """
+    Time zone of a CO-OPS station's local (lst_ldt) times
+
+    Args:
+        utc_offset: Standard-time offset from UTC in hours (CO-OPS timezonecorr)
+        observes_dst: Whether the station's local time observes daylight saving
+
+    Returns:
+        A tzinfo, or None when the offset is unknown
+    """
+    if utc_offset is None:
+        return None
+    name = STATION_ZONES.get((int(utc_offset), bool(observes_dst)))
+    if name:
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+        try:
+            return ZoneInfo(name)
+        except ZoneInfoNotFoundError:
+            pass
+    return timezone(timedelta(hours=utc_offset))
+
+
+class TideEvent:
+    """A predicted high or low tide from CO-OPS"""
+
+    __slots__ = ("time", "height", "is_high")
+
+    def __init__(self, time, height, is_high):
+        self.time = time
+        self.height = height
+        self.is_high = is_high
+
+    @classmethod
+    def from_prediction(cls, prediction, zone=None):
+        """
+        Build an event from a CO-OPS {'t': ..., 'v': ..., 'type': ...} prediction
+
+        The time is station-local (lst_ldt); pass the station's zone (see
+        station_zone) to get an aware datetime rather than a naive one.
+        """
+        try:
+            time = datetime.strptime(prediction.get("t", ""), "%Y-%m-%d %H:%M")
+            if zone is not None:
+                time = time.replace(tzinfo=zone)
+        except ValueError:
+            time = None
+        return cls(time, parse_number(prediction.get("v")), prediction.get("type") == "H")
+
+    @property
+    def kind(self):
+        return "High" if self.is_high else "Low"
+
+    def __repr__(self):
+        return f"TideEvent(time={self.time!r}, height={self.height!r}, is_high={self.is_high!r})"
+
+
+def records_from_text(data_text, record_class, rows=None):
+    """
+    Parse realtime2 file text into records, newest first
+
+    Args:
+        data_text: File text with its two '#' header lines
+        record_class: Observation or SpectralReading
+        rows: Stop after this many data rows (default: all of them)
+    """
+    lines = data_text.split("\n")
+    if not lines or not lines[0].startswith("#"):
+        return []
+    headers = lines[0].lstrip("#").split()
+
+    records = []
+    for line in lines[1:]:
+        if line.startswith("#") or not line.strip():
+            continue
+        values = line.split()
+        if len(values) < len(headers):
+            continue
+        records.append(record_class.from_row(dict(zip(headers, values))))
+        if rows and len(records) == rows:
+            break
+    return records
+
+
+def observations_from_columns(columns):
+    """Turn sf_wave.columnar.parse_realtime2() output for a .txt file into Observations"""
+    present = {column: attribute for column, attribute in Observation.COLUMNS.items()
+               if column in columns}
+    series = {attribute: columns[column].tolist() for column, attribute in present.items()}
+    epochs = columns["epoch"].tolist()
+    return [Observation(epoch, **{attribute: values[i] for attribute, values in series.items()})
+            for i, epoch in enumerate(epochs)]
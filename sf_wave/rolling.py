@@ -0,0 +1,348 @@
+"""
+Streaming rolling-window statistics over buoy observations
+
+Recomputing a 7-day mean or percentile from parsed rows on every request
+rescans the whole window. This stage keeps every window up to date as rows
+arrive from the realtime2 parser (or the local store) instead, for many
+stations at once:
+
+- running sum and sum of squares for the mean and standard deviation
+- monotonic deques for the minimum and maximum: each value is pushed and
+  popped at most once, so both are O(1) amortized per row
+- a log-bucketed quantile sketch (DDSketch style): every value lands in
+  the bucket ceil(log(x) / log(gamma)), which bounds the relative error of
+  any percentile by SKETCH_ACCURACY. Buckets are plain counts, so a value
+  leaving the window is subtracted exactly and sketches of several
+  stations add up to a regional one.
+
+Windows are measured in observation time: a window of length W holds the
+rows with newest - W < epoch <= newest. Only the longest window's rows are
+checkpointed, since every shorter window and all running totals can be
+rebuilt from them.
+"""
+
+import math
+import os
+from collections import deque
+
+import numpy as np
+
+# Where the checkpoint lives (override with SF_WAVE_ROLLING_DIR)
+DEFAULT_ROLLING_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "rolling")
+
+CHECKPOINT_FILE = "rolling.npz"
+
+# Tracked .txt columns
+VARIABLES = ("WVHT", "DPD", "WSPD")
+
+# Window name -> length in seconds
+WINDOWS = {"1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600, "7d": 7 * 24 * 3600}
+
+# Percentiles reported by RollingStats.current()
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Relative accuracy of the quantile sketch and the value range it covers
+SKETCH_ACCURACY = 0.01
+SKETCH_MIN = 0.01
+SKETCH_MAX = 1000.0
+
+SKETCH_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+SKETCH_LOG_GAMMA = math.log(SKETCH_GAMMA)
+SKETCH_OFFSET = math.ceil(math.log(SKETCH_MIN) / SKETCH_LOG_GAMMA)
+SKETCH_BUCKETS = math.ceil(math.log(SKETCH_MAX) / SKETCH_LOG_GAMMA) - SKETCH_OFFSET + 1
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with deletions
+
+    Values below SKETCH_MIN (calm winds, flat seas) share a zero bucket;
+    values above SKETCH_MAX are clamped into the last bucket.
+    """
+
+    __slots__ = ("counts", "zeros", "total")
+
+    def __init__(self):
+        self.counts = np.zeros(SKETCH_BUCKETS, dtype=np.int64)
+        self.zeros = 0
+        self.total = 0
+
+    @staticmethod
+    def bucket(value):
+        """Bucket of a value >= SKETCH_MIN"""
+        index = math.ceil(math.log(value) / SKETCH_LOG_GAMMA) - SKETCH_OFFSET
+        return min(max(index, 0), SKETCH_BUCKETS - 1)
+
+    def add(self, value, count=1):
+        """Add a value (a negative count removes it)"""
+        if value < SKETCH_MIN:
+            self.zeros += count
+        else:
+            self.counts[self.bucket(value)] += count
+        self.total += count
+
+    def merge(self, other):
+        """A new sketch holding the values of both"""
+        merged = QuantileSketch()
+        merged.counts = self.counts + other.counts
+        merged.zeros = self.zeros + other.zeros
+        merged.total = self.total + other.total
+        return merged
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or NaN when empty"""
+        if self.total <= 0:
+            return float("nan")
+        rank = q * (self.total - 1)
+        if rank < self.zeros:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        index = min(index, SKETCH_BUCKETS - 1)
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i]
+        return 2 * SKETCH_GAMMA ** (index + SKETCH_OFFSET) / (SKETCH_GAMMA + 1)
+
+
+class RollingWindow:
+    """Statistics of one variable over the last `seconds` of observations"""
+
+    __slots__ = ("seconds", "rows", "total", "squares", "maxima", "minima", "sketch", "_quantiles")
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.rows = deque()
+        self.total = 0.0
+        self.squares = 0.0
+        # Candidates for the max (values decreasing) and min (values increasing)
+        self.maxima = deque()
+        self.minima = deque()
+        self.sketch = QuantileSketch()
+        self._quantiles = None
+
+    def add(self, epoch, value):
+        self.rows.append((epoch, value))
+        self.total += value
+        self.squares += value * value
+        while self.maxima and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        self.maxima.append((epoch, value))
+        while self.minima and self.minima[-1][1] >= value:
+            self.minima.pop()
+        self.minima.append((epoch, value))
+        self.sketch.add(value)
+        self._quantiles = None
+
+    def evict(self, newest):
+        """Drop rows at or before newest - seconds"""
+        cutoff = newest - self.seconds
+        rows = self.rows
+        if not rows or rows[0][0] > cutoff:
+            return
+        while rows and rows[0][0] <= cutoff:
+            _, value = rows.popleft()
+            self.total -= value
+            self.squares -= value * value
+            self.sketch.add(value, -1)
+        if not rows:
+            # Start the sums over instead of carrying rounding error forward
+            self.total = self.squares = 0.0
+        while self.maxima and self.maxima[0][0] <= cutoff:
+            self.maxima.popleft()
+        while self.minima and self.minima[0][0] <= cutoff:
+            self.minima.popleft()
+        self._quantiles = None
+
+    def stats(self):
+        """Current count, mean, std, min, max and QUANTILES (NaN when empty)"""
+        count = len(self.rows)
+        if not count:
+            empty = float("nan")
+            return dict({"count": 0, "mean": empty, "std": empty, "min": empty, "max": empty},
+                        **{f"p{round(q * 100)}": empty for q in QUANTILES})
+        if self._quantiles is None:
+            self._quantiles = {f"p{round(q * 100)}": self.sketch.quantile(q) for q in QUANTILES}
+        mean = self.total / count
+        return dict({"count": count, "mean": mean,
+                     "std": math.sqrt(max(0.0, self.squares / count - mean * mean)),
+                     "min": self.minima[0][1], "max": self.maxima[0][1]}, **self._quantiles)
+
+
+class StationStats:
+    """Every window of every variable for one station"""
+
+    def __init__(self, station_id):
+        self.station_id = station_id
+        self.newest = None
+        self.windows = {name: {label: RollingWindow(seconds) for label, seconds in WINDOWS.items()}
+                        for name in VARIABLES}
+
+    def ingest(self, columns):
+        """
+        Fold in parsed rows in any order; rows not newer than the newest seen are skipped
+
+        Args:
+            columns: parse_realtime2() output or store records (anything
+                indexed by column name, with an 'epoch' column)
+
+        Returns:
+            Number of rows used
+        """
+        epochs = np.asarray(columns["epoch"], dtype=np.int64)
+        order = np.argsort(epochs, kind="stable")
+        if self.newest is not None:
+            order = order[epochs[order] > self.newest]
+        if not len(order):
+            return 0
+        _, unique = np.unique(epochs[order], return_index=True)
+        order = order[unique]
+        epochs = epochs[order].tolist()
+        present = columns.dtype.names if hasattr(columns, "dtype") else columns
+        values = {name: np.asarray(columns[name], dtype=np.float64)[order].tolist() if name in present else None
+                  for name in VARIABLES}
+
+        for i, epoch in enumerate(epochs):
+            for name, windows in self.windows.items():
+                value = values[name][i] if values[name] is not None else float("nan")
+                for window in windows.values():
+                    if value == value:
+                        window.add(epoch, value)
+                    window.evict(epoch)
+        self.newest = epochs[-1]
+        return len(epochs)
+
+    def current(self):
+        """{variable: {window: stats}} as of the newest row"""
+        return {name: {label: window.stats() for label, window in windows.items()}
+                for name, windows in self.windows.items()}
+
+
+class RollingStats:
+    """StationStats for many stations, with checkpointing and merged percentiles"""
+
+    def __init__(self):
+        self.stations = {}
+
+    def station(self, station_id):
+        if station_id not in self.stations:
+            self.stations[station_id] = StationStats(station_id)
+        return self.stations[station_id]
+
+    def ingest(self, station_id, columns):
+        """Fold a station's new rows in (see StationStats.ingest)"""
+        return self.station(station_id).ingest(columns)
+
+    def current(self, station_id):
+        """Current statistics of a station, or None if it has no rows"""
+        stats = self.stations.get(station_id)
+        return stats.current() if stats is not None and stats.newest is not None else None
+
+    def quantile(self, station_ids, variable, window, q):
+        """q-quantile of one variable and window over several stations together"""
+        sketch = QuantileSketch()
+        for station_id in station_ids:
+            if station_id in self.stations:
+                sketch = sketch.merge(self.stations[station_id].windows[variable][window].sketch)
+        return sketch.quantile(q)
+
+    def save(self, root=None):
+        """Checkpoint the longest window of every station and variable (atomic replace)"""
+        root = root or os.environ.get("SF_WAVE_ROLLING_DIR", DEFAULT_ROLLING_DIR)
+        os.makedirs(root, exist_ok=True)
+        longest = max(WINDOWS, key=WINDOWS.get)
+        arrays = {}
+        for station_id, stats in self.stations.items():
+            if stats.newest is None:
+                continue
+            arrays[f"{station_id}/newest"] = np.array([stats.newest], dtype=np.int64)
+            for name, windows in stats.windows.items():
+                rows = windows[longest].rows
+                arrays[f"{station_id}/{name}/epoch"] = np.array([row[0] for row in rows], dtype=np.int64)
+                arrays[f"{station_id}/{name}/value"] = np.array([row[1] for row in rows], dtype=np.float64)
+        path = os.path.join(root, CHECKPOINT_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, root=None):
+        """Rebuild from a checkpoint (empty if there is none)"""
+        root = root or os.environ.get("SF_WAVE_ROLLING_DIR", DEFAULT_ROLLING_DIR)
+        rolling = cls()
+        try:
+            checkpoint = np.load(os.path.join(root, CHECKPOINT_FILE))
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Error reading rolling statistics checkpoint: {e}")
+            return rolling
+        with checkpoint:
+            for key in checkpoint.files:
+                if not key.endswith("/newest"):
+                    continue
+                station_id = key[:-len("/newest")]
+                stats = rolling.station(station_id)
+                newest = int(checkpoint[key][0])
+                for name, windows in stats.windows.items():
+                    if f"{station_id}/{name}/epoch" not in checkpoint.files:
+                        continue
+                    epochs = checkpoint[f"{station_id}/{name}/epoch"].tolist()
+                    values = checkpoint[f"{station_id}/{name}/value"].tolist()
+                    for window in windows.values():
+                        for epoch, value in zip(epochs, values):
+                            if epoch > newest - window.seconds:
+                                window.add(epoch, value)
+                stats.newest = newest
+        return rolling
+
+
+def main(argv=None):
+    """Update rolling statistics with new rows and print them"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rolling-window statistics of buoy observations")
+    parser.add_argument("stations", nargs="+", help="NDBC station IDs")
+    parser.add_argument("--store", action="store_true",
+                        help="Read rows from the local store instead of the realtime2 feed")
+    parser.add_argument("--root", help=f"Checkpoint directory (default: {DEFAULT_ROLLING_DIR})")
+    args = parser.parse_args(argv)
+
+    rolling = RollingStats.load(args.root)
+    station_ids = [station_id.upper() for station_id in args.stations]
+    if args.store:
+        from sf_wave.store import TimeSeriesStore
+
+        store = TimeSeriesStore()
+        sources = {}
+        for station_id in station_ids:
+            newest = rolling.station(station_id).newest
+            sources[station_id] = store.read(station_id, "txt", start=None if newest is None else newest + 1)
+    else:
+        from sf_wave.columnar import parse_realtime2
+        from sf_wave.fetch import fetch_concurrently
+        from sf_wave.ndbc import fetch_realtime2
+
+        sources = fetch_concurrently({station_id: (fetch_realtime2, station_id, "txt", parse_realtime2)
+                                      for station_id in station_ids})
+
+    for station_id in station_ids:
+        if sources.get(station_id) is None:
+            print(f"{station_id}: no data")
+            continue
+        added = rolling.ingest(station_id, sources[station_id])
+        current = rolling.current(station_id)
+        if current is None:
+            print(f"{station_id}: no data")
+            continue
+        print(f"\n{station_id}: {added} new rows")
+        print(f"{'':<5} {'Window':>6} {'N':>5} {'Mean':>6} {'Std':>6} {'Min':>6} {'Max':>6} "
+              + " ".join(f"{f'P{round(q * 100)}':>6}" for q in QUANTILES))
+        for name, windows in current.items():
+            for label, stats in windows.items():
+                numbers = [stats[key] for key in ("mean", "std", "min", "max")]
+                numbers += [stats[f"p{round(q * 100)}"] for q in QUANTILES]
+                print(f"{name:<5} {label:>6} {stats['count']:5d} "
+                      + " ".join(f"{value:6.2f}" if value == value else f"{'-':>6}" for value in numbers))
+    rolling.save(args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Downsampled rollup tiers of station history for long-range charts
+
+Charting a year of wave height from the archive means reading every 10- or
+30-minute row. This module keeps materialized hourly, daily and monthly
+tiers per station and realtime2 file kind, one file of fixed-size records
+per tier, each record holding the count, minimum, maximum and sum of every
+column over one UTC bucket:
+
+    {root}/{station}/{ext}/hour.rows
+    {root}/{station}/{ext}/day.rows
+    {root}/{station}/{ext}/month.rows
+
+Tiers cascade: hours are aggregated from raw rows, days from hours and
+months from days. Updates are incremental and idempotent: every tier
+recomputes only its newest (possibly partial) bucket onwards, so a merge of
+new rows costs a few raw rows plus at most a day of hours and a month of
+days, and an update interrupted half way is repaired by the next one. A
+full rebuild splits the raw history into calendar years, which no bucket of
+any tier straddles, and aggregates them in parallel.
+
+query() plans each request: it picks the coarsest tier whose buckets are no
+longer than the requested resolution (by default the span divided by
+DEFAULT_POINTS), falling back to raw rows for short spans, so a year of
+wave height is ~9,000 hourly points instead of ~50,000 raw rows and ten
+years are ~3,650 daily points. Stored buckets are used up to each tier's
+newest one; the rest of the range (all of it for a tier never built) is
+aggregated on the fly from the next finer tier, and below hours from raw
+rows, so a stale or missing tier never hides recent data.
+
+sf_wave.store.poll_station() updates the tiers whenever it merges new rows.
+"""
+
+import fcntl
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sf_wave.archive import Archive
+from sf_wave.store import SCHEMAS
+
+# Where rollup tiers live (override with SF_WAVE_ROLLUP_DIR)
+DEFAULT_ROLLUP_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "rollups")
+
+# Tier -> nominal bucket length in seconds, finest first (months vary; the
+# mean Gregorian month is used for planning)
+TIERS = {"hour": 3600, "day": 86400, "month": 2629746}
+
+# Tier each coarser tier is aggregated from
+SOURCE_TIERS = {"day": "hour", "month": "day"}
+
+# Points a query aims for when neither a resolution nor a point count is given
+DEFAULT_POINTS = 2000
+
+# Rebuild threads (calendar years aggregated at once)
+DEFAULT_WORKERS = 4
+
+# Aggregates kept for every column of a bucket
+AGGREGATE_DTYPE = np.dtype([("count", "<i4"), ("min", "<f4"), ("max", "<f4"), ("sum", "<f8")])
+
+
+def rollup_dtype(ext):
+    """NumPy dtype of one bucket record for a realtime2 file kind"""
+    return np.dtype([("epoch", "<i8")] + [(name, AGGREGATE_DTYPE) for name in SCHEMAS[ext]])
+
+
+def bucket_starts(epochs, tier):
+    """UTC start of the tier bucket holding each timestamp"""
+    epochs = np.asarray(epochs, dtype=np.int64)
+    if tier == "month":
+        return epochs.astype("datetime64[s]").astype("datetime64[M]").astype("datetime64[s]").astype(np.int64)
+    return epochs - epochs % TIERS[tier]
+
+
+def plan(start, end, resolution=None, points=DEFAULT_POINTS):
+    """
+    Pick the source for a query over [start, end)
+
+    Args:
+        start, end: UTC epoch seconds
+        resolution: Longest acceptable bucket in seconds (default: the span
+            divided by points)
+        points: Points wanted when no resolution is given
+
+    Returns:
+        The coarsest tier name whose buckets fit the resolution, or "raw"
+    """
+    if resolution is None:
+        resolution = (end - start) / max(points, 1)
+    source = "raw"
+    for tier, seconds in TIERS.items():
+        if seconds <= resolution:
+            source = tier
+    return source
+
+
+def read_rows(source, station_id, ext, start=None, end=None, fields=None):
+    """Raw rows with start <= epoch < end from an Archive or a TimeSeriesStore"""
+    if hasattr(source, "query"):
+        return source.query(station_id, ext, start, end, SCHEMAS[ext] if fields is None else fields)
+    return source.read(station_id, ext, start, end)
+
+
+def aggregate(rows, ext, tier):
+    """
+    Bucket raw rows (oldest first) into tier records
+
+    Args:
+        rows: Store records, archive query() output or parse_realtime2()
+            columns; missing columns count as empty
+        ext: realtime2 file kind
+        tier: "hour", "day" or "month"
+    """
+    epochs = np.asarray(rows["epoch"], dtype=np.int64)
+    keys = bucket_starts(epochs, tier)
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    records = np.zeros(len(first), dtype=rollup_dtype(ext))
+    records["epoch"] = keys[first]
+    if not len(first):
+        return records
+    present = rows.dtype.names if hasattr(rows, "dtype") else rows
+    for name in SCHEMAS[ext]:
+        column = records[name]
+        if name not in present:
+            column["min"] = column["max"] = np.nan
+            continue
+        values = np.asarray(rows[name], dtype=np.float32)
+        valid = ~np.isnan(values)
+        column["count"] = np.add.reduceat(valid.astype(np.int32), first)
+        column["sum"] = np.add.reduceat(np.where(valid, values, 0).astype(np.float64), first)
+        # fmin/fmax skip NaN, and give NaN for buckets without a value
+        column["min"] = np.fmin.reduceat(values, first)
+        column["max"] = np.fmax.reduceat(values, first)
+    return records
+
+
+def combine(records, tier):
+    """Merge finer tier records (oldest first) into coarser tier buckets"""
+    keys = bucket_starts(records["epoch"], tier)
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    combined = np.zeros(len(first), dtype=records.dtype)
+    combined["epoch"] = keys[first]
+    if not len(first):
+        return combined
+    for name in records.dtype.names[1:]:
+        column, fine = combined[name], records[name]
+        column["count"] = np.add.reduceat(fine["count"], first)
+        column["sum"] = np.add.reduceat(fine["sum"], first)
+        column["min"] = np.fmin.reduceat(fine["min"], first)
+        column["max"] = np.fmax.reduceat(fine["max"], first)
+    return combined
+
+
+def _aggregate_span(source, station_id, ext, start, end):
+    """Every tier of the raw rows in [start, end), which must not split a month"""
+    hourly = aggregate(read_rows(source, station_id, ext, start, end), ext, "hour")
+    daily = combine(hourly, "day")
+    return {"hour": hourly, "day": daily, "month": combine(daily, "month")}
+
+
+class Rollups:
+    """Hourly, daily and monthly tiers of every station under one directory"""
+
+    def __init__(self, root=None, source=None):
+        """
+        Args:
+            root: Rollup directory (default: SF_WAVE_ROLLUP_DIR or DEFAULT_ROLLUP_DIR)
+            source: Archive or TimeSeriesStore holding the raw rows
+                (default: the local archive)
+        """
+        self.root = root or os.environ.get("SF_WAVE_ROLLUP_DIR", DEFAULT_ROLLUP_DIR)
+        self.source = source if source is not None else Archive()
+
+    def directory(self, station_id, ext):
+        return os.path.join(self.root, str(station_id), ext)
+
+    def path(self, station_id, ext, tier):
+        return os.path.join(self.directory(station_id, ext), f"{tier}.rows")
+
+    def read(self, station_id, ext, tier, start=None, end=None):
+        """Tier records with start <= bucket start < end (oldest first)"""
+        dtype = rollup_dtype(ext)
+        try:
+            count = os.path.getsize(self.path(station_id, ext, tier)) // dtype.itemsize
+        except OSError:
+            count = 0
+        if not count:
+            return np.empty(0, dtype=dtype)
+        records = np.memmap(self.path(station_id, ext, tier), dtype=dtype, mode="r", shape=(count,))
+        lo = 0 if start is None else np.searchsorted(records["epoch"], start, side="left")
+        hi = count if end is None else np.searchsorted(records["epoch"], end, side="left")
+        return np.array(records[lo:hi])
+
+    def _bucket_bounds(self, station_id, ext, tier):
+        """Starts of the oldest and newest stored buckets of a tier, or (None, None)"""
+        dtype = rollup_dtype(ext)
+        try:
+            count = os.path.getsize(self.path(station_id, ext, tier)) // dtype.itemsize
+        except OSError:
+            count = 0
+        if not count:
+            return None, None
+        epochs = np.memmap(self.path(station_id, ext, tier), dtype=dtype, mode="r", shape=(count,))["epoch"]
+        return int(epochs[0]), int(epochs[-1])
+
+    def _newest_bucket(self, station_id, ext, tier):
+        """Start of the newest stored bucket of a tier, or None"""
+        return self._bucket_bounds(station_id, ext, tier)[1]
+
+    def _buckets(self, station_id, ext, tier, start, end, fields=None):
+        """
+        Tier records for [start, end), start being a bucket start
+
+        Stored buckets are read up to the newest one, which may be partial;
+        from there on they are combined from the finer tier (or aggregated
+        from raw rows for hours).
+        """
+        newest = self._newest_bucket(station_id, ext, tier)
+        tail = start if newest is None else max(start, newest)
+        stored = self.read(station_id, ext, tier, start, min(tail, end))
+        if tail >= end:
+            return stored
+        finer = SOURCE_TIERS.get(tier)
+        if finer is None:
+            fresh = aggregate(read_rows(self.source, station_id, ext, tail, end, fields), ext, tier)
+        else:
+            fresh = combine(self._buckets(station_id, ext, finer, tail, end, fields), tier)
+        return np.concatenate([stored, fresh])
+
+    def _replace_tail(self, station_id, ext, tier, records):
+        """Drop stored buckets from records' first bucket onwards, then append records"""
+        if not len(records):
+            return
+        dtype = rollup_dtype(ext)
+        os.makedirs(self.directory(station_id, ext), exist_ok=True)
+        fd = os.open(self.path(station_id, ext, tier), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            count = os.fstat(fd).st_size // dtype.itemsize
+            keep = 0
+            if count:
+                stored = np.memmap(self.path(station_id, ext, tier), dtype=dtype, mode="r", shape=(count,))
+                keep = int(np.searchsorted(stored["epoch"], records["epoch"][0], side="left"))
+                del stored
+            os.ftruncate(fd, keep * dtype.itemsize)
+            os.lseek(fd, 0, os.SEEK_END)
+            os.write(fd, records.astype(dtype).tobytes())
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def update(self, station_id, ext):
+        """
+        Fold raw rows merged since the last update into every tier
+
+        Each tier recomputes its newest stored bucket onwards, so rows
+        arriving in a bucket that was already rolled up are picked up, and
+        running update() twice changes nothing. Rows older than the newest
+        hourly bucket need rebuild().
+
+        Returns:
+            Number of hourly buckets written
+        """
+        start = self._newest_bucket(station_id, ext, "hour")
+        hourly = aggregate(read_rows(self.source, station_id, ext, start), ext, "hour")
+        if not len(hourly):
+            return 0
+        self._replace_tail(station_id, ext, "hour", hourly)
+        for tier, finer in SOURCE_TIERS.items():
+            start = self._newest_bucket(station_id, ext, tier)
+            self._replace_tail(station_id, ext, tier,
+                               combine(self.read(station_id, ext, finer, start), tier))
+        return len(hourly)
+
+    def rebuild(self, station_id, ext, workers=DEFAULT_WORKERS):
+        """
+        Recompute every tier from the whole raw history, one calendar year per task
+
+        Returns:
+            Number of hourly buckets
+        """
+        epochs = read_rows(self.source, station_id, ext, fields=[])["epoch"]
+        if not len(epochs):
+            return 0
+        first, last = np.array([epochs[0], epochs[-1]]).astype("datetime64[s]").astype("datetime64[Y]")
+        bounds = np.arange(first, last + 2).astype("datetime64[s]").astype(np.int64).tolist()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            spans = list(pool.map(lambda span: _aggregate_span(self.source, station_id, ext, *span),
+                                  zip(bounds[:-1], bounds[1:])))
+
+        os.makedirs(self.directory(station_id, ext), exist_ok=True)
+        for tier in TIERS:
+            records = np.concatenate([span[tier] for span in spans])
+            path = self.path(station_id, ext, tier)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(records.tobytes())
+            os.replace(tmp_path, path)
+        return sum(len(span["hour"]) for span in spans)
+
+    def query(self, station_id, ext, field, start=None, end=None, resolution=None, points=DEFAULT_POINTS):
+        """
+        One column over [start, end) from the coarsest source that fits
+
+        Args:
+            station_id: NDBC station ID
+            ext: realtime2 file kind
+            field: Column name (e.g. "WVHT")
+            start, end: UTC epoch seconds bounds (default: the stored history)
+            resolution: Longest acceptable bucket in seconds
+            points: Points wanted when no resolution is given (see plan())
+
+        Returns:
+            Dictionary with 'source' (tier name or "raw") and arrays 'epoch'
+            (bucket starts), 'min', 'mean', 'max' and 'count'; buckets and
+            rows without a value are left out. Raw rows report their value as
+            min, mean and max with a count of 1.
+        """
+        if start is None or end is None:
+            # Stored hours give the oldest row; raw rows past the newest hour give the newest
+            oldest, newest = self._bucket_bounds(station_id, ext, "hour")
+            epochs = read_rows(self.source, station_id, ext, newest, fields=[])["epoch"]
+            if oldest is None:
+                oldest = int(epochs[0]) if len(epochs) else None
+            if len(epochs):
+                newest = int(epochs[-1])
+            if oldest is None:
+                return {"source": "raw", "epoch": np.empty(0, dtype=np.int64),
+                        **{key: np.empty(0, dtype=np.float32) for key in ("min", "mean", "max")},
+                        "count": np.empty(0, dtype=np.int32)}
+            start = oldest if start is None else start
+            end = newest + 1 if end is None else end
+
+        source = plan(start, end, resolution, points)
+        if source == "raw":
+            rows = read_rows(self.source, station_id, ext, start, end, [field])
+            values = np.asarray(rows[field], dtype=np.float32)
+            valid = ~np.isnan(values)
+            values = values[valid]
+            return {"source": source, "epoch": np.asarray(rows["epoch"])[valid],
+                    "min": values, "mean": values, "max": values,
+                    "count": np.ones(len(values), dtype=np.int32)}
+
+        # Buckets overlapping the range: start from the bucket holding start
+        records = self._buckets(station_id, ext, source, int(bucket_starts([start], source)[0]), end, [field])
+        column = records[field]
+        valid = column["count"] > 0
+        column = column[valid]
+        return {"source": source, "epoch": records["epoch"][valid],
+                "min": column["min"], "mean": (column["sum"] / column["count"]).astype(np.float32),
+                "max": column["max"], "count": column["count"]}
+
+
+def main(argv=None):
+    """Update or rebuild rollup tiers, or query a column through the planner"""
+    import argparse
+    import time
+
+    from sf_wave.records import format_epoch
+
+    parser = argparse.ArgumentParser(description="Hourly, daily and monthly rollups of station history")
+    parser.add_argument("--root", help=f"Rollup directory (default: {DEFAULT_ROLLUP_DIR})")
+    parser.add_argument("--store", action="store_true",
+                        help="Read raw rows from the local store instead of the archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="Fold newly merged rows into the tiers")
+    update.add_argument("stations", nargs="+", help="NDBC station IDs")
+    update.add_argument("--ext", action="append", choices=sorted(SCHEMAS),
+                        help="realtime2 file kinds (default: txt and spec)")
+    update.add_argument("--rebuild", action="store_true", help="Recompute every tier from the raw history")
+    update.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Years rebuilt at once (default: {DEFAULT_WORKERS})")
+
+    query = commands.add_parser("query", help="Read a column at a chart's resolution")
+    query.add_argument("station")
+    query.add_argument("field", help="Column name, e.g. WVHT")
+    query.add_argument("--ext", default="txt", choices=sorted(SCHEMAS))
+    query.add_argument("--days", type=float, help="Newest days to read (default: all history)")
+    query.add_argument("--points", type=int, default=DEFAULT_POINTS,
+                       help=f"Points wanted (default: {DEFAULT_POINTS})")
+    query.add_argument("--resolution", type=float, help="Longest acceptable bucket in seconds")
+    query.add_argument("--rows", type=int, default=10, help="Newest points to print (default: 10)")
+    args = parser.parse_args(argv)
+
+    source = None
+    if args.store:
+        from sf_wave.store import TimeSeriesStore
+
+        source = TimeSeriesStore()
+    rollups = Rollups(args.root, source)
+
+    if args.command == "update":
+        for station_id in args.stations:
+            for ext in args.ext or sorted(SCHEMAS):
+                if args.rebuild:
+                    buckets = rollups.rebuild(station_id, ext, args.workers)
+                else:
+                    buckets = rollups.update(station_id, ext)
+                print(f"{station_id}.{ext}: {buckets} hourly buckets written")
+        return
+
+    start = end = None
+    if args.days is not None:
+        end = int(time.time())
+        start = end - int(args.days * 86400)
+    result = rollups.query(args.station, args.ext, args.field, start, end, args.resolution, args.points)
+    print(f"{args.station} {args.field}: {len(result['epoch'])} points from {result['source']}")
+    for i in range(max(0, len(result["epoch"]) - args.rows), len(result["epoch"])):
+        print(f"  {format_epoch(int(result['epoch'][i]))}  min {result['min'][i]:7.2f}  "
+              f"mean {result['mean'][i]:7.2f}  max {result['max'][i]:7.2f}  n {result['count'][i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Local JSON API for current conditions, recent readings and tides
+
+Dashboards and the watch app each used to call NOAA directly, repeating the
+same requests. This server answers them from one shared in-memory cache:
+
+    GET /stations/{id}/conditions   latest observation (get_buoy_data)
+    GET /stations/{id}/readings     recent spectral readings (get_wave_forecast, 502 without .spec data)
+    GET /tides/{id}                 today's high/low tides plus the current level
+    GET /health                     cache statistics
+
+Entries live for their endpoint's TTL. Concurrent misses for the same key are
+coalesced (single-flight): the first request starts one upstream fetch on a
+worker thread and every other request for that key awaits the same task, so a
+thousand simultaneous clients cause one NOAA request per station per update.
+The cache holds at most MAX_ENTRIES entries: when it is full, expired entries
+are dropped first, then the least recently used ones.
+
+The server uses plain asyncio streams (HTTP/1.1 with keep-alive), so it needs
+no web framework.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from sf_wave.records import record_dict
+
+# Seconds each kind of entry stays fresh
+ENDPOINT_TTLS = {"conditions": 60, "readings": 60, "tides": 30 * 60}
+
+# Seconds a failed fetch is remembered before NOAA is asked again
+ERROR_TTL = 10
+
+# Most entries kept in the cache (one per endpoint and station)
+MAX_ENTRIES = 4096
+
+# Worker threads running blocking upstream fetches
+DEFAULT_WORKERS = 16
+
+# Largest request head accepted (bytes)
+MAX_HEADER_BYTES = 16 * 1024
+
+STATION_PATTERN = r"([A-Za-z0-9]{1,12})"
+ROUTES = [
+    (re.compile(rf"^/stations/{STATION_PATTERN}/conditions$"), "conditions"),
+    (re.compile(rf"^/stations/{STATION_PATTERN}/readings$"), "readings"),
+    (re.compile(rf"^/tides/{STATION_PATTERN}$"), "tides"),
+]
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           502: "Bad Gateway"}
+
+
+def default_fetchers():
+    """sf_wave.core fetch functions, keyed by endpoint"""
+    from functools import partial
+
+    from sf_wave import core
+
+    return {
+        "conditions": core.get_buoy_data,
+        # Readings are .spec rows only: the SF marine forecast fallback is not this station's data
+        "readings": partial(core.get_wave_forecast, fallback=False),
+        "tides": core.get_tide_window,
+    }
+
+
+class SingleFlightCache:
+    """TTL cache whose misses share one in-flight load per key, bounded by entry count"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Least recently used first
+        self._entries = OrderedDict()
+        self._loading = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "fetches": 0, "evictions": 0}
+
+    def remaining(self, key):
+        """Seconds until a cached entry expires (0 if absent)"""
+        entry = self._entries.get(key)
+        return max(0, int(entry[0] - time.monotonic())) if entry else 0
+
+    async def get(self, key, load, ttl, error_ttl=ERROR_TTL):
+        """
+        Return the cached value for key, loading it at most once at a time
+
+        Args:
+            key: Cache key
+            load: Coroutine function producing the value (None means failure)
+            ttl: Seconds a loaded value stays fresh
+            error_ttl: Seconds a None result stays cached
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats["hits"] += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        task = self._loading.get(key)
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._load(key, load, ttl, error_ttl))
+            self._loading[key] = task
+        else:
+            self.stats["coalesced"] += 1
+        # Shield the shared load so one client disconnecting does not cancel it for the rest
+        return await asyncio.shield(task)
+
+    async def _load(self, key, load, ttl, error_ttl):
+        try:
+            self.stats["fetches"] += 1
+            value = await load()
+            expires = time.monotonic() + (ttl if value is not None else error_ttl)
+            self._store(key, (expires, value))
+            return value
+        finally:
+            del self._loading[key]
+
+    def _store(self, key, entry):
+        """Insert an entry, making room by dropping expired and then least recently used ones"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) <= self.max_entries:
+            return
+        now = time.monotonic()
+        for stale in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[stale]
+            self.stats["evictions"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+class ForecastServer:
+    """asyncio HTTP server answering JSON requests from a SingleFlightCache"""
+
+    def __init__(self, fetchers=None, workers=DEFAULT_WORKERS, ttls=None, max_entries=MAX_ENTRIES):
+        """
+        Args:
+            fetchers: Mapping of endpoint -> blocking function(station_id)
+                (default: sf_wave.core's get_buoy_data/get_wave_forecast/get_tide_window)
+            workers: Threads available for upstream fetches
+            ttls: Mapping of endpoint -> freshness TTL in seconds
+            max_entries: Most entries kept in the cache
+        """
+        self.fetchers = fetchers or default_fetchers()
+        self.ttls = dict(ENDPOINT_TTLS, **(ttls or {}))
+        self.cache = SingleFlightCache(max_entries)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def fetch(self, endpoint, station_id):
+        """Cached result of one endpoint's fetch function for a station"""
+        loop = asyncio.get_running_loop()
+        function = self.fetchers[endpoint]
+
+        async def load():
+            try:
+                return await loop.run_in_executor(self.executor, function, station_id)
+            except Exception as e:
+                print(f"Error fetching {endpoint} for {station_id}: {e}")
+                return None
+
+        return await self.cache.get((endpoint, station_id), load, self.ttls[endpoint])
+
+    async def respond(self, path):
+        """
+        Build the response for a GET path
+
+        Returns:
+            (status, body dictionary, max-age seconds)
+        """
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return 200, {"status": "ok", "cache": self.cache.stats}, 0
+
+        for pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, {"error": "not found"}, 0
+
+        station_id = match.group(1).upper()
+        data = await self.fetch(endpoint, station_id)
+        max_age = self.cache.remaining((endpoint, station_id))
+        if data is None:
+            return 502, {"station": station_id, "error": f"no {endpoint} data from NOAA"}, max_age
+
+        if endpoint == "conditions":
+            return 200, {"station": station_id, "conditions": record_dict(data)}, max_age
+        if endpoint == "readings":
+            return 200, {"station": station_id, "readings": [record_dict(r) for r in data]}, max_age
+
+        from sf_wave.core import todays_events
+        from sf_wave.tidecurve import TideCurve
+
+        # Current level interpolated between the cached extremes (yesterday through
+        # tomorrow), fresh on every request; only today's extremes are listed
+        now = TideCurve.from_events(data).now()
+        if now["next_time"] is not None:
+            now["next_time"] = now["next_time"].isoformat(timespec="minutes")
+        return 200, {"station": station_id, "tides": [record_dict(t) for t in todays_events(data)],
+                     "now": now}, max_age
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError,
+                        asyncio.CancelledError):
+                    # Client went away, sent an oversized head, or the server is shutting down
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    status, body, max_age = 400, {"error": "bad request"}, 0
+                    method, version = "GET", "HTTP/1.0"
+                else:
+                    method, path, version = parts
+                    if method not in ("GET", "HEAD"):
+                        status, body, max_age = 405, {"error": "method not allowed"}, 0
+                    else:
+                        status, body, max_age = await self.respond(path)
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close" if version == "HTTP/1.1"
+                              else connection == "keep-alive")
+                payload = json.dumps(body, separators=(",", ":")).encode()
+                writer.write(
+                    (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\n"
+                     f"Cache-Control: max-age={max_age}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode()
+                    + (payload if method != "HEAD" else b""))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Start listening; returns the asyncio Server"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=1024)
+
+
+def main(argv=None):
+    """Run the JSON API server"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve buoy conditions and tides as JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Threads for upstream fetches (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--max-entries", type=int, default=MAX_ENTRIES,
+                        help=f"Most cached responses kept (default: {MAX_ENTRIES})")
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = await ForecastServer(workers=args.workers, max_entries=args.max_entries).serve(args.host, args.port)
+        print(f"Serving on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Pooled, keep-alive HTTP session shared by every NOAA request
+
+A bare requests.get() opens (and TLS-handshakes) a fresh connection for every
+call. Going through one requests.Session keeps connections to each host alive
+and reuses them, which matters once many stations are fetched per run.
+"""
+
+import threading
+
+# Default number of pooled connections kept open per host
+DEFAULT_CONNECTIONS_PER_HOST = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(connections_per_host=DEFAULT_CONNECTIONS_PER_HOST):
+    """
+    Return the shared session for the given pool size, creating it on first use
+
+    Args:
+        connections_per_host: Maximum number of keep-alive connections per host
+
+    Returns:
+        A requests.Session whose adapters pool connections_per_host connections
+    """
+    with _sessions_lock:
+        session = _sessions.get(connections_per_host)
+        if session is None:
+            # Imported here so runs answered from the cache never load requests
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=connections_per_host,
+                                  pool_maxsize=connections_per_host)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[connections_per_host] = session
+        return session
@@ -0,0 +1,198 @@
+"""
+Spatial index for nearest-station queries
+
+find_closest_buoy() scans a handful of buoys with a scalar haversine. For
+the whole NDBC catalog and thousands of query points that linear scan does
+not scale, so stations are bucketed into latitude/longitude grids at a few
+resolutions (cells sorted once, with a CSR-style offset table). A radius
+query uses the grid matching its radius and only measures distances to the
+stations in the cells overlapping each point's bounding box, and k-nearest
+queries grow the radius until every point has k stations inside it, which
+makes them exact. Queries take whole arrays of points; candidate cells,
+stations and distances are gathered for the batch at once with NumPy.
+"""
+
+import numpy as np
+
+# Radius of the earth in kilometers (same as the scripts' haversine)
+EARTH_RADIUS_KM = 6371.0
+
+# Cell sizes (degrees) of the grid levels; each must divide 180 evenly
+GRID_CELL_DEGREES = (1.0, 4.0, 15.0, 45.0)
+
+# First search radius of a k-nearest query, in kilometers
+INITIAL_RADIUS_KM = 100.0
+
+# Beyond this radius a k-nearest query measures every station instead of walking cells
+FULL_SCAN_RADIUS_KM = 2500.0
+
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Great circle distance in kilometers between points given in decimal degrees
+
+    Arguments broadcast against each other like any NumPy expression.
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _expand(starts, counts):
+    """Concatenate the index ranges [start, start + count) and tag each with its range number"""
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return owner, np.repeat(starts, counts) + np.arange(total) - np.repeat(offsets, counts)
+
+
+class _Grid:
+    """Stations bucketed into square latitude/longitude cells of one size"""
+
+    def __init__(self, lats, lons, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.rows = int(round(180.0 / cell_degrees))
+        self.columns = 2 * self.rows
+        cells = self.row(lats) * self.columns + self.column(lons)
+        self.order = np.argsort(cells, kind="stable")
+        # Stations of cell c are order[starts[c]:starts[c + 1]]
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.rows * self.columns + 1))
+
+    def row(self, lats):
+        return np.clip(((lats + 90.0) // self.cell_degrees).astype(np.int64), 0, self.rows - 1)
+
+    def column(self, lons):
+        return (np.mod(lons + 180.0, 360.0) // self.cell_degrees).astype(np.int64) % self.columns
+
+    def candidates(self, lats, lons, radius_km):
+        """(query, station) pairs for every station in the cells around each query"""
+        radius_degrees = radius_km / KM_PER_DEGREE
+        first_row = self.row(lats - radius_degrees)
+        last_row = self.row(lats + radius_degrees)
+
+        # Widest longitude span of the spherical cap, unless it covers a pole
+        whole_circle = np.abs(lats) + radius_degrees >= 90.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.sin(np.radians(radius_degrees)) / np.cos(np.radians(lats))
+        half_width = np.where(whole_circle, 0.0, np.degrees(np.arcsin(np.clip(ratio, 0.0, 1.0))))
+        first_column = np.where(whole_circle, 0, self.column(lons - half_width))
+        widths = np.where(whole_circle, self.columns, np.ceil(2 * half_width / self.cell_degrees) + 2)
+        widths = np.minimum(widths, self.columns).astype(np.int64)
+        heights = last_row - first_row + 1
+
+        query, local = _expand(np.zeros(len(lats), dtype=np.int64), heights * widths)
+        rows = first_row[query] + local // widths[query]
+        columns = (first_column[query] + local % widths[query]) % self.columns
+        cells = rows * self.columns + columns
+
+        starts = self.starts[cells]
+        cell_owner, positions = _expand(starts, self.starts[cells + 1] - starts)
+        return query[cell_owner], self.order[positions]
+
+
+class StationIndex:
+    """Multi-resolution latitude/longitude grid over a set of stations"""
+
+    def __init__(self, ids, lats, lons, cell_degrees=GRID_CELL_DEGREES):
+        """
+        Args:
+            ids: Station IDs
+            lats, lons: Station coordinates in decimal degrees
+            cell_degrees: Cell sizes of the grid levels, finest first
+        """
+        self.ids = np.asarray(ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.grids = [_Grid(self.lats, self.lons, size) for size in cell_degrees]
+
+    @classmethod
+    def from_stations(cls, stations, cell_degrees=GRID_CELL_DEGREES):
+        """Build an index from {'id', 'lat', 'lon'} dictionaries (e.g. SF_BUOYS)"""
+        return cls([station["id"] for station in stations],
+                   [station["lat"] for station in stations],
+                   [station["lon"] for station in stations], cell_degrees)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _grid_for(self, radius_km):
+        """Coarsest grid whose cells are no larger than the search radius"""
+        radius_degrees = radius_km / KM_PER_DEGREE
+        for grid in reversed(self.grids):
+            if grid.cell_degrees <= radius_degrees:
+                return grid
+        return self.grids[0]
+
+    def within(self, lats, lons, radius_km):
+        """
+        All stations within radius_km of each point
+
+        Args:
+            lats, lons: Query points in decimal degrees (scalars or arrays)
+            radius_km: Search radius in kilometers (scalar or one per point)
+
+        Returns:
+            (query, station, distance) arrays, one entry per match, sorted by
+            query and then distance; station indexes into self.ids
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        radius_km = np.broadcast_to(np.asarray(radius_km, dtype=np.float64), lats.shape)
+
+        grid = self._grid_for(float(radius_km.max()) if len(radius_km) else 0.0)
+        query, station = grid.candidates(lats, lons, radius_km)
+        distance = haversine(lons[query], lats[query], self.lons[station], self.lats[station])
+        keep = distance <= radius_km[query]
+        query, station, distance = query[keep], station[keep], distance[keep]
+        order = np.lexsort((distance, query))
+        return query[order], station[order], distance[order]
+
+    def _all_pairs(self, lats, lons):
+        """(query, station, distance) for every station, sorted like within()"""
+        distance = haversine(lons[:, None], lats[:, None], self.lons[None, :], self.lats[None, :])
+        station = np.argsort(distance, axis=1, kind="stable")
+        query = np.repeat(np.arange(len(lats)), len(self.ids))
+        return query, station.ravel(), np.take_along_axis(distance, station, axis=1).ravel()
+
+    def nearest(self, lats, lons, k=1):
+        """
+        The k nearest stations to each point
+
+        Args:
+            lats, lons: Query points in decimal degrees (scalars or arrays)
+            k: Number of stations per point
+
+        Returns:
+            (station, distance) arrays of shape (points, k), nearest first;
+            padded with -1 and inf when the index has fewer than k stations
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        stations = np.full((len(lats), k), -1, dtype=np.int64)
+        distances = np.full((len(lats), k), np.inf)
+        needed = min(k, len(self.ids))
+
+        pending = np.arange(len(lats))
+        radius = INITIAL_RADIUS_KM
+        while len(pending) and needed:
+            if radius > FULL_SCAN_RADIUS_KM:
+                query, station, distance = self._all_pairs(lats[pending], lons[pending])
+            else:
+                query, station, distance = self.within(lats[pending], lons[pending], radius)
+
+            # Rank of each match within its query (matches are sorted by query, distance)
+            counts = np.bincount(query, minlength=len(pending))
+            rank = np.arange(len(query)) - np.repeat(np.cumsum(counts) - counts, counts)
+            found = counts >= needed
+            take = found[query] & (rank < k)
+            rows = pending[query[take]]
+            stations[rows, rank[take]] = station[take]
+            distances[rows, rank[take]] = distance[take]
+
+            pending = pending[~found]
+            radius *= 4
+        return stations, distances
@@ -0,0 +1,316 @@
+"""
+Raw spectral wave data and the wave parameters derived from it
+
+The .spec summary gives one height, period and direction per row. NDBC also
+publishes the spectra those are computed from, one value per frequency bin:
+
+    .data_spec  spectral energy density C11 (m^2/Hz), plus the swell/wind-sea
+                separation frequency
+    .swdir      mean wave direction alpha1 per bin (degrees true, from)
+    .swdir2     principal wave direction alpha2 per bin
+    .swr1       first normalized polar Fourier coefficient r1 per bin
+    .swr2       second normalized polar Fourier coefficient r2 per bin
+
+Each row is "YY MM DD hh mm [Sep_Freq] value (freq) value (freq) ...". The
+files are parsed into (time x frequency) arrays in one pass: every number of
+the body is converted at once, bins are placed with a searchsorted against
+the union of all frequencies (stations change bin layouts now and then), and
+missing values (999.0, 9.999 separation) become NaN. Spectral moments,
+periods and the energy-weighted directional statistics are then evaluated
+for every row of the ~45-day history with matrix products.
+"""
+
+import numpy as np
+
+from sf_wave.columnar import epoch_seconds
+
+# realtime2 files holding raw spectra, in the order they are attached to Spectra
+SPECTRAL_FILES = ("data_spec", "swdir", "swdir2", "swr1", "swr2")
+
+# Values at or above this are NDBC's missing markers (999.0, 999.00)
+MISSING_THRESHOLD = 999.0
+
+# Separation frequency NDBC writes when it has none
+MISSING_SEPARATION = 9.999
+
+# Frequencies closer than this (Hz) are the same bin
+FREQUENCY_TOLERANCE = 1e-4
+
+# Blank out the parentheses around each bin's frequency
+PARENTHESES = str.maketrans("()", "  ")
+
+
+def parse_spectral_file(data_text):
+    """
+    Parse a raw spectral realtime2 file into arrays
+
+    Args:
+        data_text: Full text of a .data_spec, .swdir, .swdir2, .swr1 or .swr2 file
+
+    Returns:
+        (epochs, frequencies, values, separation): int64 epochs per row (file
+        order, newest first), the sorted frequency bins (Hz), a float64
+        (rows, bins) array with NaN for missing or absent bins, and the
+        separation frequency per row (None for files without one). None if
+        the file has no data rows.
+    """
+    lines = data_text.split("\n")
+    header = lines[0] if lines and lines[0].startswith("#") else ""
+    lines = [line for line in lines if line.strip() and not line.startswith("#")]
+    if not lines:
+        return None
+    lead = 6 if "Sep_Freq" in header else 5
+
+    # Bins per row; rows differ when a station changes its frequency layout
+    counts = np.array([line.count("(") for line in lines], dtype=np.int64)
+    try:
+        # Text-mode fromstring converts the whole body in C
+        numbers = np.fromstring(" ".join(lines).translate(PARENTHESES), dtype=np.float64, sep=" ")
+    except ValueError:
+        numbers = None
+    widths = lead + 2 * counts
+    if numbers is None or numbers.size != widths.sum():
+        print("Error parsing spectral file: malformed row")
+        return None
+    row_starts = np.cumsum(widths) - widths
+
+    fields = numbers[row_starts[:, None] + np.arange(5)].astype(np.int64)
+    epochs = epoch_seconds(*fields.T)
+    separation = None
+    if lead == 6:
+        separation = numbers[row_starts + 5]
+        separation[separation >= MISSING_SEPARATION] = np.nan
+
+    row = np.repeat(np.arange(len(lines)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    value_index = np.repeat(row_starts + lead, counts) + 2 * local
+    values = numbers[value_index]
+    bin_frequencies = numbers[value_index + 1]
+
+    frequencies = np.unique(np.round(bin_frequencies, 4))
+    table = np.full((len(lines), len(frequencies)), np.nan)
+    table[row, np.searchsorted(frequencies, np.round(bin_frequencies, 4))] = values
+    table[table >= MISSING_THRESHOLD] = np.nan
+    return epochs, frequencies, table, separation
+
+
+def bandwidths(frequencies):
+    """Width of each frequency bin (Hz), splitting the gaps between bin centers evenly"""
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    if len(frequencies) < 2:
+        return np.ones_like(frequencies)
+    edges = np.concatenate(([frequencies[0] - (frequencies[1] - frequencies[0]) / 2],
+                            (frequencies[1:] + frequencies[:-1]) / 2,
+                            [frequencies[-1] + (frequencies[-1] - frequencies[-2]) / 2]))
+    return np.diff(edges)
+
+
+def _align(epochs, frequencies, parsed):
+    """Place another file's (epochs, frequencies, values) on the density file's grid"""
+    other_epochs, other_frequencies, values, _ = parsed
+    aligned = np.full((len(epochs), len(frequencies)), np.nan)
+
+    order = np.argsort(other_epochs, kind="stable")
+    position = np.clip(np.searchsorted(other_epochs[order], epochs), 0, len(order) - 1)
+    rows = order[position]
+    has_row = other_epochs[rows] == epochs
+
+    column = np.clip(np.searchsorted(other_frequencies, frequencies), 0, len(other_frequencies) - 1)
+    below = np.clip(column - 1, 0, len(other_frequencies) - 1)
+    column = np.where(np.abs(other_frequencies[below] - frequencies)
+                      < np.abs(other_frequencies[column] - frequencies), below, column)
+    has_bin = np.abs(other_frequencies[column] - frequencies) <= FREQUENCY_TOLERANCE
+
+    aligned[np.ix_(has_row, has_bin)] = values[np.ix_(rows[has_row], column[has_bin])]
+    return aligned
+
+
+class Spectra:
+    """Raw spectra of one station on a common (time x frequency) grid"""
+
+    __slots__ = ("station_id", "epochs", "frequencies", "density", "separation",
+                 "alpha1", "alpha2", "r1", "r2")
+
+    def __init__(self, station_id, epochs, frequencies, density, separation=None,
+                 alpha1=None, alpha2=None, r1=None, r2=None):
+        """
+        Args:
+            station_id: NDBC station ID
+            epochs: UTC epoch seconds per row
+            frequencies: Bin center frequencies (Hz), ascending
+            density: (rows, bins) spectral energy density (m^2/Hz)
+            separation: Swell/wind-sea separation frequency per row (Hz)
+            alpha1, alpha2, r1, r2: (rows, bins) directional arrays, or None
+        """
+        self.station_id = station_id
+        self.epochs = np.asarray(epochs, dtype=np.int64)
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        self.density = np.asarray(density, dtype=np.float64)
+        self.separation = separation
+        self.alpha1 = alpha1
+        self.alpha2 = alpha2
+        self.r1 = r1
+        self.r2 = r2
+
+    @classmethod
+    def from_texts(cls, station_id, texts):
+        """
+        Build Spectra from file texts
+
+        Args:
+            station_id: NDBC station ID
+            texts: Mapping of SPECTRAL_FILES extension -> file text (or None);
+                "data_spec" is required, the directional files are optional
+
+        Returns:
+            Spectra, or None without a usable .data_spec file
+        """
+        parsed = parse_spectral_file(texts["data_spec"]) if texts.get("data_spec") else None
+        if parsed is None:
+            return None
+        epochs, frequencies, density, separation = parsed
+
+        directional = {}
+        for ext, name in (("swdir", "alpha1"), ("swdir2", "alpha2"), ("swr1", "r1"), ("swr2", "r2")):
+            other = parse_spectral_file(texts[ext]) if texts.get(ext) else None
+            directional[name] = _align(epochs, frequencies, other) if other is not None else None
+        for name in ("r1", "r2"):
+            # Some archives store r1/r2 scaled by 100
+            if directional[name] is not None and np.nanmax(directional[name], initial=0.0) > 1.5:
+                directional[name] = directional[name] / 100.0
+        return cls(station_id, epochs, frequencies, density, separation, **directional)
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def __repr__(self):
+        return (f"Spectra({self.station_id}, {len(self.epochs)} rows x "
+                f"{len(self.frequencies)} bins)")
+
+
+def spectral_moment(spectra, order):
+    """n-th spectral moment m_n = sum S(f) f^n df for every row"""
+    weights = bandwidths(spectra.frequencies) * spectra.frequencies ** order
+    return np.nan_to_num(spectra.density) @ weights
+
+
+def _weighted_moment(angle, ratio, harmonic, energy):
+    """
+    Energy-weighted directional Fourier moment of one order for every row
+
+    Returns:
+        (direction in degrees, magnitude r); NaN for rows without usable bins
+        or when the directional file is absent
+    """
+    if angle is None or ratio is None:
+        missing = np.full(len(energy), np.nan)
+        return missing, missing
+    theta = np.radians(angle) * harmonic
+    usable = np.isfinite(theta) & np.isfinite(ratio)
+    weights = np.where(usable, energy, 0.0)
+    total = weights.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = (weights * np.where(usable, ratio * np.cos(theta), 0.0)).sum(axis=1) / total
+        b = (weights * np.where(usable, ratio * np.sin(theta), 0.0)).sum(axis=1) / total
+    direction = np.where(total > 0, np.degrees(np.arctan2(b, a)) / harmonic % (360 / harmonic), np.nan)
+    return direction, np.minimum(np.hypot(a, b), 1.0)
+
+
+def wave_parameters(spectra):
+    """
+    Bulk wave parameters for every row of a Spectra
+
+    Returns:
+        Dictionary of float64 arrays, one value per row (NaN where undefined):
+            epoch: UTC epoch seconds
+            hs: significant wave height 4 sqrt(m0) (m)
+            tp: peak period, 1 / frequency of the highest density bin (s)
+            tm01: mean period m0 / m1 (s)
+            tm02: zero-crossing period sqrt(m0 / m2) (s)
+            peak_direction: alpha1 at the peak bin (degrees true, from)
+            mean_direction: energy-weighted mean of the first-order
+                directional moments (degrees true, from)
+            spread: directional spread sqrt(2 (1 - r1)) from the weighted
+                first-order moments (degrees)
+            spread2: spread sqrt((1 - r2) / 2) from the weighted second-order
+                moments (degrees)
+    """
+    frequencies = spectra.frequencies
+    df = bandwidths(frequencies)
+    density = np.nan_to_num(spectra.density)
+    observed = ~np.all(np.isnan(spectra.density), axis=1)
+
+    m0 = density @ df
+    m1 = density @ (df * frequencies)
+    m2 = density @ (df * frequencies ** 2)
+    valid = observed & (m0 > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hs = np.where(observed, 4 * np.sqrt(m0), np.nan)
+        tm01 = np.where(valid, m0 / m1, np.nan)
+        tm02 = np.where(valid, np.sqrt(m0 / m2), np.nan)
+        peak = np.argmax(density, axis=1)
+        tp = np.where(valid, 1.0 / frequencies[peak], np.nan)
+
+    parameters = {"epoch": spectra.epochs, "hs": hs, "tp": tp, "tm01": tm01, "tm02": tm02}
+    missing = np.full(len(peak), np.nan)
+    mean_direction, r1 = _weighted_moment(spectra.alpha1, spectra.r1, 1, density * df)
+    _, r2 = _weighted_moment(spectra.alpha2, spectra.r2, 2, density * df)
+    parameters["mean_direction"] = mean_direction
+    parameters["spread"] = np.degrees(np.sqrt(2 * (1 - r1)))
+    parameters["spread2"] = np.degrees(np.sqrt((1 - r2) / 2))
+    if spectra.alpha1 is not None:
+        parameters["peak_direction"] = np.where(valid, spectra.alpha1[np.arange(len(peak)), peak], np.nan)
+    else:
+        parameters["peak_direction"] = missing
+    return parameters
+
+
+def fetch_spectra(station_id, session=None, catalog=None):
+    """
+    Fetch and parse every raw spectral file of a station
+
+    Args:
+        station_id: NDBC station ID
+        session: Session to use (default: the shared pooled session)
+        catalog: Optional StationCatalog used to skip files the station does not publish
+
+    Returns:
+        Spectra, or None if the station has no .data_spec file
+    """
+    from sf_wave.fetch import fetch_concurrently
+    from sf_wave.ndbc import fetch_realtime2
+
+    tasks = {ext: (fetch_realtime2, station_id, ext, None, session) for ext in SPECTRAL_FILES
+             if catalog is None or catalog.has_product(station_id, ext) is not False}
+    return Spectra.from_texts(station_id, fetch_concurrently(tasks))
+
+
+def main(argv=None):
+    """Print wave parameters computed from a station's raw spectra"""
+    import argparse
+
+    from sf_wave.records import format_epoch
+
+    parser = argparse.ArgumentParser(description="Wave parameters from NDBC raw spectra")
+    parser.add_argument("station", help="NDBC station ID")
+    parser.add_argument("--rows", type=int, default=10, help="Newest rows to print (default: 10)")
+    args = parser.parse_args(argv)
+
+    spectra = fetch_spectra(args.station)
+    if spectra is None:
+        print(f"No spectral data for station {args.station}")
+        return
+    parameters = wave_parameters(spectra)
+    print(f"{spectra!r}")
+    print(f"{'Time (UTC)':<17} {'Hs m':>5} {'Tp s':>5} {'Tm01':>5} {'Tm02':>5} "
+          f"{'PkDir':>5} {'MnDir':>5} {'Sprd':>5}")
+    for i in range(min(args.rows, len(spectra))):
+        values = [parameters[key][i] for key in
+                  ("hs", "tp", "tm01", "tm02", "peak_direction", "mean_direction", "spread")]
+        print(f"{format_epoch(int(parameters['epoch'][i])):<17} "
+              + " ".join(f"{value:5.1f}" if np.isfinite(value) else f"{'-':>5}" for value in values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Record/replay stand-in for the NOAA services
+
+Every fetch goes to live ndbc.noaa.gov, api.tidesandcurrents.noaa.gov and
+marine.weather.gov, so performance cannot be measured reproducibly or
+offline. This server answers those requests from recorded responses under
+one prefix per service:
+
+    http://127.0.0.1:8081/ndbc/...    www.ndbc.noaa.gov
+    http://127.0.0.1:8081/coops/...   api.tidesandcurrents.noaa.gov
+    http://127.0.0.1:8081/nws/...     marine.weather.gov
+
+Point the pipeline at it with the base URL overrides read by sf_wave.config
+(SF_WAVE_NDBC_URL, SF_WAVE_COOPS_URL, SF_WAVE_NWS_URL); main() prints them.
+
+Recordings live in a fixture directory. With --record, requests that have
+no recording are forwarded to the real service and saved, so one run of the
+pipeline captures everything later runs replay. Responses without a query
+string are plain files ({root}/ndbc/data/realtime2/46237.txt), so NDBC files
+can also be dropped in by hand; responses to queries (CO-OPS, MapClick) are
+listed in {root}/index.json. A query without an exact recording is answered
+with the recording of the same path sharing the most parameters, so
+date-stamped tide requests still replay on later days; its station and
+product must match, so another station's request is a 404.
+
+The server behaves like a configurable upstream:
+
+- latency (fixed plus uniform jitter) before each response
+- bandwidth limit per connection
+- an error rate, answered with a configurable status
+- ETag/Last-Modified validators with 304 answers (can be turned off)
+- single byte ranges with 206/416 answers, honouring If-Range (can be turned off, as on
+  servers that ignore Range)
+- gradual updates: the newest rows of every realtime2 file are hidden at
+  start and published one at a time, newest first as NDBC does, so
+  incremental polling, revalidation and Range reads see fresh data
+
+Random choices come from one seeded generator, so runs are repeatable.
+GET /_standin/stats returns request counts by status and bytes sent.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl
+
+from sf_wave.config import NOAA_BASE_URLS
+
+# Largest request head accepted (bytes)
+MAX_HEADER_BYTES = 16 * 1024
+
+# Bytes written per throttled chunk when a bandwidth limit is set
+THROTTLE_CHUNK_BYTES = 4096
+
+# Recordings of query requests (relative to the fixture directory)
+INDEX_FILE = "index.json"
+
+# Query parameters naming what was recorded; a fallback recording must match every one the request has
+IDENTITY_PARAMETERS = ("station", "product")
+
+# Path answered with the server's statistics
+STATS_PATH = "/_standin/stats"
+
+# Content types by file extension; anything else is served as text
+CONTENT_TYPES = {".json": "application/json", ".xml": "text/xml", ".html": "text/html",
+                 ".php": "application/json"}
+
+REASONS = {200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 416: "Range Not Satisfiable",
+           429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway",
+           503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+def normalize_query(query):
+    """Query string with its parameters sorted, so equal queries compare equal"""
+    return "&".join(sorted(part for part in query.split("&") if part))
+
+
+def fixture_name(path, query):
+    """File name (relative to the service directory) of a recorded response"""
+    name = path + "index.html" if not path or path.endswith("/") else path
+    if query:
+        name += "@" + hashlib.sha1(normalize_query(query).encode()).hexdigest()[:12]
+    return name
+
+
+class Fixture:
+    """
+    One recorded response, optionally published gradually
+
+    Realtime2 files (newest row first) start with their newest `hidden` rows
+    withheld; one more row is published every `interval` seconds.
+    """
+
+    def __init__(self, body, content_type, hidden=0, interval=600, started=None):
+        self.content_type = content_type
+        self.interval = interval
+        self.started = time.time() if started is None else started
+        self._versions = {}
+        if hidden:
+            lines = body.decode("utf-8", errors="replace").splitlines(keepends=True)
+            self.header = "".join(line for line in lines if line.startswith("#"))
+            self.rows = [line for line in lines if line.strip() and not line.startswith("#")]
+            self.hidden = min(hidden, max(len(self.rows) - 1, 0))
+        else:
+            self.body = body
+            self.hidden = 0
+
+    def version(self, now=None):
+        """Rows published so far (0 for fixtures that never change)"""
+        if not self.hidden:
+            return 0
+        now = time.time() if now is None else now
+        return min(self.hidden, int(max(0.0, now - self.started) // self.interval))
+
+    def snapshot(self, now=None):
+        """(body, ETag, Last-Modified epoch) as of now"""
+        version = self.version(now)
+        if version not in self._versions:
+            if self.hidden:
+                body = (self.header + "".join(self.rows[self.hidden - version:])).encode()
+            else:
+                body = self.body
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            self._versions[version] = (body, etag, int(self.started) + version * self.interval)
+        return self._versions[version]
+
+
+class FixtureStore:
+    """Recorded responses under a fixture directory, keyed by service, path and query"""
+
+    def __init__(self, root, updates=0, update_interval=600):
+        self.root = root
+        self.updates = updates
+        self.update_interval = update_interval
+        self.started = time.time()
+        self._fixtures = {}
+        self.index = {}
+        try:
+            with open(os.path.join(root, INDEX_FILE)) as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error reading {INDEX_FILE}: {e}")
+
+    def _path(self, service, name):
+        return os.path.join(self.root, service, *name.split("/"))
+
+    def _content_type(self, service, path, query):
+        if service == "coops" or "FcstType=json" in query:
+            return "application/json"
+        return CONTENT_TYPES.get(os.path.splitext(fixture_name(path, ""))[1], "text/plain")
+
+    def _lookup(self, service, path, query):
+        """
+        File name of the best recording for a request, or None
+
+        Without an exact match, the recording sharing the most query
+        parameters answers, provided its IDENTITY_PARAMETERS (station,
+        product) match the request's: another station's tides are a 404.
+        """
+        if not query:
+            name = fixture_name(path, "")
+            return name if os.path.isfile(self._path(service, name)) else None
+        recorded = self.index.get(service, {}).get(path, {})
+        key = normalize_query(query)
+        if key in recorded:
+            return recorded[key]
+        wanted = set(parse_qsl(key))
+        identity = {parameter: value for parameter, value in wanted if parameter in IDENTITY_PARAMETERS}
+        best, shared = None, -1
+        for other, name in recorded.items():
+            parameters = set(parse_qsl(other))
+            if any(dict(parameters).get(parameter) != value for parameter, value in identity.items()):
+                continue
+            overlap = len(wanted & parameters)
+            if overlap > shared:
+                best, shared = name, overlap
+        return best
+
+    def get(self, service, path, query):
+        """Fixture answering a request, or None if nothing is recorded"""
+        name = self._lookup(service, path, query)
+        if name is None:
+            return None
+        if (service, name) not in self._fixtures:
+            try:
+                with open(self._path(service, name), "rb") as f:
+                    body = f.read()
+            except OSError as e:
+                print(f"Error reading fixture {service}/{name}: {e}")
+                return None
+            # Only realtime2 data files grow; the directory listing does not
+            realtime2 = service == "ndbc" and path.startswith("data/realtime2/") and not path.endswith("/")
+            self._fixtures[(service, name)] = Fixture(
+                body, self._content_type(service, path, query),
+                self.updates if realtime2 else 0, self.update_interval, self.started)
+        return self._fixtures[(service, name)]
+
+    def record(self, service, path, query, body):
+        """Save an upstream response as a fixture (atomic replace)"""
+        name = fixture_name(path, query)
+        target = self._path(service, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, target)
+        if query:
+            self.index.setdefault(service, {}).setdefault(path, {})[normalize_query(query)] = name
+            index_path = os.path.join(self.root, INDEX_FILE)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, index_path)
+        self._fixtures.pop((service, name), None)
+
+
+def parse_range(value, size):
+    """
+    (start, end) inclusive of a single 'bytes=' range, None for a header to
+    ignore, or False when the range cannot be satisfied
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class StandinServer:
+    """asyncio HTTP server replaying recorded NOAA responses with injected behaviour"""
+
+    def __init__(self, root, latency=0.0, jitter=0.0, bandwidth=None, error_rate=0.0, error_status=503,
+                 validators=True, ranges=True, updates=0, update_interval=600, record=False, seed=0):
+        """
+        Args:
+            root: Fixture directory
+            latency: Seconds before every response
+            jitter: Extra delay drawn uniformly from [0, jitter] seconds
+            bandwidth: Bytes per second per connection (None for unlimited)
+            error_rate: Fraction of requests answered with error_status
+            error_status: HTTP status of injected errors
+            validators: Send ETag/Last-Modified and answer conditional GETs with 304
+            ranges: Answer Range requests with 206 (False: ignore Range, send 200)
+            updates: Newest rows of each realtime2 file published gradually
+            update_interval: Seconds between published rows
+            record: Forward requests without a recording upstream and save them
+            seed: Seed of the latency and error generator
+        """
+        self.fixtures = FixtureStore(root, updates, update_interval)
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.validators = validators
+        self.ranges = ranges
+        self.record = record
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "bytes": 0, "injected_errors": 0, "recorded": 0, "status": {}}
+
+    async def fetch_upstream(self, service, path, query):
+        """Fetch and record a response from the real service; the fixture or None"""
+        from sf_wave.session import get_session
+
+        url = f"{NOAA_BASE_URLS[service]}/{path}" + (f"?{query}" if query else "")
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(None, lambda: get_session().get(url, timeout=30))
+        except Exception as e:
+            print(f"Error recording {url}: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"Error recording {url}: HTTP {response.status_code}")
+            return None
+        self.fixtures.record(service, path, query, response.content)
+        self.stats["recorded"] += 1
+        return self.fixtures.get(service, path, query)
+
+    async def respond(self, target, headers):
+        """
+        Build the response for a GET request target
+
+        Returns:
+            (status, extra headers dictionary, body bytes)
+        """
+        path, _, query = target.partition("?")
+        if path == STATS_PATH:
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.stats).encode()
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["injected_errors"] += 1
+            return self.error_status, {"Content-Type": "text/plain"}, b"injected error\n"
+
+        service, _, path = path.lstrip("/").partition("/")
+        if service not in NOAA_BASE_URLS or ".." in path.split("/"):
+            return 404, {"Content-Type": "text/plain"}, b"not found\n"
+        fixture = self.fixtures.get(service, path, query)
+        if fixture is None and self.record:
+            fixture = await self.fetch_upstream(service, path, query)
+        if fixture is None:
+            return 404, {"Content-Type": "text/plain"}, b"no recording\n"
+
+        body, etag, modified = fixture.snapshot()
+        extra = {"Content-Type": fixture.content_type}
+        if self.ranges:
+            extra["Accept-Ranges"] = "bytes"
+        if self.validators:
+            extra["ETag"] = etag
+            extra["Last-Modified"] = formatdate(modified, usegmt=True)
+            if "if-none-match" in headers:
+                if etag in [tag.strip() for tag in headers["if-none-match"].split(",")]:
+                    return 304, extra, b""
+            elif "if-modified-since" in headers:
+                try:
+                    if parsedate_to_datetime(headers["if-modified-since"]).timestamp() >= modified:
+                        return 304, extra, b""
+                except (TypeError, ValueError):
+                    pass
+
+        # If-Range: serve the range only while the client's validator is current
+        if_range = headers.get("if-range")
+        current = not if_range or if_range in (etag, formatdate(modified, usegmt=True))
+        if self.ranges and "range" in headers and current:
+            span = parse_range(headers["range"], len(body))
+            if span is False:
+                extra["Content-Range"] = f"bytes */{len(body)}"
+                return 416, extra, b""
+            if span is not None:
+                start, end = span
+                extra["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                return 206, extra, body[start:end + 1]
+        return 200, extra, body
+
+    async def send(self, writer, payload):
+        """Write a payload, throttled to the bandwidth limit"""
+        if not self.bandwidth:
+            writer.write(payload)
+            await writer.drain()
+            return
+        for offset in range(0, len(payload), THROTTLE_CHUNK_BYTES):
+            chunk = payload[offset:offset + THROTTLE_CHUNK_BYTES]
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(len(chunk) / self.bandwidth)
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError,
+                        asyncio.CancelledError):
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    status, extra, body = 400, {}, b""
+                    method, version = "GET", "HTTP/1.0"
+                else:
+                    method, target, version = parts
+                    if method not in ("GET", "HEAD"):
+                        status, extra, body = 405, {}, b""
+                    else:
+                        status, extra, body = await self.respond(target, headers)
+
+                self.stats["requests"] += 1
+                self.stats["status"][str(status)] = self.stats["status"].get(str(status), 0) + 1
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close" if version == "HTTP/1.1"
+                              else connection == "keep-alive")
+                head_lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+                head_lines += [f"{name}: {value}" for name, value in extra.items()]
+                head_lines += [f"Content-Length: {len(body)}",
+                               f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                payload = ("\r\n".join(head_lines) + "\r\n\r\n").encode() + (body if method != "HEAD" else b"")
+                self.stats["bytes"] += len(payload)
+                await self.send(writer, payload)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8081):
+        """Start listening; returns the asyncio Server"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=1024)
+
+
+def main(argv=None):
+    """Run the stand-in server"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded NOAA responses for offline and load testing")
+    parser.add_argument("root", help="Fixture directory")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on (default: 8081)")
+    parser.add_argument("--record", action="store_true",
+                        help="Fetch and save responses that have no recording yet")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--bandwidth", type=float, help="Bytes per second per connection")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of failed requests (default: 503)")
+    parser.add_argument("--no-validators", action="store_true", help="Send no ETag/Last-Modified and never 304")
+    parser.add_argument("--no-ranges", action="store_true", help="Ignore Range headers")
+    parser.add_argument("--updates", type=int, default=0,
+                        help="Newest realtime2 rows withheld at start and published one at a time")
+    parser.add_argument("--update-interval", type=float, default=600,
+                        help="Seconds between published rows (default: 600)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency jitter and errors")
+    args = parser.parse_args(argv)
+
+    standin = StandinServer(args.root, args.latency, args.jitter, args.bandwidth, args.error_rate,
+                            args.error_status, not args.no_validators, not args.no_ranges,
+                            args.updates, args.update_interval, args.record, args.seed)
+
+    async def run():
+        server = await standin.serve(args.host, args.port)
+        print(f"Serving {args.root} on http://{args.host}:{args.port}")
+        for service in NOAA_BASE_URLS:
+            print(f"export SF_WAVE_{service.upper()}_URL=http://{args.host}:{args.port}/{service}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(standin.stats))
+
+
+if __name__ == "__main__":
+    main()
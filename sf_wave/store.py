@@ -0,0 +1,268 @@
+"""
+Append-only local time-series store for buoy observations
+
+NDBC only keeps ~45 days in realtime2 files, so every run used to throw the
+history away. The store keeps every parsed row per station and file kind
+(.txt or .spec) in an append-only file of fixed-size binary records (int64
+epoch + float32 columns), oldest first.
+
+Polling is incremental: the newest stored timestamp is read from the last
+record, only the head of the realtime2 file is fetched (sized from the time
+elapsed since then, widened if needed), and only the rows newer than it are
+appended, so ingest cost scales with the number of new rows, not the size of
+the file.
+
+Writers take an exclusive flock and append whole records in a single write;
+readers never lock and simply ignore a trailing partial record, so a polling
+process can append while other processes query.
+"""
+
+import fcntl
+import json
+import os
+import time
+
+import numpy as np
+
+from sf_wave.columnar import parse_realtime2
+from sf_wave.ndbc import fetch_latest_rows, fetch_realtime2
+
+# Where station files live (override with SF_WAVE_DATA_DIR)
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "sf_wave", "store")
+
+# Numeric columns kept for each realtime2 file kind
+SCHEMAS = {
+    "txt": ("WDIR", "WSPD", "GST", "WVHT", "DPD", "APD", "MWD",
+            "PRES", "ATMP", "WTMP", "DEWP", "VIS", "PTDY", "TIDE"),
+    "spec": ("WVHT", "SwH", "SwP", "WWH", "WWP", "SwD", "WWD", "STEEPNESS", "APD", "MWD"),
+}
+
+# Text columns of .spec files are stored as numbers
+COMPASS_POINTS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+STEEPNESS_CODES = ["SWELL", "AVERAGE", "STEEP", "VERY_STEEP"]
+
+# Fewest rows requested by an incremental poll
+INITIAL_POLL_ROWS = 16
+
+# Recent records used to estimate a station's reporting interval
+INTERVAL_SAMPLE = 16
+
+# Assumed reporting interval (seconds) before a station has any history
+DEFAULT_INTERVAL = 600
+
+
+def record_dtype(ext):
+    """NumPy dtype of one stored record for a realtime2 file kind"""
+    return np.dtype([("epoch", "<i8")] + [(name, "<f4") for name in SCHEMAS[ext]])
+
+
+def _encode_text(column, codes):
+    """Map text values (compass points, steepness) to float codes, NaN when unknown"""
+    lookup = {code: float(i) for i, code in enumerate(codes)}
+    return np.array([lookup.get(value, np.nan) for value in column.tolist()], dtype=np.float32)
+
+
+def to_records(columns, ext):
+    """Convert parse_realtime2() columns into a structured array of store records"""
+    dtype = record_dtype(ext)
+    records = np.empty(len(columns["epoch"]), dtype=dtype)
+    records["epoch"] = columns["epoch"]
+    for name in SCHEMAS[ext]:
+        column = columns.get(name)
+        if column is None:
+            records[name] = np.nan
+        elif column.dtype.kind in "US":
+            codes = STEEPNESS_CODES if name == "STEEPNESS" else COMPASS_POINTS
+            values = _encode_text(column, codes)
+            records[name] = values * 22.5 if codes is COMPASS_POINTS else values
+        else:
+            records[name] = column
+    return records
+
+
+class TimeSeriesStore:
+    """Per-station append-only record files under one directory"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("SF_WAVE_DATA_DIR", DEFAULT_STORE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, station_id, ext):
+        return os.path.join(self.root, f"{station_id}.{ext}.rows")
+
+    def _write_schema(self, station_id, ext):
+        schema_path = self.path(station_id, ext)[:-len(".rows")] + ".json"
+        if not os.path.exists(schema_path):
+            tmp_path = f"{schema_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"station": station_id, "ext": ext,
+                           "columns": ["epoch"] + list(SCHEMAS[ext])}, f)
+            os.replace(tmp_path, schema_path)
+
+    def count(self, station_id, ext):
+        """Number of complete records stored for a station"""
+        try:
+            size = os.path.getsize(self.path(station_id, ext))
+        except OSError:
+            return 0
+        return size // record_dtype(ext).itemsize
+
+    def newest_epoch(self, station_id, ext):
+        """Timestamp of the newest stored record, or None if there are none"""
+        count = self.count(station_id, ext)
+        if not count:
+            return None
+        dtype = record_dtype(ext)
+        with open(self.path(station_id, ext), "rb") as f:
+            f.seek((count - 1) * dtype.itemsize)
+            last = np.frombuffer(f.read(dtype.itemsize), dtype=dtype)
+        return int(last["epoch"][0])
+
+    def tail(self, station_id, ext, n):
+        """The newest n records (oldest first)"""
+        dtype = record_dtype(ext)
+        count = self.count(station_id, ext)
+        if not count:
+            return np.empty(0, dtype=dtype)
+        records = np.memmap(self.path(station_id, ext), dtype=dtype, mode="r", shape=(count,))
+        return np.array(records[max(0, count - n):])
+
+    def interval(self, station_id, ext):
+        """Typical spacing of a station's recent records in seconds"""
+        epochs = self.tail(station_id, ext, INTERVAL_SAMPLE)["epoch"]
+        if len(epochs) < 2:
+            return DEFAULT_INTERVAL
+        return max(60, int(np.median(np.diff(epochs))))
+
+    def append(self, station_id, ext, records):
+        """
+        Append records newer than anything stored, deduplicated by timestamp
+
+        Args:
+            station_id: NDBC station ID
+            ext: realtime2 file kind ("txt" or "spec")
+            records: Structured array from to_records(), in any order
+
+        Returns:
+            Number of records appended
+        """
+        dtype = record_dtype(ext)
+        path = self.path(station_id, ext)
+        self._write_schema(station_id, ext)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # Drop a partial record left behind by a crashed writer
+            size = os.fstat(fd).st_size
+            if size % dtype.itemsize:
+                size -= size % dtype.itemsize
+                os.ftruncate(fd, size)
+
+            newest = None
+            if size:
+                os.lseek(fd, size - dtype.itemsize, os.SEEK_SET)
+                newest = int(np.frombuffer(os.read(fd, dtype.itemsize), dtype=dtype)["epoch"][0])
+
+            records = np.asarray(records, dtype=dtype)
+            if newest is not None:
+                records = records[records["epoch"] > newest]
+            # np.unique sorts by epoch and keeps one record per timestamp
+            _, first = np.unique(records["epoch"], return_index=True)
+            records = records[first]
+            if len(records):
+                os.write(fd, records.tobytes())
+            return len(records)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def read(self, station_id, ext, start=None, end=None):
+        """
+        Read stored records with start <= epoch < end (oldest first)
+
+        Returns:
+            Structured array of records (empty if nothing is stored)
+        """
+        dtype = record_dtype(ext)
+        count = self.count(station_id, ext)
+        if not count:
+            return np.empty(0, dtype=dtype)
+        records = np.memmap(self.path(station_id, ext), dtype=dtype, mode="r", shape=(count,))
+        lo = 0 if start is None else np.searchsorted(records["epoch"], start, side="left")
+        hi = count if end is None else np.searchsorted(records["epoch"], end, side="left")
+        return np.array(records[lo:hi])
+
+
+def poll_station(store, station_id, ext, session=None, now=None, rollups=True):
+    """
+    Merge the rows NDBC has published since the newest stored record
+
+    The first poll of a station reads the whole realtime2 file. After that
+    only its head is fetched: enough rows to cover the time since the newest
+    stored record at the station's recent reporting interval, widened
+    (doubling the number of rows) if that still does not reach it.
+
+    Args:
+        rollups: Fold new rows into the station's chart rollups (sf_wave.rollup)
+
+    Returns:
+        Number of new records appended, or None if the fetch failed
+    """
+    newest = store.newest_epoch(station_id, ext)
+    if newest is None:
+        text = fetch_realtime2(station_id, ext, session=session)
+        columns = parse_realtime2(text) if text is not None else None
+        if columns is None:
+            return None
+        return _merged(store, station_id, ext, to_records(columns, ext), rollups)
+
+    now = time.time() if now is None else now
+    rows = max(INITIAL_POLL_ROWS, int((now - newest) / store.interval(station_id, ext)) + 2)
+    while True:
+        text = fetch_latest_rows(station_id, ext, rows, session=session)
+        columns = parse_realtime2(text) if text is not None else None
+        if columns is None:
+            return None
+        epochs = columns["epoch"]
+        if len(epochs) < rows or (len(epochs) and epochs.min() <= newest):
+            break
+        rows *= 2
+
+    return _merged(store, station_id, ext, to_records(columns, ext), rollups)
+
+
+def _merged(store, station_id, ext, records, rollups):
+    """Append records, then keep the rollup tiers in step; returns the rows added"""
+    added = store.append(station_id, ext, records)
+    if added and rollups:
+        from sf_wave.rollup import Rollups
+
+        Rollups(source=store).update(station_id, ext)
+    return added
+
+
+def main(argv=None):
+    """Poll stations once and merge their new rows into the store"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge new realtime2 rows into the local store")
+    parser.add_argument("stations", nargs="+", help="NDBC station IDs")
+    parser.add_argument("--ext", action="append", choices=sorted(SCHEMAS),
+                        help="realtime2 file kinds to store (default: txt and spec)")
+    parser.add_argument("--root", help=f"Store directory (default: {DEFAULT_STORE_DIR})")
+    args = parser.parse_args(argv)
+
+    store = TimeSeriesStore(args.root)
+    for station_id in args.stations:
+        for ext in args.ext or sorted(SCHEMAS):
+            added = poll_station(store, station_id, ext)
+            if added is None:
+                print(f"{station_id}.{ext}: fetch failed")
+            else:
+                print(f"{station_id}.{ext}: {added} new rows, {store.count(station_id, ext)} stored")
+
+
+if __name__ == "__main__":
+    main()
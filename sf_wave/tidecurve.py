@@ -0,0 +1,136 @@
+"""
+Continuous tide curve from high/low events
+
+CO-OPS hilo predictions (and sf_wave.harmonics.predict_tide_events) only
+give the extremes. Between two consecutive extremes the water level follows
+the standard cosine model:
+
+    h(t) = h0 + (h1 - h0) * (1 - cos(pi * x)) / 2,   x = (t - t0) / (t1 - t0)
+
+so the current height, whether the tide is rising or falling and how fast,
+and the next extreme can all be answered from the events already fetched,
+without asking CO-OPS for 6-minute data. Every query takes an array of
+timestamps and is answered with one binary search over the events.
+
+Event times should be aware datetimes (sf_wave.tides attaches each station's
+zone); naive ones are taken to be in this machine's local time.
+"""
+
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+
+SECONDS_PER_HOUR = 3600.0
+
+
+class TideCurve:
+    """Cosine-interpolated water level between consecutive tide extremes"""
+
+    def __init__(self, epochs, heights, is_high=None, zone=None):
+        """
+        Args:
+            epochs: UTC epoch seconds of the extremes
+            heights: Water level at each extreme
+            is_high: Whether each extreme is a high tide (default: inferred
+                from its neighbours)
+            zone: tzinfo for the datetimes now() returns (default: naive local time)
+        """
+        self.zone = zone
+        epochs = np.asarray(epochs, dtype=np.float64)
+        order = np.argsort(epochs, kind="stable")
+        self.epochs = epochs[order]
+        self.heights = np.asarray(heights, dtype=np.float64)[order]
+        if is_high is None:
+            following = np.append(self.heights[1:], np.nan)
+            preceding = np.insert(self.heights[:-1], 0, np.nan)
+            self.is_high = np.where(np.isnan(following), self.heights > preceding,
+                                    self.heights > following)
+        else:
+            self.is_high = np.asarray(is_high, dtype=bool)[order]
+
+    @classmethod
+    def from_events(cls, events):
+        """Build a curve from TideEvent records, skipping incomplete ones"""
+        events = [event for event in events
+                  if event.time is not None and not math.isnan(event.height)]
+        return cls([event.time.timestamp() for event in events],
+                   [event.height for event in events],
+                   [event.is_high for event in events],
+                   events[0].time.tzinfo if events else None)
+
+    def _segments(self, epochs):
+        """Segment index, position within it (0..1) and validity for each time"""
+        epochs = np.atleast_1d(np.asarray(epochs, dtype=np.float64))
+        count = len(self.epochs)
+        if count < 2:
+            return (np.zeros(epochs.shape, dtype=np.intp), np.zeros(epochs.shape),
+                    np.zeros(epochs.shape, dtype=bool))
+        index = np.searchsorted(self.epochs, epochs, side="right") - 1
+        # The last extreme itself belongs to the final segment
+        index = np.where(epochs == self.epochs[-1], count - 2, index)
+        valid = (index >= 0) & (index < count - 1)
+        index = np.clip(index, 0, count - 2)
+        start, end = self.epochs[index], self.epochs[index + 1]
+        return index, (epochs - start) / (end - start), valid
+
+    def height(self, epochs):
+        """Water level at each UTC epoch second (NaN outside the events)"""
+        index, position, valid = self._segments(epochs)
+        if not valid.any():
+            return np.full(position.shape, np.nan)
+        low, high = self.heights[index], self.heights[index + 1]
+        levels = low + (high - low) * (1 - np.cos(np.pi * position)) / 2
+        return np.where(valid, levels, np.nan)
+
+    def rate(self, epochs):
+        """Rate of change in height units per hour (positive while rising, NaN outside the events)"""
+        index, position, valid = self._segments(epochs)
+        if not valid.any():
+            return np.full(position.shape, np.nan)
+        duration = (self.epochs[index + 1] - self.epochs[index]) / SECONDS_PER_HOUR
+        change = self.heights[index + 1] - self.heights[index]
+        rates = change * np.pi / (2 * duration) * np.sin(np.pi * position)
+        return np.where(valid, rates, np.nan)
+
+    def next_extreme(self, epochs):
+        """
+        The first extreme strictly after each time
+
+        Returns:
+            (epochs, heights, is_high) arrays; epoch and height are NaN (and
+            is_high False) when no later extreme is known
+        """
+        epochs = np.atleast_1d(np.asarray(epochs, dtype=np.float64))
+        index = np.searchsorted(self.epochs, epochs, side="right")
+        known = index < len(self.epochs)
+        index = np.minimum(index, max(len(self.epochs) - 1, 0))
+        if not len(self.epochs):
+            return np.full(epochs.shape, np.nan), np.full(epochs.shape, np.nan), known
+        return (np.where(known, self.epochs[index], np.nan),
+                np.where(known, self.heights[index], np.nan),
+                known & self.is_high[index])
+
+    def now(self, epoch=None):
+        """
+        Tide state at one moment (default: now)
+
+        Returns:
+            Dictionary with height, rate (per hour), rising, and the next
+            extreme's time (in the events' zone), height and kind; values
+            are None when the moment is outside the events
+        """
+        epoch = time.time() if epoch is None else epoch
+        height = float(self.height(epoch)[0])
+        rate = float(self.rate(epoch)[0])
+        next_epoch, next_height, next_high = (values[0] for values in self.next_extreme(epoch))
+        known = not math.isnan(next_epoch)
+        return {
+            "height": None if math.isnan(height) else height,
+            "rate": None if math.isnan(rate) else rate,
+            "rising": None if math.isnan(rate) else rate > 0,
+            "next_time": datetime.fromtimestamp(next_epoch, self.zone) if known else None,
+            "next_height": float(next_height) if known else None,
+            "next_kind": ("High" if next_high else "Low") if known else None,
+        }
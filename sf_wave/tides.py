@@ -0,0 +1,282 @@
+"""
+Multi-day, multi-station tide prediction fetching with a per-day cache
+
+get_tide_data() fetches one station for one day per request, so a week for
+five stations takes 35 calls. get_tide_range() asks CO-OPS for whole date
+ranges instead (begin_date/end_date), split into the longest chunks the API
+accepts, runs every station's chunks in parallel through the shared fetch
+stage, and files the predictions by station and local day.
+
+Predictions for a day never change, so each station's days are kept on disk
+and later queries only request the days that are still missing. Short gaps
+between missing days are fetched in the same request rather than adding a
+round trip for each one.
+
+CO-OPS gives station-local (lst_ldt) times without an offset, so each
+station's time zone is looked up once in the CO-OPS metadata API, kept next
+to its predictions, and attached to every TideEvent.
+"""
+
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from sf_wave.config import base_url
+from sf_wave.records import TideEvent, station_zone
+
+# Where per-day predictions live (override with SF_WAVE_TIDE_CACHE_DIR)
+DEFAULT_TIDE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sf_wave", "tides")
+
+PREDICTIONS_URL = (base_url("coops") + "/api/prod/datagetter?begin_date={begin}&end_date={end}"
+                   "&station={station_id}&product=predictions&datum={datum}&time_zone=lst_ldt"
+                   "&units=english&format=json&interval={interval}")
+STATION_URL = base_url("coops") + "/mdapi/prod/webapi/stations/{station_id}.json"
+
+# Longest range (days) CO-OPS serves in one predictions request, per interval
+MAX_CHUNK_DAYS = {"hilo": 3650, "h": 3650, "60": 3650, "6": 365}
+
+# Already-cached days between two missing runs that are cheaper to re-fetch than a separate request
+MERGE_GAP_DAYS = 7
+
+
+def _as_date(value):
+    """Accept a date, a datetime, 'today' or a YYYYMMDD / YYYY-MM-DD string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value == "today":
+        return date.today()
+    return datetime.strptime(value.replace("-", ""), "%Y%m%d").date()
+
+
+def _days(begin, end):
+    return [begin + timedelta(days=i) for i in range((end - begin).days + 1)]
+
+
+def plan_requests(missing_days, max_days, merge_gap=MERGE_GAP_DAYS):
+    """
+    Group missing days into (begin, end) request ranges
+
+    Args:
+        missing_days: Sorted list of dates to fetch
+        max_days: Longest range allowed in one request
+        merge_gap: Largest run of already-cached days to fetch again rather
+            than starting a new request
+
+    Returns:
+        List of inclusive (begin, end) date pairs
+    """
+    ranges = []
+    for day in missing_days:
+        if ranges:
+            begin, end = ranges[-1]
+            if (day - end).days <= merge_gap + 1 and (day - begin).days < max_days:
+                ranges[-1] = (begin, day)
+                continue
+        ranges.append((day, day))
+    return ranges
+
+
+class TideDayCache:
+    """Tide predictions of each station filed by local day, one JSON file per station"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("SF_WAVE_TIDE_CACHE_DIR", DEFAULT_TIDE_CACHE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, station_id, interval, datum):
+        return os.path.join(self.root, f"{station_id}.{datum}.{interval}.json")
+
+    def zone_path(self, station_id):
+        return os.path.join(self.root, f"{station_id}.zone.json")
+
+    def load_zone(self, station_id):
+        """A station's {'utc_offset', 'observes_dst'}, or None if not cached yet"""
+        try:
+            with open(self.zone_path(station_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_zone(self, station_id, zone):
+        path = self.zone_path(station_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(zone, f)
+        os.replace(tmp_path, path)
+
+    def load(self, station_id, interval, datum):
+        """{'YYYY-MM-DD': [prediction, ...]} for every cached day of a station"""
+        try:
+            with open(self.path(station_id, interval, datum)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, station_id, interval, datum, days):
+        """Merge days into a station's file (written atomically)"""
+        path = self.path(station_id, interval, datum)
+        merged = self.load(station_id, interval, datum)
+        merged.update(days)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(merged, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+def fetch_predictions(station_id, begin, end, interval="hilo", datum="MLLW"):
+    """
+    Fetch one date range of predictions from CO-OPS
+
+    Returns:
+        List of {'t', 'v', ['type']} predictions, or None on error
+    """
+    from sf_wave.cache import cached_get
+
+    url = PREDICTIONS_URL.format(begin=begin.strftime("%Y%m%d"), end=end.strftime("%Y%m%d"),
+                                 station_id=station_id, datum=datum, interval=interval)
+    try:
+        response = cached_get(url)
+        if response.status_code != 200:
+            print(f"Error fetching tides for {station_id}: HTTP {response.status_code}")
+            return None
+        data = response.json()
+    except Exception as e:
+        print(f"Error fetching tides for {station_id}: {e}")
+        return None
+    if "error" in data:
+        print(f"Error fetching tides for {station_id}: {data['error'].get('message', data['error'])}")
+        return None
+    return data.get("predictions", [])
+
+
+def fetch_station_zone(station_id):
+    """
+    Look up a station's local time zone in the CO-OPS metadata API
+
+    Returns:
+        {'utc_offset': standard-time hours from UTC, 'observes_dst': bool},
+        or None on error
+    """
+    from sf_wave.cache import cached_get
+
+    try:
+        response = cached_get(STATION_URL.format(station_id=station_id))
+        if response.status_code != 200:
+            print(f"Error fetching station {station_id} metadata: HTTP {response.status_code}")
+            return None
+        station = response.json()["stations"][0]
+        return {"utc_offset": station["timezonecorr"], "observes_dst": bool(station.get("observedst"))}
+    except Exception as e:
+        print(f"Error fetching station {station_id} metadata: {e}")
+        return None
+
+
+def get_station_zone(station_id, cache=None):
+    """tzinfo of a station's lst_ldt times (None if it cannot be looked up)"""
+    cache = cache or TideDayCache()
+    zone = cache.load_zone(station_id)
+    if zone is None:
+        zone = fetch_station_zone(station_id)
+        if zone is None:
+            return None
+        cache.save_zone(station_id, zone)
+    return station_zone(zone["utc_offset"], zone["observes_dst"])
+
+
+def get_tide_range(station_ids, begin, end, interval="hilo", datum="MLLW", cache=None,
+                   max_workers=None):
+    """
+    Tide predictions for several stations over a range of days
+
+    Args:
+        station_ids: CO-OPS station IDs
+        begin, end: First and last local day (dates or 'YYYYMMDD' strings, inclusive)
+        interval: CO-OPS prediction interval ('hilo', 'h' or '6')
+        datum: Vertical datum
+        cache: TideDayCache to use (default: the on-disk cache)
+        max_workers: Parallel requests (default: one per request)
+
+    Returns:
+        Dictionary mapping station ID -> {date: [TideEvent, ...]}; days that
+        could not be fetched are left out. Event times are aware datetimes in
+        the station's zone (naive local times if it could not be looked up).
+    """
+    begin, end = _as_date(begin), _as_date(end)
+    cache = cache or TideDayCache()
+    wanted = _days(begin, end)
+    max_days = MAX_CHUNK_DAYS.get(interval, 365)
+
+    cached = {}
+    zones = {}
+    tasks = {}
+    for station_id in station_ids:
+        cached[station_id] = cache.load(station_id, interval, datum)
+        zones[station_id] = cache.load_zone(station_id)
+        if zones[station_id] is None:
+            tasks[(station_id, None, None)] = (fetch_station_zone, station_id)
+        missing = [day for day in wanted if day.isoformat() not in cached[station_id]]
+        for chunk_begin, chunk_end in plan_requests(missing, max_days):
+            tasks[(station_id, chunk_begin, chunk_end)] = (
+                fetch_predictions, station_id, chunk_begin, chunk_end, interval, datum)
+
+    results = {}
+    if tasks:
+        # Imported here so fully cached ranges never load the thread pool (and its logging import)
+        from sf_wave.fetch import fetch_concurrently
+
+        results = fetch_concurrently(tasks, max_workers)
+
+    fetched = {}
+    for (station_id, chunk_begin, chunk_end), predictions in results.items():
+        if predictions is None:
+            continue
+        if chunk_begin is None:
+            zones[station_id] = predictions
+            cache.save_zone(station_id, predictions)
+            continue
+        # Every day in the range was fetched, even those without an event
+        days = fetched.setdefault(station_id, {})
+        for day in _days(chunk_begin, chunk_end):
+            days[day.isoformat()] = []
+        for prediction in predictions:
+            days.setdefault(prediction.get("t", "")[:10], []).append(prediction)
+
+    tides = {}
+    for station_id in station_ids:
+        if station_id in fetched:
+            cache.save(station_id, interval, datum, fetched[station_id])
+            cached[station_id].update(fetched[station_id])
+        zone = zones[station_id] and station_zone(zones[station_id]["utc_offset"],
+                                                  zones[station_id]["observes_dst"])
+        tides[station_id] = {
+            day: [TideEvent.from_prediction(prediction, zone)
+                  for prediction in cached[station_id][day.isoformat()]]
+            for day in wanted if day.isoformat() in cached[station_id]
+        }
+    return tides
+
+
+def main(argv=None):
+    """Fetch tide predictions for several stations and days"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch tide predictions for a range of days")
+    parser.add_argument("stations", nargs="+", help="CO-OPS station IDs")
+    parser.add_argument("--begin", default="today", help="First day (YYYYMMDD, default: today)")
+    parser.add_argument("--days", type=int, default=7, help="Number of days (default: 7)")
+    args = parser.parse_args(argv)
+
+    begin = _as_date(args.begin)
+    tides = get_tide_range(args.stations, begin, begin + timedelta(days=args.days - 1))
+    for station_id, days in tides.items():
+        print(f"\n===== {station_id} =====")
+        for day, events in days.items():
+            summary = ", ".join(f"{event.kind[0]} {event.time:%H:%M} {event.height:g} ft"
+                                for event in events if event.time)
+            print(f"{day}: {summary}")
+
+
+if __name__ == "__main__":
+    main()